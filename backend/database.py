@@ -1,20 +1,250 @@
 import sqlite3
 import os
+import threading
+import time
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "underwriting.db")
+from services.metrics import metrics
 
+DB_PATH = os.getenv("UNDERWRITING_DB_PATH", os.path.join(os.path.dirname(__file__), "underwriting.db"))
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Pool / connection tuning
+DB_POOL_SIZE = max(1, int(os.getenv("DB_POOL_SIZE", "16")))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
 
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size = {DB_MMAP_SIZE}",
+    "PRAGMA temp_store = MEMORY",
+)
 
-def init_db():
+
+DB_POOL_WAIT_SECONDS = metrics.histogram(
+    "db_pool_wait_seconds", "Time to check a connection out of the SQLite pool.",
+)
+DB_CONNECT_SECONDS = metrics.histogram(
+    "db_connect_seconds", "Time to open and configure a new SQLite connection.",
+)
+DB_LOCK_WAIT_SECONDS = metrics.histogram(
+    "db_lock_wait_seconds", "Time to take SQLite's write lock (BEGIN IMMEDIATE), by caller.",
+)
+
+
+class PooledConnection:
+    """sqlite3.Connection proxy whose close() hands the connection back to the pool."""
+
+    __slots__ = ("_conn", "_pool", "_released")
+
+    def __init__(self, conn: sqlite3.Connection, pool: "ConnectionPool"):
+        self._conn = conn
+        self._pool = pool
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self) -> None:
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of tuned SQLite connections.
+
+    Idle connections remember the thread that last used them and are handed back
+    to that thread first, so a worker thread normally reuses one warm connection
+    (and its prepared-statement cache). When all `size` connections are checked
+    out, acquire() waits up to `timeout` seconds.
+    """
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT_S):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle: dict[int, list[sqlite3.Connection]] = {}
+        self._idle_count = 0
+        self._total = 0
+        self.acquires = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        started = time.perf_counter()
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        DB_CONNECT_SECONDS.labels().observe(time.perf_counter() - started)
+        return conn
+
+    def _take_idle(self, ident: int):
+        own = self._idle.get(ident)
+        if not own:
+            own = next((conns for conns in self._idle.values() if conns), None)
+        if not own:
+            return None
+        self._idle_count -= 1
+        return own.pop()
+
+    def acquire(self) -> PooledConnection:
+        ident = threading.get_ident()
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                conn = self._take_idle(ident)
+                if conn is not None:
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    conn = None
+                    break
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise sqlite3.OperationalError(
+                        f"database connection pool exhausted ({self.size} connections busy)"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            self.acquires += 1
+            waited_s = time.perf_counter() - started
+            if waited:
+                self.waits += 1
+                self.wait_seconds += waited_s
+        DB_POOL_WAIT_SECONDS.labels().observe(waited_s)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+        return PooledConnection(conn, self)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                # same as closing a plain connection: uncommitted work is discarded
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.setdefault(threading.get_ident(), []).append(conn)
+            self._idle_count += 1
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size":         self.size,
+                "open":         self._total,
+                "idle":         self._idle_count,
+                "in_use":       self._total - self._idle_count,
+                "acquires":     self.acquires,
+                "waits":        self.waits,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "timeouts":     self.timeouts,
+            }
+
+
+    def metric_samples(self):
+        stats = self.stats()
+        for state in ("idle", "in_use"):
+            yield ("db_pool_connections", "gauge", "Pooled SQLite connections, by state.",
+                   {"state": state}, stats[state])
+        yield ("db_pool_size", "gauge", "Maximum pooled SQLite connections.", {}, stats["size"])
+        yield ("db_pool_timeouts_total", "counter", "Pool checkouts that gave up waiting.", {}, stats["timeouts"])
+
+
+pool = ConnectionPool(DB_PATH)
+metrics.register_collector(pool.metric_samples)
+
+
+def get_connection() -> PooledConnection:
+    """Check a connection out of the pool; close() returns it."""
+    return pool.acquire()
+
+
+def begin_immediate(conn, caller: str) -> None:
+    """BEGIN IMMEDIATE, recording how long the write lock took to get (busy_timeout waits included)."""
+    started = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    DB_LOCK_WAIT_SECONDS.labels(caller=caller).observe(time.perf_counter() - started)
+
+
+def get_db():
+    """FastAPI dependency yielding a pooled connection for the duration of a request."""
     conn = get_connection()
-    cursor = conn.cursor()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# ─── Schema migrations ────────────────────────────────────────────────────────
+# Applied in order; the schema version lives in PRAGMA user_version. Each step
+# is idempotent (IF NOT EXISTS / column checks) so databases created before
+# versioning was introduced upgrade cleanly from version 0.
+
+def _column_exists(conn, table: str, column: str) -> bool:
+    return any(row["name"] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_column(table: str, column: str, decl: str):
+    """Migration step adding `column` to `table` unless it is already there."""
+    def step(conn) -> str:
+        if _column_exists(conn, table, column):
+            return ""
+        return f"ALTER TABLE {table} ADD COLUMN {column} {decl};"
+    return step
+
+
+def _process_results_upsert_key(conn) -> str:
+    # One row per (submission, property) so /api/process can upsert; older
+    # databases may hold duplicates from interrupted runs — keep the newest.
+    return _add_column("process_results", "input_hash", "TEXT")(conn) + """
+        DELETE FROM process_results
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM process_results GROUP BY submission_id, property_id
+        );
 
-    cursor.executescript("""
+        DROP INDEX IF EXISTS idx_process_results_submission;
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_process_results_submission_property
+            ON process_results (submission_id, property_id);
+    """
+
+
+MIGRATIONS = [
+    (1, "base schema", """
         CREATE TABLE IF NOT EXISTS submissions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             underwriter_name TEXT NOT NULL,
@@ -34,15 +264,256 @@ def init_db():
             vulnerability_data TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         );
-    """)
+    """),
+    (2, "submissions.score", _add_column("submissions", "score", "REAL DEFAULT NULL")),
+    (3, "lookup cache", """
+        CREATE TABLE IF NOT EXISTS lookup_cache (
+            namespace TEXT NOT NULL,
+            cache_key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            PRIMARY KEY (namespace, cache_key)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_lookup_cache_stored_at
+            ON lookup_cache (namespace, stored_at);
+    """),
+    (4, "ml jobs", """
+        CREATE TABLE IF NOT EXISTS ml_jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            total_rows INTEGER NOT NULL DEFAULT 0,
+            processed_rows INTEGER NOT NULL DEFAULT 0,
+            chunk_count INTEGER NOT NULL DEFAULT 0,
+            summary TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME
+        );
+
+        CREATE TABLE IF NOT EXISTS ml_job_chunks (
+            job_id TEXT NOT NULL REFERENCES ml_jobs(id),
+            chunk_index INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (job_id, chunk_index)
+        );
+    """),
+    (5, "hot-query indexes", """
+        -- GET /api/submissions/latest
+        CREATE INDEX IF NOT EXISTS idx_submissions_created_at
+            ON submissions (created_at);
+
+        -- GET /api/leaderboard: covering, limited to scored submissions
+        CREATE INDEX IF NOT EXISTS idx_submissions_leaderboard
+            ON submissions (score DESC, created_at ASC, id, underwriter_name)
+            WHERE score IS NOT NULL;
+
+        -- GET /api/results/{id} and reprocessing deletes
+        CREATE INDEX IF NOT EXISTS idx_process_results_submission
+            ON process_results (submission_id, property_id);
+
+        -- job recovery on startup
+        CREATE INDEX IF NOT EXISTS idx_ml_jobs_status
+            ON ml_jobs (status, created_at);
+
+        ANALYZE;
+    """),
+    # bumped whenever process_results are rewritten; keys cached result documents
+    (6, "submissions.results_version",
+        _add_column("submissions", "results_version", "INTEGER NOT NULL DEFAULT 0")),
+    (7, "process_results upsert key", _process_results_upsert_key),
+    (8, "mail outbox", """
+        CREATE TABLE IF NOT EXISTS mail_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL,
+            sender TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            message TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at REAL NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME
+        );
+
+        -- mail workers claim due messages in (next_attempt_at, id) order
+        CREATE INDEX IF NOT EXISTS idx_mail_outbox_due
+            ON mail_outbox (status, next_attempt_at);
+
+        CREATE INDEX IF NOT EXISTS idx_mail_outbox_batch
+            ON mail_outbox (batch_id);
+    """),
+    # Catalog ids used to be row positions, which shift when the CSV changes.
+    # Ids are now assigned once per property submission_id and never reused
+    # (see assign_property_ids). The first load assigns them in file order, so
+    # they match the positional ids already stored in process_results.
+    (9, "stable property ids", """
+        CREATE TABLE IF NOT EXISTS property_ids (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            submission_id TEXT NOT NULL UNIQUE
+        );
+    """),
+    # Jobs are claimed by one app process under a lease it keeps renewing;
+    # others only re-queue a job once its lease has run out
+    (10, "ml job leases", lambda conn: (
+        _add_column("ml_jobs", "owner", "TEXT")(conn)
+        + _add_column("ml_jobs", "lease_expires_at", "REAL")(conn)
+    )),
+    # A `sending` message is only re-queued once its claim is older than the lease
+    (11, "mail outbox claims", lambda conn: (
+        _add_column("mail_outbox", "claimed_by", "TEXT")(conn)
+        + _add_column("mail_outbox", "claimed_at", "REAL")(conn)
+    )),
+    # Every score write stamps the submission with the next value of the
+    # 'scores' counter, so each app process can pick up the leaderboard
+    # changes made by the others with one primary-key read
+    (12, "score change counter", lambda conn: _add_column(
+        "submissions", "score_version", "INTEGER NOT NULL DEFAULT 0")(conn) + """
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO counters (name, value) VALUES ('scores', 0);
+
+        CREATE INDEX IF NOT EXISTS idx_submissions_score_version
+            ON submissions (score_version);
 
-    conn.commit()
+        CREATE TRIGGER IF NOT EXISTS trg_submissions_score_version
+        AFTER UPDATE OF score ON submissions
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'scores';
+            UPDATE submissions SET score_version = (SELECT value FROM counters WHERE name = 'scores')
+            WHERE id = NEW.id;
+        END;
+    """),
+]
 
-    # Idempotent migration: add score column if it doesn't exist
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> list[int]:
+    """Apply pending migrations, each in its own transaction. Returns the versions applied."""
+    applied = []
+    current = schema_version(conn)
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        sql = step(conn) if callable(step) else step
+        try:
+            conn.executescript(f"BEGIN;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[database] applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+# ─── Query-plan checks ────────────────────────────────────────────────────────
+# Hot queries paired with the index they must use. check_query_plans() fails if
+# SQLite plans a full table scan or a temp B-tree sort for any of them.
+
+HOT_QUERIES = [
+    (
+        "latest submission",
+        "SELECT * FROM submissions ORDER BY created_at DESC LIMIT 1",
+        (),
+        "idx_submissions_created_at",
+    ),
+    (
+        "leaderboard",
+        "SELECT id, underwriter_name, score, created_at FROM submissions "
+        "WHERE score IS NOT NULL ORDER BY score DESC, created_at ASC LIMIT 10",
+        (),
+        "idx_submissions_leaderboard",
+    ),
+    (
+        "results by submission",
+        "SELECT * FROM process_results WHERE submission_id = ? ORDER BY property_id",
+        (1,),
+        "uq_process_results_submission_property",
+    ),
+    (
+        "interrupted jobs",
+        "SELECT id, created_at FROM ml_jobs WHERE status IN ('queued', 'running') "
+        "AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+        (0,),
+        "idx_ml_jobs_status",
+    ),
+    (
+        "due mail",
+        "SELECT id FROM mail_outbox WHERE status = 'queued' AND next_attempt_at <= ? "
+        "ORDER BY next_attempt_at, id LIMIT 20",
+        (0,),
+        "idx_mail_outbox_due",
+    ),
+]
+
+
+def check_query_plans(conn=None) -> list[dict]:
+    """EXPLAIN QUERY PLAN every hot query; raises AssertionError listing any that miss their index."""
+    own = conn is None
+    conn = conn or get_connection()
     try:
-        cursor.execute("ALTER TABLE submissions ADD COLUMN score REAL DEFAULT NULL")
-        conn.commit()
-    except Exception:
-        pass  # column already exists
+        report, failures = [], []
+        for name, sql, params, index in HOT_QUERIES:
+            plan = [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            ok = any(index in step for step in plan) and not any("TEMP B-TREE" in step for step in plan)
+            report.append({"query": name, "index": index, "plan": plan, "ok": ok})
+            if not ok:
+                failures.append(f"{name}: expected {index}, got {plan}")
+        if failures:
+            raise AssertionError("Query plan regression:\n  " + "\n  ".join(failures))
+        return report
+    finally:
+        if own:
+            conn.close()
+
+
+def assign_property_ids(submission_ids: list[str]) -> dict[str, int]:
+    """
+    Stable catalog id per property submission_id. Ids persist in property_ids,
+    so a property keeps its id when rows are inserted, removed or reordered in
+    the catalog file. Unseen submission_ids get the next ids, in the order given.
+    """
+    conn = get_connection()
+    try:
+        begin_immediate(conn, "property_ids")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO property_ids (submission_id) VALUES (?)",
+                [(sid,) for sid in submission_ids],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return {row["submission_id"]: row["id"] for row in conn.execute("SELECT id, submission_id FROM property_ids")}
+    finally:
+        conn.close()
+
+
+def init_db():
+    conn = get_connection()
+    try:
+        migrate(conn)
+        if os.getenv("DB_CHECK_QUERY_PLANS") == "1":
+            check_query_plans(conn)
+    finally:
+        conn.close()
+
 
-    conn.close()
+if __name__ == "__main__":
+    # python database.py  → migrate, then verify hot-query plans
+    init_db()
+    for entry in check_query_plans():
+        print(f"ok  {entry['query']:<24} {' | '.join(entry['plan'])}")
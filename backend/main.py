@@ -1,7 +1,17 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from database import init_db
 from routers import properties, submissions, process, results, leaderboard, triage, ml
+from routers.ml import warm_models
+from services.executors import shutdown_pools
+from services.jobs import job_engine
+from services.leaderboard import rebuild_leaderboard
+from services.mail import mail_outbox
+from services.metrics import MetricsMiddleware, metrics
+from services.serialization import FastJSONResponse
 
 # Load .env file for SMTP credentials and other settings
 try:
@@ -10,7 +20,7 @@ try:
 except ImportError:
     pass
 
-app = FastAPI(title="Underwriting Intelligence API", version="1.0.0")
+app = FastAPI(title="Underwriting Intelligence API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS — allow the Vite dev server and any origin for demo purposes
 app.add_middleware(
@@ -21,10 +31,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress bodies above this size; brotli when brotli-asgi is installed
+# (requirements-optional.txt), gzip otherwise. Event and NDJSON streams send
+# Content-Encoding: identity (services.events.STREAM_HEADERS), which both
+# middlewares leave alone, so lines are not held back in the encoder; the
+# brotli branch also skips those paths outright.
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "6"))   # gzip 1-9
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=4,
+        minimum_size=RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_fallback=True,
+        excluded_handlers=[
+            r"^/api/submissions/stream$", r"^/api/ml/jobs/[^/]+/events$", r"^/api/ml/submissions/stream$",
+        ],
+    )
+except ImportError:
+    app.add_middleware(
+        GZipMiddleware, minimum_size=RESPONSE_COMPRESSION_MIN_BYTES, compresslevel=RESPONSE_COMPRESSION_LEVEL,
+    )
+
+# Request count / latency / in-flight per route, exported on GET /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Initialize DB on startup
 @app.on_event("startup")
 def startup_event():
     init_db()
+    rebuild_leaderboard()
+    job_engine.recover()
+    mail_outbox.start()
+    warm_models()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    mail_outbox.stop()
+    shutdown_pools()
 
 # Mount routers
 app.include_router(properties.router,   prefix="/api/properties",  tags=["properties"])
@@ -39,3 +85,9 @@ app.include_router(ml.router,           prefix="/api/ml",          tags=["ml"])
 @app.get("/")
 def root():
     return {"message": "Underwriting Intelligence API is running", "version": "1.0.0"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of every metric this process records."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
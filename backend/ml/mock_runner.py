@@ -231,20 +231,24 @@ MOCK_VULNERABILITY = {
 }
 
 
+# Payloads are stored as JSON text; encode each once instead of per result
+_DEFAULT_SCORE = {"ai_risk": "Medium", "quote_propensity": 0.5, "total_risk_score": 0.5}
+_ENCODED_SHAP = {pid: json.dumps(shap) for pid, shap in MOCK_SHAP.items()}
+_ENCODED_VULNERABILITY = {pid: json.dumps(vuln) for pid, vuln in MOCK_VULNERABILITY.items()}
+
+
 def run_mock_ml(property_ids: list[int]) -> list[dict]:
     """Return mock ML results for given property IDs."""
     results = []
     for pid in property_ids:
-        score = MOCK_SCORES.get(pid, {"ai_risk": "Medium", "quote_propensity": 0.5, "total_risk_score": 0.5})
-        shap = MOCK_SHAP.get(pid, [])
-        vuln = MOCK_VULNERABILITY.get(pid, {})
+        score = MOCK_SCORES.get(pid, _DEFAULT_SCORE)
         results.append({
             "property_id": pid,
             "ai_risk": score["ai_risk"],
             "quote_propensity": score["quote_propensity"],
             "total_risk_score": score["total_risk_score"],
-            "shap_values": json.dumps(shap),
-            "vulnerability_data": json.dumps(vuln),
+            "shap_values": _ENCODED_SHAP.get(pid, "[]"),
+            "vulnerability_data": _ENCODED_VULNERABILITY.get(pid, "{}"),
         })
     return results
 
@@ -1,32 +1,27 @@
-from fastapi import APIRouter
-from database import get_connection
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+from services.leaderboard import leaderboard, sync_leaderboard
 
 router = APIRouter()
 
+Window = Literal["all", "daily", "weekly"]
+
 
 @router.get("")
-def get_leaderboard():
-    """Return top 10 submissions ranked by score percentage."""
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, underwriter_name, score, created_at "
-            "FROM submissions "
-            "WHERE score IS NOT NULL "
-            "ORDER BY score DESC, created_at ASC "
-            "LIMIT 10"
-        )
-        rows = cursor.fetchall()
-        entries = []
-        for i, row in enumerate(rows):
-            entries.append({
-                "rank": i + 1,
-                "submission_id": row["id"],
-                "underwriter_name": row["underwriter_name"],
-                "score_percentage": round(row["score"], 1),
-                "created_at": row["created_at"],
-            })
-        return entries
-    finally:
-        conn.close()
+def get_leaderboard(
+    limit: int = Query(10, ge=1, le=1000),
+    window: Window = "all",
+):
+    """Return the top submissions ranked by score percentage (all time, today or this week, UTC)."""
+    sync_leaderboard()
+    return leaderboard.top(limit, window)
+
+
+@router.get("/rank/{submission_id}")
+def get_rank(submission_id: int, window: Window = "all"):
+    """Rank of one submission on the chosen board, with the board's size."""
+    sync_leaderboard()
+    entry = leaderboard.rank(submission_id, window)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Submission is not on this leaderboard")
+    return entry
@@ -16,27 +16,106 @@ keyed by submission_id so ordering is always stable.
 """
 
 import os
+import re
 import json
 import io
+import threading
+import time
 import requests as http_requests
 import numpy as np
 import pandas as pd
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import chain
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Optional
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 # Import mock data from existing routers so we never duplicate it
 from routers.properties import MOCK_PROPERTIES
 from routers.results import MOCK_PREDICTIONS, MOCK_SHAP_VALUES
+from services.cache import PersistentCache, SingleFlight, register_cache_metrics
+from services.events import OVERFLOW, STREAM_HEADERS, bus, sse_message
+from services.executors import PoolSaturated, cpu_pool, io_pool, pool_stats
+from services.jobs import TERMINAL_STATUSES, job_engine, job_topic
+from services.metrics import StageTimer, metrics, record_stages, track_call
+from services.models import (
+    ModelUnavailable, StageFailed, load_model_version, model_registry, preload_model, preload_shared_version,
+    shared_version,
+)
+from services.propensity import HIGH_PROPENSITY_THRESHOLD, LOW_PROPENSITY_THRESHOLD, TIERS
+from services.serialization import dumps, json_response
 
 router = APIRouter()
 
 # ─── Constants ────────────────────────────────────────────────────────────────
 
-LOW_PROPENSITY_THRESHOLD = 0.30
+# Run 2 blend: final = vulnerability_score * w_vulnerability + preliminary * w_preliminary,
+# overridable per request through MLRequest.weights
+DEFAULT_FINAL_WEIGHTS = {"vulnerability": 0.6, "preliminary": 0.4}
 GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY", "")
+# Overridable so benchmarks can point both upstreams at a local stand-in (tools/fake_upstream.py)
+GEOAPIFY_BASE_URL = os.getenv("GEOAPIFY_BASE_URL", "https://api.geoapify.com").rstrip("/")
 PROPERTY_API_BASE = os.getenv("PROPERTY_API_BASE", "http://localhost:8000")
 
+# Upstream HTTP timeouts (seconds) and retries. Retries cover connection errors,
+# read timeouts and 429/502/503/504 on GETs, with exponential backoff that
+# honours Retry-After; POST /add_property is never retried.
+GEOAPIFY_TIMEOUT_S = float(os.getenv("GEOAPIFY_TIMEOUT_S", "10"))
+PROPERTY_API_TIMEOUT_S = float(os.getenv("PROPERTY_API_TIMEOUT_S", "15"))
+UPSTREAM_RETRIES = max(0, int(os.getenv("UPSTREAM_RETRIES", "0")))
+UPSTREAM_RETRY_BACKOFF_S = float(os.getenv("UPSTREAM_RETRY_BACKOFF_S", "0.2"))
+
+# Run 2 lookup tuning: parallel rows per batch and wall-clock budget for the batch
+ML_LOOKUP_CONCURRENCY = max(1, int(os.getenv("ML_LOOKUP_CONCURRENCY", "16")))
+ML_LOOKUP_DEADLINE_S = float(os.getenv("ML_LOOKUP_DEADLINE_S", "120"))
+# Threads shared by all batches; each batch holds at most ML_LOOKUP_CONCURRENCY of them
+ML_LOOKUP_POOL_SIZE = max(ML_LOOKUP_CONCURRENCY, int(os.getenv("ML_LOOKUP_POOL_SIZE", str(ML_LOOKUP_CONCURRENCY * 4))))
+
+# Load and warm the Run 1 model when the CPU pool starts rather than on the first request
+ML_MODEL_PRELOAD = os.getenv("ML_MODEL_PRELOAD", "1") == "1"
+
+# Rows per chunk when a batch runs as a background job (progress granularity)
+ML_JOB_CHUNK_SIZE = max(1, int(os.getenv("ML_JOB_CHUNK_SIZE", "250")))
+
+# Job event streams re-check the store this often while no event arrives: the
+# job may be running in another app process, whose bus events never reach here
+ML_JOB_EVENTS_POLL_S = float(os.getenv("ML_JOB_EVENTS_POLL_S", "15"))
+
+# Rows per NDJSON line on /api/ml/submissions/stream
+ML_STREAM_CHUNK_SIZE = max(1, int(os.getenv("ML_STREAM_CHUNK_SIZE", "200")))
+
+# Geocode cache: results keyed by normalized address text, persisted in SQLite
+_geocode_cache = PersistentCache(
+    namespace="geocode",
+    ttl_seconds=float(os.getenv("GEOCODE_CACHE_TTL_S", str(30 * 24 * 3600))),
+    max_memory_entries=int(os.getenv("GEOCODE_CACHE_MEMORY_SIZE", "4096")),
+    max_rows=int(os.getenv("GEOCODE_CACHE_MAX_ROWS", "200000")),
+)
+
+# Vulnerability cache: (property_type, normalized address) → property_id + score from the Property API.
+# Concurrent misses for one address share a single upstream call (_vuln_flight).
+_vulnerability_cache = PersistentCache(
+    namespace="vulnerability",
+    ttl_seconds=float(os.getenv("VULN_CACHE_TTL_S", str(7 * 24 * 3600))),
+    max_memory_entries=int(os.getenv("VULN_CACHE_MEMORY_SIZE", "4096")),
+    max_rows=int(os.getenv("VULN_CACHE_MAX_ROWS", "200000")),
+)
+_vuln_flight = SingleFlight()
+register_cache_metrics("geocode", _geocode_cache)
+register_cache_metrics("vulnerability", _vulnerability_cache)
+
+# Every time a batch (Run 1) or a row lookup (Run 2) is served from mock data
+# instead of the real model / Property API; the latest error per reason is kept too.
+_FALLBACKS = metrics.counter(
+    "ml_fallback_total", "Times the mock fallback was used instead of the real pipeline, by reason.",
+)
+_fallback_errors: dict[tuple, dict] = {}
+_fallback_lock = threading.Lock()
+
 # pre-build lookup dicts for O(1) access
 _MOCK_PROPERTY_MAP = {m["submission_id"]: m for m in MOCK_PROPERTIES}
 _MOCK_PREDICTION_MAP = {p["submission_id"]: p for p in MOCK_PREDICTIONS}
@@ -82,17 +161,58 @@ class MLRequest(BaseModel):
     rows: list[dict[str, Any]]
     rules: dict[str, Any] = {}
     weights: dict[str, Any] = {}
+    # Run 2 only: re-fetch vulnerability scores cached longer ago than this
+    max_staleness_s: Optional[float] = None
+    # add the per-stage timing report to the response as "timings"
+    include_timings: bool = False
 
 
 # ─── Property API helpers ─────────────────────────────────────────────────────
 
+def _build_http_session(pool_size: int, retries: int = 0) -> http_requests.Session:
+    """Shared session with a keep-alive pool per host (Geoapify, Property API)."""
+    session = http_requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=UPSTREAM_RETRY_BACKOFF_S,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,      # the last response goes through raise_for_status as usual
+    ) if retries else 0
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_http = _build_http_session(ML_LOOKUP_POOL_SIZE, UPSTREAM_RETRIES)
+_lookup_pool = ThreadPoolExecutor(max_workers=ML_LOOKUP_POOL_SIZE, thread_name_prefix="vuln-lookup")
+
+
+def _normalize_address(address: str) -> str:
+    """Cache key for an address: lowercase, punctuation stripped, whitespace collapsed."""
+    return re.sub(r"[\s,.;#]+", " ", address.lower()).strip()
+
+
 def _geocode_address(address: str) -> dict:
+    """Geocode an address, serving repeats from the geocode cache."""
+    key = _normalize_address(address)
+    cached = _geocode_cache.get(key)
+    if cached is None:
+        cached = _geocode_address_uncached(address)
+        _geocode_cache.put(key, cached)
+    # copy: callers mutate the payload before posting it to /add_property
+    return {**cached, "address": address, "images": []}
+
+
+def _geocode_address_uncached(address: str) -> dict:
     """Call Geoapify geocoding API, return structured location payload."""
-    url = "https://api.geoapify.com/v1/geocode/search"
+    url = f"{GEOAPIFY_BASE_URL}/v1/geocode/search"
     params = {"text": address, "apiKey": GEOAPIFY_API_KEY, "limit": 1}
-    resp = http_requests.get(url, params=params, timeout=10)
-    resp.raise_for_status()
-    features = resp.json().get("features", [])
+    with track_call("geoapify", "geocode"):
+        resp = _http.get(url, params=params, timeout=GEOAPIFY_TIMEOUT_S)
+        resp.raise_for_status()
+        features = resp.json().get("features", [])
     if not features:
         raise ValueError(f"Geoapify returned no results for address: {address}")
     props = features[0]["properties"]
@@ -113,9 +233,10 @@ def _geocode_address(address: str) -> dict:
 def _add_property(payload: dict) -> str:
     """POST to Property API /add_property, return property_id string."""
     url = f"{PROPERTY_API_BASE}/add_property"
-    resp = http_requests.post(url, json=payload, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
+    with track_call("property_api", "add_property"):
+        resp = _http.post(url, json=payload, timeout=PROPERTY_API_TIMEOUT_S)
+        resp.raise_for_status()
+        data = resp.json()
     property_id = data.get("property_id")
     if not property_id:
         raise ValueError(f"/add_property response missing property_id: {data}")
@@ -125,26 +246,52 @@ def _add_property(payload: dict) -> str:
 def _get_vulnerability_score(property_id: str) -> float:
     """GET vulnerability score for a registered property_id."""
     url = f"{PROPERTY_API_BASE}/get_vulnerability_score"
-    resp = http_requests.get(url, params={"property_id": property_id}, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
+    with track_call("property_api", "get_vulnerability_score"):
+        resp = _http.get(url, params={"property_id": property_id}, timeout=PROPERTY_API_TIMEOUT_S)
+        resp.raise_for_status()
+        data = resp.json()
     score = data.get("property_vulnerability_score") or data.get("vulnerability_score")
     if score is None:
         raise ValueError(f"get_vulnerability_score response missing score: {data}")
     return float(score)
 
 
-def _fetch_vulnerability_via_api(address: str, property_type: str = "residential"):
+def _fetch_vulnerability_via_api(address: str, property_type: str = "residential",
+                                 max_age: Optional[float] = None):
     """
     Full pipeline: address → Geoapify → /add_property → /get_vulnerability_score.
     Returns (property_id, vulnerability_score).
+
+    Results are cached per (property_type, normalized address); max_age tightens
+    the cache TTL for this call. If the upstream call fails, an entry older than
+    max_age (but within the TTL) is served instead.
     Raises on any failure (caller handles fallback).
     """
-    geo_payload = _geocode_address(address)
-    geo_payload["property_type"] = property_type
-    property_id = _add_property(geo_payload)
-    vuln_score = _get_vulnerability_score(property_id)
-    return property_id, vuln_score
+    key = f"{property_type}|{_normalize_address(address)}"
+    cached = _vulnerability_cache.get(key, max_age=max_age)
+    if cached is not None:
+        return cached["property_id"], cached["vulnerability_score"]
+
+    def _call_upstream():
+        # a flight for this key may have finished between the read above and now
+        cached = _vulnerability_cache.peek(key, max_age=max_age)
+        if cached is not None:
+            return cached["property_id"], cached["vulnerability_score"]
+        geo_payload = _geocode_address(address)
+        geo_payload["property_type"] = property_type
+        property_id = _add_property(geo_payload)
+        vuln_score = _get_vulnerability_score(property_id)
+        _vulnerability_cache.put(key, {"property_id": property_id, "vulnerability_score": vuln_score})
+        return property_id, vuln_score
+
+    try:
+        return _vuln_flight.do(key, _call_upstream)
+    except Exception:
+        stale = _vulnerability_cache.get(key) if max_age is not None else None
+        if stale is None:
+            raise
+        print(f"[final_score] upstream failed for '{address}', serving stale cached score")
+        return stale["property_id"], stale["vulnerability_score"]
 
 
 def _build_address_from_row(row: dict) -> str:
@@ -184,21 +331,10 @@ def _enrich_from_mock(row: dict, mock_pred: dict, mock_prop: dict) -> dict:
     }
 
 
-def _run_real_pipeline(df: pd.DataFrame, include_vulnerability: bool) -> tuple:
-    from ml_pipeline.clean import clean_table
-    from ml_pipeline.rules import apply_evaluation
-    from ml_pipeline.features import engineer_features
-    from ml_pipeline.preprocess import preprocess_submission_data
-    from ml_pipeline.shap_utils import prop_shap
-    from ml_pipeline.model import predict_xgboost_model
-
-    df_clean = clean_table(df)
-    df_rules = apply_evaluation(df_clean, {})
-    vul_weight = 0.6 if include_vulnerability else 0.0
-    df_feat  = engineer_features(df_rules, {}, vul_weight)
-    df_proc  = preprocess_submission_data(df_feat)
-    df_shap_local, df_shap_global = prop_shap(df_proc)
-    preds_raw = predict_xgboost_model(df_feat, df_proc)
+def _run_real_pipeline(df: pd.DataFrame, include_vulnerability: bool, model_version: Optional[str] = None) -> tuple:
+    # Resident model from the registry: imported, loaded and warmed once per process
+    model = model_registry.get(model_version)
+    preds_raw, df_shap_global, df_shap_local, stages = model.run(df, include_vulnerability)
 
     if isinstance(preds_raw, pd.DataFrame):
         preds_raw = preds_raw.to_dict(orient="records")
@@ -207,7 +343,7 @@ def _run_real_pipeline(df: pd.DataFrame, include_vulnerability: bool) -> tuple:
     elif isinstance(preds_raw, np.generic):
         preds_raw = [preds_raw.item()]
 
-    return preds_raw, df_shap_global, df_shap_local
+    return preds_raw, df_shap_global, df_shap_local, {"model": model.describe(), "stages": stages}
 
 
 def _build_predictions(preds_raw: list, is_final: bool) -> list:
@@ -232,17 +368,6 @@ def _build_predictions(preds_raw: list, is_final: bool) -> list:
     return predictions
 
 
-# ─── Label helper ─────────────────────────────────────────────────────────────
-
-def _propensity_label(score: float) -> str:
-    """Return tier label based on calculated propensity score."""
-    if score >= 0.70:
-        return "High Propensity"
-    elif score >= LOW_PROPENSITY_THRESHOLD:
-        return "Mid Propensity"
-    return "Low Propensity"
-
-
 # ─── Mock fallback (Run 1) ───────────────────────────────────────────────────
 
 def _mock_fallback(rows: list[dict], is_final: bool) -> dict:
@@ -295,69 +420,200 @@ def _mock_fallback(rows: list[dict], is_final: bool) -> dict:
 
 # ─── Final score pipeline (Run 2) ────────────────────────────────────────────
 
-def _final_score_pipeline(rows: list[dict]) -> dict:
+def _lookup_row(row: dict, max_age: Optional[float] = None) -> tuple:
+    """Resolve (property_id, vulnerability_score) for one row; (None, None) on failure."""
+    sid = row.get("submission_id") or row.get("Submission_id", "")
+    mock_insights = _MOCK_PROPERTY_INSIGHTS.get(sid, {})
+    try:
+        address = _build_address_from_row(row) or mock_insights.get("address", "")
+        if address:
+            property_id, vuln_risk = _fetch_vulnerability_via_api(address, max_age=max_age)
+            print(f"[final_score] API success for {sid}: property_id={property_id}, vuln={vuln_risk}")
+            return property_id, vuln_risk
+        _count_fallback("final_score", "no_address", f"no address for {sid}", stage="lookup")
+    except Exception as api_err:
+        print(f"[final_score] API failed for {sid}: {api_err} — using mock fallback")
+        _count_fallback("final_score", "lookup_error", f"{type(api_err).__name__}: {api_err}", stage="lookup")
+    return None, None
+
+
+def _resolve_vulnerabilities(rows: list[dict], deadline: float = ML_LOOKUP_DEADLINE_S,
+                             max_age: Optional[float] = None) -> list[tuple]:
+    """
+    Run _lookup_row for every row, returning results in input order.
+    With ML_LOOKUP_CONCURRENCY > 1 the rows are fanned out over the shared lookup
+    pool, at most ML_LOOKUP_CONCURRENCY at a time per batch, so one large batch
+    cannot take every thread. Rows still unresolved when the batch deadline
+    expires come back as (None, None) and take the mock fallback; rows that
+    only reach a thread after the deadline are skipped without calling upstream.
+    """
+    deadline_at = time.monotonic() + deadline
+    if ML_LOOKUP_CONCURRENCY <= 1:
+        resolved = []
+        skipped = 0
+        for row in rows:
+            if time.monotonic() > deadline_at:
+                resolved.append((None, None))
+                skipped += 1
+                continue
+            resolved.append(_lookup_row(row, max_age))
+        if skipped:
+            _count_fallback("final_score", "lookup_deadline", f"deadline of {deadline}s hit", stage="lookup", n=skipped)
+        return resolved
+
+    slots = threading.BoundedSemaphore(ML_LOOKUP_CONCURRENCY)
+
+    def _bounded_lookup(row: dict):
+        try:
+            if time.monotonic() >= deadline_at:
+                return None         # expired while queued: don't start upstream work
+            return _lookup_row(row, max_age)
+        finally:
+            slots.release()
+
+    futures = {}
+    for i, row in enumerate(rows):
+        if not slots.acquire(timeout=max(0.0, deadline_at - time.monotonic())):
+            break
+        futures[_lookup_pool.submit(_bounded_lookup, row)] = i
+    done, _ = wait(futures, timeout=max(0.0, deadline_at - time.monotonic()))
+
+    resolved = [(None, None)] * len(rows)
+    missed = len(rows)
+    for future in done:
+        result = future.result()
+        if result is not None:
+            resolved[futures[future]] = result
+            missed -= 1
+    if missed:
+        # rows still running finish in the background and only warm the cache
+        print(f"[final_score] deadline of {deadline}s hit, {missed} row(s) use mock fallback")
+        _count_fallback("final_score", "lookup_deadline", f"deadline of {deadline}s hit", stage="lookup", n=missed)
+    return resolved
+
+
+def _final_weights(weights: Optional[dict]) -> tuple[float, float]:
+    """
+    (vulnerability, preliminary) weights from MLRequest.weights. Giving only
+    one of the two makes the other its complement, so the blend still sums
+    to 1. Raises ValueError on negative or non-numeric values.
+    """
+    weights = weights or {}
+    try:
+        if "vulnerability" in weights:
+            w_vuln = float(weights["vulnerability"])
+            w_prelim = float(weights.get("preliminary", 1.0 - w_vuln))
+        elif "preliminary" in weights:
+            w_prelim = float(weights["preliminary"])
+            w_vuln = 1.0 - w_prelim
+        else:
+            w_vuln, w_prelim = DEFAULT_FINAL_WEIGHTS["vulnerability"], DEFAULT_FINAL_WEIGHTS["preliminary"]
+    except (TypeError, ValueError):
+        raise ValueError("weights.vulnerability and weights.preliminary must be numbers")
+    if not np.isfinite([w_vuln, w_prelim]).all():
+        raise ValueError("weights.vulnerability and weights.preliminary must be finite numbers")
+    if w_vuln < 0 or w_prelim < 0:
+        raise ValueError("weights.vulnerability and weights.preliminary must be non-negative")
+    return w_vuln, w_prelim
+
+
+_TIER_LABELS = np.array([f"{tier} Propensity" for tier in TIERS])
+
+
+def _score_final(prelim: np.ndarray, vuln: np.ndarray, w_vuln: float, w_prelim: float) -> tuple:
+    """
+    Columnar Run 2 scoring: final probability, tier label and below-threshold
+    flag for the whole batch in one vectorized pass.
+    """
+    raw = ((100.0 - vuln) / 100.0) * w_vuln + prelim * w_prelim
+    # Python's round, not np.round: np.round scales by 1000 first and can land
+    # on the other side of a tie (0.0685 → 0.068 instead of 0.069)
+    final = np.fromiter((round(x, 3) for x in raw.tolist()), dtype=np.float64, count=len(raw))
+    tier = (final >= LOW_PROPENSITY_THRESHOLD).astype(np.intp) + (final >= HIGH_PROPENSITY_THRESHOLD)
+    return final, _TIER_LABELS[tier], final < LOW_PROPENSITY_THRESHOLD
+
+
+def _final_score_pipeline(rows: list[dict], max_staleness: Optional[float] = None,
+                          weights: Optional[dict] = None) -> dict:
     """
     Run 2 — No ML modelling.
-    For each row:
-      1. Try Property API (Geoapify → /add_property → /get_vulnerability_score)
+      1. Try Property API (Geoapify → /add_property → /get_vulnerability_score),
+         rows are looked up concurrently (see _resolve_vulnerabilities) and
+         served from the vulnerability cache when fresher than max_staleness
       2. On failure, fall back to mock vulnerability score + mock property_id
-      3. Apply formula: final = ((100 - vuln)/100)*0.6 + prelim*0.4
+      3. Score the batch column-wise (_score_final):
+         final = ((100 - vuln)/100)*w_vulnerability + prelim*w_preliminary,
+         0.6 / 0.4 unless `weights` overrides them
     Returns property_id so the frontend View button can link to PropertyInsights.
     """
-    predictions = []
-    for row in rows:
-        sid = row.get("submission_id") or row.get("Submission_id", "")
-        mock_pred = _MOCK_PREDICTION_MAP.get(sid)
-        mock_prop = _MOCK_PROPERTY_MAP.get(sid)
-        mock_insights = _MOCK_PROPERTY_INSIGHTS.get(sid, {})
-
-        prelim_score = row.get("quote_propensity") or (
-            mock_pred["quote_propensity_probability"] if mock_pred else 0.5
-        )
-
-        vuln_risk = None
-        property_id = None
-        try:
-            address = _build_address_from_row(row) or mock_insights.get("address", "")
-            if address:
-                property_id, vuln_risk = _fetch_vulnerability_via_api(address)
-                print(f"[final_score] API success for {sid}: property_id={property_id}, vuln={vuln_risk}")
-        except Exception as api_err:
-            print(f"[final_score] API failed for {sid}: {api_err} — using mock fallback")
-
-        if vuln_risk is None:
-            vuln_risk = mock_pred.get("property_vulnerability_risk", 50) if mock_pred else 50
-        if property_id is None:
-            property_id = mock_insights.get("property_id", mock_prop.get("propertyId", "") if mock_prop else "")
-
-        vuln_normalized = (100 - vuln_risk) / 100.0
-        final_prob = round((vuln_normalized * 0.6) + (float(prelim_score) * 0.4), 3)
-        final_label = _propensity_label(final_prob)
-
-        entry = {
+    w_vuln, w_prelim = _final_weights(weights)
+    timer = StageTimer(len(rows))
+    with timer.stage("lookup"):
+        resolved = _resolve_vulnerabilities(rows, max_age=max_staleness)
+
+    n = len(rows)
+    sids, property_ids, vuln_risks = [None] * n, [None] * n, [None] * n
+    prelim = np.empty(n, dtype=np.float64)
+    fallback_rows = 0
+    with timer.stage("score"):
+        for i, (row, (property_id, vuln_risk)) in enumerate(zip(rows, resolved)):
+            sid = row.get("submission_id") or row.get("Submission_id", "")
+            mock_pred = _MOCK_PREDICTION_MAP.get(sid)
+
+            prelim[i] = float(row.get("quote_propensity") or (
+                mock_pred["quote_propensity_probability"] if mock_pred else 0.5
+            ))
+            if vuln_risk is None:
+                fallback_rows += 1
+                vuln_risk = mock_pred.get("property_vulnerability_risk", 50) if mock_pred else 50
+            if property_id is None:
+                mock_prop = _MOCK_PROPERTY_MAP.get(sid)
+                property_id = _MOCK_PROPERTY_INSIGHTS.get(sid, {}).get(
+                    "property_id", mock_prop.get("propertyId", "") if mock_prop else ""
+                )
+            sids[i], property_ids[i], vuln_risks[i] = sid, property_id, vuln_risk
+
+        vuln = np.asarray(vuln_risks, dtype=np.float64)
+        final, labels, below = _score_final(prelim, vuln, w_vuln, w_prelim)
+
+    predictions = [
+        {
             "submission_id":              sid,
             "property_insight_id":        property_id,
             "property_vulnerability_risk": vuln_risk,
-            "quote_propensity":          final_prob,
-            "quote_propensity_label":    final_label,
+            "quote_propensity":          prob,
+            "quote_propensity_label":    label,
+            "is_below_threshold":        flag,
         }
-        predictions.append(entry)
+        for sid, property_id, vuln_risk, prob, label, flag in zip(
+            sids, property_ids, vuln_risks, final.tolist(), labels.tolist(), below.tolist()
+        )
+    ]
 
     return {
         "row_count":   len(predictions),
         "predictions": predictions,
         "shap_global": MOCK_SHAP_VALUES,
         "shap_local":  [],
+        "_run":        {"pipeline": "final_score", "stages": timer.stages, "fallback_rows": fallback_rows},
     }
 
 
 # ─── Core dispatcher ──────────────────────────────────────────────────────────
 
-def _run_pipeline(rows: list[dict], is_final: bool) -> dict:
-    """Try real ML pipeline; fall back to mock on any error."""
+def _run_pipeline(rows: list[dict], is_final: bool, model_version: Optional[str] = None) -> dict:
+    """
+    Try real ML pipeline; fall back to mock on any error. Either way the
+    result carries a "_run" report (stage timings, and the fallback reason if
+    one was taken) for the caller to pass to _record_run.
+    """
+    pipeline = "final" if is_final else "preliminary"
     try:
         df = pd.DataFrame(rows)
-        preds_raw, df_shap_global, df_shap_local = _run_real_pipeline(df, include_vulnerability=is_final)
+        preds_raw, df_shap_global, df_shap_local, run_info = _run_real_pipeline(
+            df, include_vulnerability=is_final, model_version=model_version,
+        )
+        run_info["pipeline"] = pipeline
         predictions = _build_predictions(preds_raw, is_final)
         shap_global = df_shap_global.to_dict(orient="records") if isinstance(df_shap_global, pd.DataFrame) else (df_shap_global or MOCK_SHAP_VALUES)
         shap_local  = df_shap_local.to_dict(orient="records")  if isinstance(df_shap_local,  pd.DataFrame) else []
@@ -366,14 +622,184 @@ def _run_pipeline(rows: list[dict], is_final: bool) -> dict:
             "predictions": predictions,
             "shap_global": shap_global,
             "shap_local":  shap_local,
+            "_run":        run_info,
         }
     except Exception as exc:
         print(f"[ml.py] Real pipeline unavailable ({exc!r}), using mock fallback.")
-        return _mock_fallback(rows, is_final)
+        if isinstance(exc, ModelUnavailable):
+            fallback, stages = {"reason": "model_unavailable", "stage": ""}, {}
+        elif isinstance(exc, StageFailed):
+            fallback, stages = {"reason": "stage_error", "stage": exc.stage}, exc.stages
+        else:
+            fallback, stages = {"reason": "pipeline_error", "stage": ""}, {}
+        fallback["error"] = f"{type(exc.__cause__ or exc).__name__}: {exc.__cause__ or exc}"
+        out = _mock_fallback(rows, is_final)
+        out["_run"] = {"pipeline": pipeline, "stages": stages, "fallback": fallback}
+        return out
+
+
+def _count_fallback(pipeline: str, reason: str, error: str, stage: str = "", n: int = 1) -> None:
+    _FALLBACKS.labels(pipeline=pipeline, reason=reason, stage=stage).inc(n)
+    with _fallback_lock:
+        _fallback_errors[(pipeline, reason, stage)] = {"error": error, "at": time.time()}
+
+
+def _record_run(out: dict, include_timings: bool = False) -> dict:
+    """
+    Strip the worker's run report from a pipeline result and fold it into the
+    metrics (and the model registry). With include_timings the report is
+    returned to the caller as "timings".
+    """
+    run_info = out.pop("_run", None)
+    if run_info:
+        if run_info.get("model"):
+            model_registry.record(run_info["pipeline"], run_info["stages"], run_info["model"])
+        else:
+            record_stages(run_info["pipeline"], run_info["stages"])
+        fallback = run_info.get("fallback")
+        if fallback:
+            _count_fallback(run_info["pipeline"], fallback["reason"], fallback["error"], fallback["stage"])
+        if include_timings:
+            out["timings"] = run_info
+    return out
+
+
+# Version new CPU-pool workers preload; /models/swap keeps it current
+_preload_version = None
+
+
+def warm_models() -> None:
+    """
+    Startup hook: every CPU-pool worker preloads the active model as it starts,
+    and one worker is started now so the first request doesn't pay for it.
+    """
+    global _preload_version
+    _preload_version = shared_version(model_registry.active_version)
+    cpu_pool.set_initializer(preload_shared_version, _preload_version)
+    if ML_MODEL_PRELOAD:
+        threading.Thread(target=cpu_pool.call, args=(preload_model,), name="model-preload", daemon=True).start()
+
+
+# ─── Background jobs ──────────────────────────────────────────────────────────
+
+def _iter_chunks(rows: list[dict], size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _merge_shap_global(parts: list[tuple[int, list]]) -> list:
+    """Row-weighted mean of per-chunk global SHAP importances, sorted descending."""
+    if not parts:
+        return MOCK_SHAP_VALUES
+    if len(parts) == 1 or all(records == parts[0][1] for _, records in parts):
+        return parts[0][1]
+    totals: dict[str, float] = {}
+    weight = 0
+    for n_rows, records in parts:
+        for rec in records:
+            if "feature" not in rec or "mean_abs_shap" not in rec:
+                return parts[0][1]
+            totals[rec["feature"]] = totals.get(rec["feature"], 0.0) + rec["mean_abs_shap"] * n_rows
+        weight += n_rows
+    merged = [{"feature": f, "mean_abs_shap": total / weight} for f, total in totals.items()]
+    return sorted(merged, key=lambda r: r["mean_abs_shap"], reverse=True)
+
+
+def _preliminary_job(payload: dict, emit) -> dict:
+    rows = payload["rows"]
+    parts = []
+    processed = 0
+    for chunk in _iter_chunks(rows, ML_JOB_CHUNK_SIZE):
+        out = _record_run(cpu_pool.call(_run_pipeline, chunk, False, model_registry.active_version))
+        processed += len(chunk)
+        parts.append((len(chunk), out["shap_global"]))
+        emit({"predictions": out["predictions"], "shap_local": out["shap_local"]}, processed)
+    return {"row_count": processed, "shap_global": _merge_shap_global(parts)}
+
+
+def _final_score_job(payload: dict, emit) -> dict:
+    rows = payload["rows"]
+    processed = 0
+    for chunk in _iter_chunks(rows, ML_JOB_CHUNK_SIZE):
+        out = _record_run(_final_score_pipeline(
+            chunk, max_staleness=payload.get("max_staleness_s"), weights=payload.get("weights"),
+        ))
+        processed += len(chunk)
+        emit({"predictions": out["predictions"], "shap_local": out["shap_local"]}, processed)
+    return {"row_count": processed, "shap_global": MOCK_SHAP_VALUES}
+
+
+job_engine.register("preliminary", _preliminary_job)
+job_engine.register("final_score", _final_score_job)
 
 
 # ─── Endpoints ────────────────────────────────────────────────────────────────
 
+async def _offload(pool, fn, *args):
+    """Run a blocking pipeline stage on a worker pool; 503 when the pool is full."""
+    try:
+        return await pool.run(fn, *args)
+    except PoolSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+
+
+@router.get("/executors")
+def get_executor_stats():
+    """Pool sizes, active workers and queue depth for the ML worker pools."""
+    return {"pools": pool_stats()}
+
+
+class ModelSwapRequest(BaseModel):
+    version: str = Field(min_length=1, max_length=255)
+
+
+@router.get("/models")
+def get_model_status():
+    """Active model version, load/warm-up time and per-stage inference latency."""
+    return model_registry.status()
+
+
+@router.post("/models/swap")
+async def swap_model(payload: ModelSwapRequest):
+    """
+    Hot-swap the Run 1 model. The version is loaded and warmed on a pool
+    worker first; only if that succeeds does it become active. Other workers
+    switch on their next request.
+    """
+    try:
+        report = await _offload(cpu_pool, load_model_version, payload.version)
+    except ModelUnavailable as exc:
+        raise HTTPException(status_code=409, detail=f"Model version '{payload.version}' failed to load: {exc}")
+    model_registry.active_version = payload.version
+    if _preload_version is not None:
+        _preload_version.value = payload.version.encode()
+    return {"active_version": payload.version, "loaded": report}
+
+
+@router.get("/metrics")
+def get_pipeline_metrics():
+    """
+    Stage-timing histograms (wall time, rows/sec, peak memory) for every
+    pipeline stage, fallback counters, and the latest error behind each
+    fallback reason.
+    """
+    with _fallback_lock:
+        errors = [
+            {"pipeline": pipeline, "reason": reason, "stage": stage, **info}
+            for (pipeline, reason, stage), info in _fallback_errors.items()
+        ]
+    return {"metrics": metrics.snapshot("ml_"), "fallback_errors": errors}
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters for the external lookup caches."""
+    return {
+        "geocode":       _geocode_cache.stats(),
+        "vulnerability": {**_vulnerability_cache.stats(), "coalesced": _vuln_flight.coalesced},
+    }
+
+
 @router.post("/submissions")
 async def run_preliminary_predictions(payload: MLRequest):
     """
@@ -381,7 +807,62 @@ async def run_preliminary_predictions(payload: MLRequest):
     """
     if not payload.rows:
         raise HTTPException(status_code=400, detail="No rows provided in request body.")
-    return _run_pipeline(payload.rows, is_final=False)
+    version = model_registry.active_version
+    out = await _offload(cpu_pool, _run_pipeline, payload.rows, False, version)
+    return json_response(_record_run(out, payload.include_timings))
+
+
+@router.post("/submissions/stream")
+async def stream_preliminary_predictions(payload: MLRequest):
+    """
+    Run 1 as NDJSON: one {"chunk_index", "predictions", "shap_local"} line per
+    ML_STREAM_CHUNK_SIZE rows as each chunk is scored, then a
+    {"row_count", "shap_global"} summary line (plus "timings" with
+    include_timings). Admission is decided on the first chunk (503 when the
+    CPU pool is full); later chunks wait for a worker. A failure after the
+    first chunk ends the stream with an {"error": ...} line.
+    """
+    if not payload.rows:
+        raise HTTPException(status_code=400, detail="No rows provided in request body.")
+    return await _stream_predictions(payload.rows, model_registry.active_version, payload.include_timings)
+
+
+async def _stream_predictions(rows: list[dict], version: Optional[str], include_timings: bool) -> StreamingResponse:
+    chunks = _iter_chunks(rows, ML_STREAM_CHUNK_SIZE)
+    # Score the first chunk before answering so a saturated pool is still a 503.
+    # Once the response has started, later chunks wait for a pool slot instead.
+    first = next(chunks)
+    first_out = await _offload(cpu_pool, _run_pipeline, first, False, version)
+
+    async def ndjson():
+        parts, timings = [], []
+        processed = 0
+        try:
+            for index, chunk in enumerate(chain([first], chunks)):
+                if index == 0:
+                    out = first_out
+                else:
+                    out = await run_in_threadpool(cpu_pool.call, _run_pipeline, chunk, False, version)
+                out = _record_run(out, include_timings)
+                processed += len(chunk)
+                parts.append((len(chunk), out["shap_global"]))
+                if include_timings:
+                    timings.append(out["timings"])
+                line = {"chunk_index": index, "predictions": out["predictions"], "shap_local": out["shap_local"]}
+                yield dumps(line) + b"\n"
+        except Exception as exc:
+            yield dumps({"error": f"{type(exc).__name__}: {exc}", "row_count": processed}) + b"\n"
+            return
+        summary = {"row_count": processed, "shap_global": _merge_shap_global(parts)}
+        if include_timings:
+            summary["timings"] = timings
+        yield dumps(summary) + b"\n"
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers=STREAM_HEADERS,
+    )
 
 
 @router.post("/final_score")
@@ -394,6 +875,7 @@ async def run_final_predictions(payload: MLRequest):
     vulnerability scores.
 
     Applies: final = ((100 - vulnerability) / 100) * 0.6 + preliminary * 0.4
+    (weights overridable via {"weights": {"vulnerability": w, "preliminary": w}})
 
     Returns property_id so the frontend View button can link to PropertyInsights.
     """
@@ -402,4 +884,135 @@ async def run_final_predictions(payload: MLRequest):
             status_code=400,
             detail="No rows provided. BPO-excluded properties must be filtered before calling /final_score."
         )
-    return _final_score_pipeline(payload.rows)
+    try:
+        _final_weights(payload.weights)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    out = await _offload(io_pool, _final_score_pipeline, payload.rows, payload.max_staleness_s, payload.weights)
+    return json_response(_record_run(out, payload.include_timings))
+
+
+# ─── Job endpoints ────────────────────────────────────────────────────────────
+
+@router.post("/jobs/submissions", status_code=202)
+def submit_preliminary_job(payload: MLRequest):
+    """Queue Run 1 as a background job; returns the job document immediately."""
+    if not payload.rows:
+        raise HTTPException(status_code=400, detail="No rows provided in request body.")
+    return job_engine.submit("preliminary", payload.model_dump(), len(payload.rows))
+
+
+@router.post("/jobs/final_score", status_code=202)
+def submit_final_score_job(payload: MLRequest):
+    """Queue Run 2 as a background job; returns the job document immediately."""
+    if not payload.rows:
+        raise HTTPException(
+            status_code=400,
+            detail="No rows provided. BPO-excluded properties must be filtered before calling /final_score."
+        )
+    try:
+        _final_weights(payload.weights)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return job_engine.submit("final_score", payload.model_dump(), len(payload.rows))
+
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = job_engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Job status and progress (processed_rows / total_rows)."""
+    return _get_job_or_404(job_id)
+
+
+@router.get("/jobs/{job_id}/predictions")
+def get_job_predictions(job_id: str, after_chunk: int = -1):
+    """Partial output: chunks stored after `after_chunk`, usable while the job is still running."""
+    job = _get_job_or_404(job_id)
+    chunks = job_engine.chunks(job_id, after=after_chunk)
+    return json_response({
+        **job,
+        "chunks": [{"chunk_index": idx, **chunk} for idx, chunk in chunks],
+    })
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """Final output in the same shape as the synchronous endpoints."""
+    job = _get_job_or_404(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    result = job_engine.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, result not ready")
+    return json_response(result)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events stream of job progress. Replays chunks stored so far,
+    then pushes `chunk` events live and ends with `completed` or `failed`.
+    Every ML_JOB_EVENTS_POLL_S without an event it also re-reads the store, so
+    a job running in another app process is followed too.
+    """
+    await run_in_threadpool(_get_job_or_404, job_id)
+    # subscribe before the snapshot so no chunk falls between the two
+    sub = bus.subscribe(job_topic(job_id))
+
+    async def event_stream():
+        last_chunk = -1
+
+        async def catch_up() -> tuple[list[str], Optional[dict]]:
+            """Stored chunks after last_chunk, and the terminal event if the job has finished."""
+            nonlocal last_chunk
+            # read the status first: once a job has finished, every chunk is stored
+            terminal = await run_in_threadpool(job_engine.terminal_event, job_id)
+            messages = []
+            for idx, chunk in await run_in_threadpool(job_engine.chunks, job_id, last_chunk):
+                messages.append(sse_message("chunk", {"chunk_index": idx, **chunk}))
+                last_chunk = idx
+            return messages, terminal
+
+        try:
+            messages, terminal = await catch_up()
+            for message in messages:
+                yield message
+            job = await run_in_threadpool(job_engine.get, job_id)
+            yield sse_message("status", job)
+            if terminal is not None:
+                yield sse_message(terminal["type"], terminal)
+                return
+            while True:
+                event = await sub.get(timeout=ML_JOB_EVENTS_POLL_S)
+                if event is None or event is OVERFLOW:
+                    # quiet (or events were discarded): replay what was missed from the store
+                    messages, terminal = await catch_up()
+                    for message in messages:
+                        yield message
+                    if terminal is not None:
+                        yield sse_message(terminal["type"], terminal)
+                        return
+                    if event is None and not messages:
+                        yield ": keep-alive\n\n"
+                    continue
+                if event["type"] == "chunk":
+                    if event["chunk_index"] <= last_chunk:
+                        continue
+                    last_chunk = event["chunk_index"]
+                yield sse_message(event["type"], event)
+                if event["type"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=STREAM_HEADERS,
+    )
@@ -1,47 +1,96 @@
+import hashlib
 import json
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from database import get_connection
+from database import begin_immediate, get_db
 from ml.mock_runner import run_ml_pipeline
+from routers.properties import get_properties
+from routers.results import assemble_results, cache_results, property_index
+from services.leaderboard import leaderboard
 
 router = APIRouter()
 
 
 class ProcessPayload(BaseModel):
     submissionId: int
+    force: bool = False     # rewrite every property, even if its inputs are unchanged
+
+
+UPSERT_RESULT_SQL = """
+    INSERT INTO process_results
+        (submission_id, property_id, ai_risk, quote_propensity,
+         total_risk_score, shap_values, vulnerability_data, input_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (submission_id, property_id) DO UPDATE SET
+        ai_risk            = excluded.ai_risk,
+        quote_propensity   = excluded.quote_propensity,
+        total_risk_score   = excluded.total_risk_score,
+        shap_values        = excluded.shap_values,
+        vulnerability_data = excluded.vulnerability_data,
+        input_hash         = excluded.input_hash,
+        created_at         = CURRENT_TIMESTAMP
+"""
+
+
+def input_hash(prop: dict) -> str:
+    """Fingerprint of everything the pipeline reads for one property."""
+    encoded = json.dumps(prop, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
 
 
 @router.post("")
-def trigger_process(payload: ProcessPayload):
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
+def trigger_process(payload: ProcessPayload, conn=Depends(get_db)):
+    """
+    Score every catalog property for a submission. Reprocessing is incremental:
+    only properties whose input hash changed (or that are new) go through the
+    pipeline and are upserted; properties gone from the catalog are deleted.
+    All writes land in one transaction.
+    """
+    cursor = conn.cursor()
+
+    # Verify submission exists
+    cursor.execute("SELECT id FROM submissions WHERE id = ?", (payload.submissionId,))
+    if not cursor.fetchone():
+        raise HTTPException(status_code=404, detail="Submission not found")
 
-        # Verify submission exists
+    # Compare on the stable submission key: a row is unchanged only if the same
+    # submission_id was stored under the same catalog id with the same inputs
+    catalog = {str(prop["submission_id"]): prop for prop in get_properties()}
+    hashes = {prop["id"]: input_hash(prop) for prop in catalog.values()}
+    stored = cursor.execute(
+        "SELECT r.property_id, r.input_hash, p.submission_id FROM process_results r "
+        "LEFT JOIN property_ids p ON p.id = r.property_id WHERE r.submission_id = ?",
+        (payload.submissionId,),
+    ).fetchall()
+    current = {
+        row["property_id"]: row["input_hash"]
+        for row in stored
+        if row["submission_id"] in catalog and catalog[row["submission_id"]]["id"] == row["property_id"]
+    }
+    if payload.force:
+        changed = list(hashes)
+    else:
+        changed = [pid for pid, h in hashes.items() if current.get(pid) != h]
+    removed = [row["property_id"] for row in stored if row["property_id"] not in current]
+
+    # Run the ML pipeline outside the write transaction
+    results = run_ml_pipeline(changed) if changed else []
+
+    begin_immediate(cursor, "process")
+    try:
         cursor.execute("SELECT * FROM submissions WHERE id = ?", (payload.submissionId,))
         submission = cursor.fetchone()
         if not submission:
             raise HTTPException(status_code=404, detail="Submission not found")
 
-        # Delete any previous results for this submission
-        cursor.execute(
-            "DELETE FROM process_results WHERE submission_id = ?",
-            (payload.submissionId,)
-        )
-
-        # Run ML pipeline for all 6 properties
-        property_ids = [1, 2, 3, 4, 5, 6]
-        results = run_ml_pipeline(property_ids)
-
-        # Persist results
-        for result in results:
-            cursor.execute(
-                """
-                INSERT INTO process_results
-                    (submission_id, property_id, ai_risk, quote_propensity,
-                     total_risk_score, shap_values, vulnerability_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
+        if removed:
+            cursor.executemany(
+                "DELETE FROM process_results WHERE submission_id = ? AND property_id = ?",
+                [(payload.submissionId, pid) for pid in removed],
+            )
+        cursor.executemany(
+            UPSERT_RESULT_SQL,
+            [
                 (
                     payload.submissionId,
                     result["property_id"],
@@ -50,10 +99,43 @@ def trigger_process(payload: ProcessPayload):
                     result["total_risk_score"],
                     result["shap_values"],
                     result["vulnerability_data"],
-                ),
-            )
+                    hashes[result["property_id"]],
+                )
+                for result in results
+            ],
+        )
+
+        if not results and not removed:
+            conn.rollback()
+            return {
+                "processId": payload.submissionId, "status": "completed", "count": len(hashes),
+                "written": 0, "deleted": 0, "unchanged": len(hashes),
+            }
 
+        # Score once, at write time; GET /api/results only reads it back
+        cursor.execute(
+            "SELECT * FROM process_results WHERE submission_id = ? ORDER BY property_id",
+            (payload.submissionId,),
+        )
+        rows = cursor.fetchall()
+        index = property_index.snapshot()
+        document = assemble_results(submission, rows, index)
+        cursor.execute(
+            "UPDATE submissions SET score = ?, results_version = results_version + 1 WHERE id = ?",
+            (document["score_percentage"], payload.submissionId),
+        )
         conn.commit()
-        return {"processId": payload.submissionId, "status": "completed", "count": len(results)}
-    finally:
-        conn.close()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+    cache_results(payload.submissionId, submission["results_version"] + 1, index.version, document)
+    leaderboard.record(
+        submission["id"], submission["underwriter_name"], document["score_percentage"], submission["created_at"],
+    )
+    return {
+        "processId": payload.submissionId, "status": "completed", "count": len(rows),
+        "written": len(results), "deleted": len(removed),
+        "unchanged": len(rows) - len(results),
+    }
@@ -1,12 +1,23 @@
 import os
 import math
+import base64
+import binascii
+from bisect import bisect_right
+from typing import Optional
 import pandas as pd
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from database import assign_property_ids
+from services.catalog import CatalogSnapshot, FileBackedCatalog
 
 router = APIRouter()
 
-# Letter labels A–F mapped to index
-PROPERTY_LETTERS = ['A', 'B', 'C', 'D', 'E', 'F']
+# Fields that GET /api/properties can filter on (query param → record field)
+FILTER_FIELDS = {
+    "state": "state",
+    "cover_type": "cover_type",
+    "channel": "submission_channel",
+}
+MAX_PAGE_SIZE = 1000
 
 MOCK_PROPERTIES = [
     {
@@ -126,7 +137,8 @@ MOCK_PROPERTIES = [
 ]
 
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-csv_path = os.path.join(base_dir, "Test", "Property_data - AI.csv")
+# PROPERTY_CSV_PATH swaps in another book (e.g. a synthetic one for benchmarks)
+csv_path = os.getenv("PROPERTY_CSV_PATH", os.path.join(base_dir, "Test", "Property_data - AI.csv"))
 
 
 def _clean(value, fallback=None):
@@ -146,46 +158,222 @@ def _normalize_sub_id(value, fallback=None):
     return _clean(value, fallback)
 
 
-@router.get("")
-def get_properties():
+def property_label(property_id: int) -> str:
+    """Display label for a catalog id: 1 → A … 26 → Z, then AA, AB, … (spreadsheet style)."""
+    label = ""
+    n = property_id
+    while n:
+        n, rem = divmod(n - 1, 26)
+        label = chr(ord("A") + rem) + label
+    return label
+
+
+def _merge_with_mock(mock: dict) -> dict:
+    """Demo rows: the first len(MOCK_PROPERTIES) rows are served from the mock overlay."""
+    return {
+        "submission_id": _normalize_sub_id(mock.get("submission_id")),
+        "submission_channel": _clean(mock.get("submission_channel")),
+        "occupancy_type": _clean(mock.get("occupancy_type")),
+        "property_age": _clean(mock.get("property_age")),
+        "property_value": _clean(mock.get("property_value")),
+        "property_county": _clean(mock.get("Property_county")),
+        "cover_type": _clean(mock.get("cover_type")),
+        "building_coverage_limit": _clean(mock.get("building_coverage_limit")),
+        "contents_coverage_limit": _clean(mock.get("contents_coverage_limit")),
+        "broker_company": _clean(mock.get("broker_company")),
+        "broker_email": _clean(mock.get("broker_email")),
+        "applicant_email": _clean(mock.get("Applicant_Email")),
+        "income": _clean(mock.get("income"), mock.get("income", 150000)),
+        "property_past_loss_freq": _clean(mock.get("property_past_loss_freq", 0)),
+        "property_past_claim_amount": _clean(mock.get("property_past_claim_amount", 0)),
+        # Visual/risk fields always from mock
+        "construction_risk": mock.get("construction_risk"),
+        "state": mock.get("state"),
+        "imageUrl": mock.get("imageUrl"),
+        "roofImageUrl": mock.get("roofImageUrl"),
+    }
+
+
+def _from_csv(i: int, record: dict) -> dict:
+    """Rows past the demo set come straight from the CSV; images are added by _with_id()."""
+    return {
+        "submission_id": _normalize_sub_id(record.get("submission_id"), f"ROW{i + 1:06d}"),
+        "submission_channel": _clean(record.get("submission_channel")),
+        "occupancy_type": _clean(record.get("occupancy_type")),
+        "property_age": _clean(record.get("property_age")),
+        "property_value": _clean(record.get("property_value")),
+        "property_county": _clean(record.get("Property_county")),
+        "cover_type": _clean(record.get("cover_type")),
+        "building_coverage_limit": _clean(record.get("building_coverage_limit")),
+        "contents_coverage_limit": _clean(record.get("contents_coverage_limit")),
+        "broker_company": _clean(record.get("broker_company"), ""),
+        "broker_email": _clean(record.get("broker_email"), "broker@uwt.org"),
+        "applicant_email": _clean(record.get("Applicant_Email")),
+        "income": _clean(record.get("income"), 150000),
+        "property_past_loss_freq": _clean(record.get("property_past_loss_freq"), 0),
+        "property_past_claim_amount": _clean(record.get("property_past_claim_amount"), 0),
+        "construction_risk": _clean(record.get("construction_risk")),
+        "state": _clean(record.get("state"), _clean(record.get("Property_state"))),
+    }
+
+
+def _with_id(record: dict, property_id: int) -> dict:
+    """Catalog record under its persisted id; CSV rows cycle through the mock images by id."""
+    merged = {"id": property_id, "propertyId": property_label(property_id), **record}
+    if "imageUrl" not in record:
+        visual = MOCK_PROPERTIES[(property_id - 1) % len(MOCK_PROPERTIES)]
+        merged["imageUrl"] = visual.get("imageUrl")
+        merged["roofImageUrl"] = visual.get("roofImageUrl")
+    return merged
+
+
+def _load_property_records(path: str) -> list[dict]:
+    """
+    Parse the property CSV into catalog records (all rows, duplicates dropped).
+    Each record's id (and its propertyId label) is the persisted id for its
+    submission_id, so it does not move when rows are added or removed.
+    """
+    df = pd.read_csv(path)
+    excel_records = df.to_dict(orient="records")
+
+    merged_records = []
+    seen = set()
+    for record in excel_records:
+        i = len(merged_records)
+        if i < len(MOCK_PROPERTIES):
+            merged_record = _merge_with_mock(MOCK_PROPERTIES[i])
+        else:
+            merged_record = _from_csv(i, record)
+        if merged_record["submission_id"] in seen:
+            print(f"[properties] duplicate submission_id {merged_record['submission_id']} skipped")
+            continue
+        seen.add(merged_record["submission_id"])
+        merged_records.append(merged_record)
+
+    ids = assign_property_ids([str(rec["submission_id"]) for rec in merged_records])
+    return [_with_id(rec, ids[str(rec["submission_id"])]) for rec in merged_records]
+
+
+def _index_properties(records: list[dict]) -> dict:
+    """submission_id → position, plus sorted position lists per filter value."""
+    by_filter: dict[tuple, list[int]] = {}
+    for pos, rec in enumerate(records):
+        for param, field in FILTER_FIELDS.items():
+            value = rec.get(field)
+            if value is not None:
+                by_filter.setdefault((param, str(value).lower()), []).append(pos)
+    return {
+        "by_submission_id": {rec["submission_id"]: pos for pos, rec in enumerate(records)},
+        "by_filter": by_filter,
+    }
+
+
+# Loaded once, rebuilt only when the CSV's mtime/size changes
+property_catalog = FileBackedCatalog(
+    "properties", csv_path, _load_property_records,
+    fallback=lambda: MOCK_PROPERTIES, indexer=_index_properties,
+)
+
+
+def get_properties() -> list[dict]:
+    """Current property records from the in-memory catalog (read-only, shared)."""
+    return property_catalog.records()
+
+
+def find_property(submission_id: str) -> Optional[tuple[int, dict]]:
+    """(position, record) for a submission_id in O(1), or None."""
+    snapshot = property_catalog.snapshot()
+    pos = snapshot.indexes.get("by_submission_id", {}).get(submission_id)
+    if pos is None:
+        return None
+    return pos, snapshot.records[pos]
+
+
+def _encode_cursor(pos: int, submission_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{pos}:{submission_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(snapshot: CatalogSnapshot, cursor: str) -> int:
+    """Position of the last row already returned. Re-anchors on submission_id if the file changed."""
     try:
-        if not os.path.exists(csv_path):
-            return MOCK_PROPERTIES
-
-        df = pd.read_csv(csv_path)
-        excel_records = df.to_dict(orient="records")
-
-        merged_records = []
-        for i, record in enumerate(excel_records[:6]):   # only first 6
-            mock = MOCK_PROPERTIES[i % len(MOCK_PROPERTIES)]
-            merged_record = {
-                "id": i + 1,
-                "propertyId": PROPERTY_LETTERS[i],       # always A–F
-                "submission_id": _normalize_sub_id(mock.get("submission_id")),
-                "submission_channel": _clean(mock.get("submission_channel")),
-                "occupancy_type": _clean(mock.get("occupancy_type")),
-                "property_age": _clean(mock.get("property_age")),
-                "property_value": _clean(mock.get("property_value")),
-                "property_county": _clean(mock.get("Property_county")),
-                "cover_type": _clean(mock.get("cover_type")),
-                "building_coverage_limit": _clean(mock.get("building_coverage_limit")),
-                "contents_coverage_limit": _clean(mock.get("contents_coverage_limit")),
-                "broker_company": _clean(mock.get("broker_company")),
-                "broker_email": _clean(mock.get("broker_email")),
-                "applicant_email": _clean(mock.get("Applicant_Email")),
-                "income": _clean(mock.get("income"), mock.get("income", 150000)),
-                "property_past_loss_freq": _clean(mock.get("property_past_loss_freq", 0)),
-                "property_past_claim_amount": _clean(mock.get("property_past_claim_amount", 0)),
-                # Visual/risk fields always from mock
-                "construction_risk": mock.get("construction_risk"),
-                "state": mock.get("state"),
-                "imageUrl": mock.get("imageUrl"),
-                "roofImageUrl": mock.get("roofImageUrl"),
-            }
-            merged_records.append(merged_record)
-
-        return merged_records
-
-    except Exception as e:
-        print("Error:", e)
-        return MOCK_PROPERTIES
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        pos_str, submission_id = raw.split(":", 1)
+        pos = int(pos_str)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if pos < len(snapshot.records) and snapshot.records[pos]["submission_id"] == submission_id:
+        return pos
+    return snapshot.indexes.get("by_submission_id", {}).get(submission_id, pos)
+
+
+def paginate(snapshot: CatalogSnapshot, limit: int, cursor: Optional[str] = None,
+             filters: Optional[dict] = None) -> tuple[list[dict], Optional[str]]:
+    """
+    One page of records after `cursor`, matching every filter (param → value).
+    Cost is O(log n + page) for zero or one filter; extra filters are checked
+    while walking the smallest matching list.
+    """
+    records = snapshot.records
+    after = _decode_cursor(snapshot, cursor) if cursor else -1
+    active = {k: str(v).lower() for k, v in (filters or {}).items() if v is not None}
+
+    if active:
+        by_filter = snapshot.indexes.get("by_filter", {})
+        candidates = min((by_filter.get((k, v), []) for k, v in active.items()), key=len)
+        start = bisect_right(candidates, after)
+        positions = (candidates[j] for j in range(start, len(candidates)))
+    else:
+        positions = iter(range(after + 1, len(records)))
+
+    page: list[dict] = []
+    last_pos = None
+    for pos in positions:
+        rec = records[pos]
+        if any(str(rec.get(FILTER_FIELDS[k])).lower() != v for k, v in active.items()):
+            continue
+        if len(page) == limit:
+            return page, _encode_cursor(last_pos, records[last_pos]["submission_id"])
+        page.append(rec)
+        last_pos = pos
+    return page, None
+
+
+@router.get("")
+def list_properties(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    state: Optional[str] = None,
+    cover_type: Optional[str] = None,
+    channel: Optional[str] = None,
+):
+    """
+    Property catalog. Without `limit`/`cursor`/filters the whole catalog is
+    returned (ETag-cacheable). With them, one page is returned and the next
+    page's cursor is sent in the X-Next-Cursor header.
+    """
+    snapshot = property_catalog.snapshot()
+    filters = {"state": state, "cover_type": cover_type, "channel": channel}
+    paged = limit is not None or cursor is not None or any(v is not None for v in filters.values())
+
+    if not paged:
+        if request.headers.get("if-none-match") == snapshot.etag:
+            return Response(status_code=304, headers={"ETag": snapshot.etag})
+        response.headers["ETag"] = snapshot.etag
+        response.headers["Cache-Control"] = "no-cache"
+        return snapshot.records
+
+    page, next_cursor = paginate(snapshot, limit or MAX_PAGE_SIZE, cursor, filters)
+    response.headers["X-Catalog-Version"] = snapshot.version
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+
+@router.get("/{submission_id}")
+def get_property(submission_id: str):
+    found = find_property(submission_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Property '{submission_id}' not found")
+    return found[1]
@@ -1,6 +1,14 @@
 import json
-from fastapi import APIRouter, HTTPException
-from database import get_connection
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from database import get_db
+from routers.properties import property_catalog
+from services.cache import LRUCache, register_cache_metrics
+from services.leaderboard import leaderboard
+from services.property_index import PropertyIndex
+from services.propensity import propensity_label
+from services.serialization import dumps, raw_json
 
 router = APIRouter()
 
@@ -267,6 +275,10 @@ MOCK_VULNERABILITY = [
 ]
 
 
+# Catalog rows joined with prediction / local SHAP / vulnerability, keyed by submission_id
+property_index = PropertyIndex(property_catalog, MOCK_PREDICTIONS, MOCK_LOCAL_SHAP, MOCK_VULNERABILITY)
+
+
 def _propensity_to_risk(propensity_label: str) -> str:
     label = propensity_label.lower()
     if "high" in label:
@@ -343,7 +355,8 @@ def _build_mock_results(submission_id, underwriter_name="Demo User", prioritized
 
 def _compute_score(results_list: list) -> float:
     """Compute alignment score from results list (user_selection vs quote_propensity_label).
-    Excluded properties earn +1 if correctly discarded, 0 otherwise. Denominator stays 6.
+    Excluded properties earn +1 if correctly discarded, 0 otherwise. Callers divide by the
+    number of scored properties.
     """
     points = 0.0
     for r in results_list:
@@ -367,86 +380,182 @@ def _compute_score(results_list: list) -> float:
     return points
 
 
+def _result_from_row(row, entry, sid: str, position: int, user_selection) -> dict:
+    """One results entry: stored process_results row joined with the property index."""
+    pred = entry.prediction if entry and entry.prediction else {}
+    # Stored blobs go into the document as raw JSON; vulnerability data is only
+    # parsed when it has to be merged over the catalog's own document.
+    index_vuln = entry.vulnerability if entry else None
+    if not index_vuln:
+        vulnerability = raw_json(row["vulnerability_data"], "{}")
+    else:
+        stored_vuln = json.loads(row["vulnerability_data"]) if row["vulnerability_data"] else {}
+        vulnerability = {**index_vuln, **stored_vuln}
+    return {
+        "submission_id": sid,
+        "property_index": entry.position if entry else position,
+        "user_selection": user_selection,
+        "quote_propensity": row["quote_propensity"],
+        "quote_propensity_label": pred.get("quote_propensity") or propensity_label(row['quote_propensity'] or 0),
+        "total_risk_score": pred.get("total_risk_score", row["total_risk_score"]),
+        "property_vulnerability_risk": pred.get("property_vulnerability_risk"),
+        "construction_risk_score": pred.get("construction_risk"),
+        "locality_risk": pred.get("locality_risk"),
+        "coverage_risk": pred.get("coverage_risk"),
+        "claim_history_risk": pred.get("claim_history_risk"),
+        "property_condition_risk": pred.get("property_condition_risk"),
+        "broker_performance": pred.get("broker_performance"),
+        "property_state": pred.get("property_state", entry.property.get("state") if entry else None),
+        "occupancy_type": pred.get("occupancy_type", entry.property.get("occupancy_type") if entry else None),
+        "cover_type": pred.get("cover_type", entry.property.get("cover_type") if entry else None),
+        "submission_channel": pred.get("submission_channel", entry.property.get("submission_channel") if entry else None),
+        "excluded": pred.get("excluded", False),
+        "exclusion_reason": pred.get("exclusion_reason", None),
+        "exclusion_parameters": pred.get("exclusion_parameters", []),
+        "shap_values": raw_json(row["shap_values"]) if row["shap_values"] else MOCK_SHAP_VALUES,
+        "vulnerability_data": vulnerability,
+    }
+
+
+def score_percentage(results: list) -> float:
+    """Alignment score as a percentage of the scored properties."""
+    return percentage_of_points(_compute_score(results), len(results))
+
+
+def percentage_of_points(points: float, count: int) -> float:
+    """score_percentage from a running _compute_score total over `count` properties."""
+    if not count:
+        return 0.0
+    return round((points / count) * 100, 1)
+
+
+def assemble_results(submission, rows, index=None) -> dict:
+    """
+    Full results document for a processed submission: process_results rows
+    (ordered by property_id) joined with the property index. Pure — callers
+    decide whether to persist the score.
+    """
+    index = index or property_index.snapshot()
+    prioritized_ids = json.loads(submission["prioritized_ids"])
+    discarded_ids   = json.loads(submission["discarded_ids"])
+
+    results = []
+    for i, row in enumerate(rows):
+        entry = index.by_id.get(row["property_id"])
+        sid = entry.submission_id if entry else PROPERTY_ID_TO_SUBMISSION.get(row["property_id"], str(row["property_id"]))
+        user_selection = None
+        if sid in prioritized_ids:
+            user_selection = "prioritized"
+        elif sid in discarded_ids:
+            user_selection = "discarded"
+        results.append(_result_from_row(row, entry, sid, i, user_selection))
+
+    return {
+        "submission_id": str(submission["id"]),
+        "underwriter_name": submission["underwriter_name"],
+        "score_percentage": score_percentage(results),
+        "results": results,
+        "global_shap": MOCK_SHAP_VALUES,
+    }
+
+
+# ─── Result document cache ────────────────────────────────────────────────────
+# Assembled documents are cached as encoded JSON, keyed by submission id and
+# validated against submissions.results_version (bumped by /api/process) and
+# the property index version, so a reprocess or catalog reload invalidates them
+# in every worker without a write on the read path. The one exception is a
+# submission processed before scores were stored, whose score is written once.
+
+RESULTS_CACHE_SIZE = int(os.getenv("RESULTS_CACHE_SIZE", "256"))
+
+_results_cache = LRUCache(RESULTS_CACHE_SIZE)
+register_cache_metrics("results", _results_cache)
+
+
+def results_etag(submission_id, results_version: int, index_version: str) -> str:
+    return f'W/"{submission_id}.{results_version}.{index_version}"'
+
+
+def _encode(document: dict) -> bytes:
+    return dumps(document)
+
+
+def cache_results(submission_id, results_version: int, index_version: str, document: dict) -> bytes:
+    body = _encode(document)
+    _results_cache.put(str(submission_id), time.time(), (results_version, index_version, body))
+    return body
+
+
+def _backfill_score(conn, submission, score: float) -> None:
+    """Persist the score of a submission processed before /api/process stored scores."""
+    updated = conn.execute(
+        "UPDATE submissions SET score = ? WHERE id = ? AND score IS NULL",
+        (score, submission["id"]),
+    ).rowcount
+    conn.commit()
+    if updated:
+        leaderboard.record(submission["id"], submission["underwriter_name"], score, submission["created_at"])
+
+
+def _json_response(body: bytes, etag: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
 @router.get("/{submission_id}")
-def get_results(submission_id: str):
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM submissions WHERE id = ?", (submission_id,))
-        submission = cursor.fetchone()
-        if not submission:
-            # Return mock data keyed to this submission_id
-            return _build_mock_results(submission_id)
-
-        prioritized_ids = json.loads(submission["prioritized_ids"])
-        discarded_ids   = json.loads(submission["discarded_ids"])
-
-        cursor.execute(
-            "SELECT * FROM process_results WHERE submission_id = ? ORDER BY property_id",
-            (submission_id,),
-        )
-        rows = cursor.fetchall()
-
-        if not rows:
-            return _build_mock_results(
-                submission_id,
-                underwriter_name=submission["underwriter_name"],
-                prioritized_ids=prioritized_ids,
-                discarded_ids=discarded_ids,
-            )
-
-        results = []
-        for i, row in enumerate(rows):
-            pid = row["property_id"]
-            submission_id_str = PROPERTY_ID_TO_SUBMISSION.get(pid, str(pid))
-            user_selection = None
-            if submission_id_str in prioritized_ids:
-                user_selection = "prioritized"
-            elif submission_id_str in discarded_ids:
-                user_selection = "discarded"
-
-            pred = MOCK_PREDICTIONS[i % len(MOCK_PREDICTIONS)]
-            results.append({
-                "submission_id": pred["submission_id"],
-                "property_index": i,
-                "user_selection": user_selection,
-                "quote_propensity": row["quote_propensity"],
-                "quote_propensity_label": pred["quote_propensity"],
-                "total_risk_score": pred["total_risk_score"],
-                "property_vulnerability_risk": pred["property_vulnerability_risk"],
-                "construction_risk_score": pred["construction_risk"],
-                "locality_risk": pred["locality_risk"],
-                "coverage_risk": pred["coverage_risk"],
-                "claim_history_risk": pred["claim_history_risk"],
-                "property_condition_risk": pred["property_condition_risk"],
-                "broker_performance": pred["broker_performance"],
-                "property_state": pred["property_state"],
-                "occupancy_type": pred["occupancy_type"],
-                "cover_type": pred["cover_type"],
-                "submission_channel": pred["submission_channel"],
-                "excluded": pred.get("excluded", False),
-                "exclusion_reason": pred.get("exclusion_reason", None),
-                "exclusion_parameters": pred.get("exclusion_parameters", []),
-                "shap_values": json.loads(row["shap_values"]) if row["shap_values"] else MOCK_SHAP_VALUES,
-                "vulnerability_data": {**MOCK_VULNERABILITY[i], **(json.loads(row["vulnerability_data"]) if row["vulnerability_data"] else {})},
-            })
-
-        # Compute score and save to DB
-        points = _compute_score(results)
-        score_pct = round((points / 6.0) * 100, 1)
-        cursor.execute(
-            "UPDATE submissions SET score = ? WHERE id = ?",
-            (score_pct, submission_id)
+def get_results(submission_id: str, request: Request, conn=Depends(get_db)):
+    """
+    Scored results for a submission. Scores are written by /api/process;
+    the only write here is the first read of a submission processed before
+    that, which stores its score. Supports If-None-Match against the
+    returned ETag.
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM submissions WHERE id = ?", (submission_id,))
+    submission = cursor.fetchone()
+    if not submission:
+        # Return mock data keyed to this submission_id
+        etag = f'W/"{submission_id}.mock"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return _json_response(_encode(_build_mock_results(submission_id)), etag)
+
+    index = property_index.snapshot()
+    results_version = submission["results_version"]
+    etag = results_etag(submission["id"], results_version, index.version)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cached = _results_cache.get(str(submission["id"]))
+    if cached is not None:
+        cached_version, cached_index_version, body = cached[1]
+        if cached_version == results_version and cached_index_version == index.version:
+            return _json_response(body, etag)
+
+    cursor.execute(
+        "SELECT * FROM process_results WHERE submission_id = ? ORDER BY property_id",
+        (submission["id"],),
+    )
+    rows = cursor.fetchall()
+
+    if not rows:
+        document = _build_mock_results(
+            submission_id,
+            underwriter_name=submission["underwriter_name"],
+            prioritized_ids=json.loads(submission["prioritized_ids"]),
+            discarded_ids=json.loads(submission["discarded_ids"]),
         )
-        conn.commit()
-
-        return {
-            "submission_id": submission_id,
-            "underwriter_name": submission["underwriter_name"],
-            "score_percentage": score_pct,
-            "results": results,
-            "global_shap": MOCK_SHAP_VALUES,
-        }
-    finally:
-        conn.close()
+    else:
+        document = assemble_results(submission, rows, index)
+        if submission["score"] is None:
+            _backfill_score(conn, submission, document["score_percentage"])
+        else:
+            # the stored score is what the leaderboard ranks by
+            document["score_percentage"] = submission["score"]
+
+    body = cache_results(submission["id"], results_version, index.version, document)
+    return _json_response(body, etag)
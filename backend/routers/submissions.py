@@ -1,11 +1,18 @@
 import json
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from database import get_connection
+from database import get_connection, get_db
+from services.events import OVERFLOW, STREAM_HEADERS, bus, sse_message
 
 router = APIRouter()
 
+# Topic create_submission publishes to; /stream subscribers receive every new submission
+SUBMISSIONS_TOPIC = "submissions"
+STREAM_KEEPALIVE_S = 15
+
 
 class SubmissionPayload(BaseModel):
     underwriter_name: str
@@ -13,8 +20,25 @@ class SubmissionPayload(BaseModel):
     discarded_ids: List[str]
 
 
+def _submission_from_row(row) -> dict:
+    return {
+        "id": row["id"],
+        "underwriter_name": row["underwriter_name"],
+        "prioritized_ids": json.loads(row["prioritized_ids"]),
+        "discarded_ids": json.loads(row["discarded_ids"]),
+        "created_at": row["created_at"],
+    }
+
+
+def _latest_submission(conn) -> Optional[dict]:
+    row = conn.execute(
+        "SELECT * FROM submissions ORDER BY created_at DESC LIMIT 1"
+    ).fetchone()
+    return _submission_from_row(row) if row else None
+
+
 @router.post("")
-def create_submission(payload: SubmissionPayload):
+def create_submission(payload: SubmissionPayload, conn=Depends(get_db)):
     # Validate no overlap between prioritized and discarded
     overlap = set(payload.prioritized_ids) & set(payload.discarded_ids)
     if overlap:
@@ -23,70 +47,102 @@ def create_submission(payload: SubmissionPayload):
             detail=f"Property IDs cannot be both prioritized and discarded: {list(overlap)}"
         )
 
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO submissions (underwriter_name, prioritized_ids, discarded_ids)
-            VALUES (?, ?, ?)
-            """,
-            (
-                payload.underwriter_name,
-                json.dumps(payload.prioritized_ids),
-                json.dumps(payload.discarded_ids),
-            ),
-        )
-        conn.commit()
-        submission_id = cursor.lastrowid
-        return {
-            "id": submission_id,
-            "underwriter_name": payload.underwriter_name,
-            "prioritized_ids": payload.prioritized_ids,
-            "discarded_ids": payload.discarded_ids,
-            "created_at": None,  # populated on next fetch
-        }
-    finally:
-        conn.close()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO submissions (underwriter_name, prioritized_ids, discarded_ids)
+        VALUES (?, ?, ?)
+        RETURNING id, created_at
+        """,
+        (
+            payload.underwriter_name,
+            json.dumps(payload.prioritized_ids),
+            json.dumps(payload.discarded_ids),
+        ),
+    )
+    inserted = cursor.fetchone()
+    conn.commit()
+    submission_id = inserted["id"]
+
+    # Push to every open dashboard (/api/submissions/stream)
+    bus.publish(SUBMISSIONS_TOPIC, {
+        "id": submission_id,
+        "underwriter_name": payload.underwriter_name,
+        "prioritized_ids": payload.prioritized_ids,
+        "discarded_ids": payload.discarded_ids,
+        "created_at": inserted["created_at"],
+    })
+    return {
+        "id": submission_id,
+        "underwriter_name": payload.underwriter_name,
+        "prioritized_ids": payload.prioritized_ids,
+        "discarded_ids": payload.discarded_ids,
+        "created_at": inserted["created_at"],
+    }
 
 
 @router.get("/latest")
-def get_latest_submission():
+def get_latest_submission(conn=Depends(get_db)):
+    return _latest_submission(conn)
+
+
+def _read_latest() -> Optional[dict]:
     conn = get_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM submissions ORDER BY created_at DESC LIMIT 1"
-        )
-        row = cursor.fetchone()
-        if not row:
-            return None
-        return {
-            "id": row["id"],
-            "underwriter_name": row["underwriter_name"],
-            "prioritized_ids": json.loads(row["prioritized_ids"]),
-            "discarded_ids": json.loads(row["discarded_ids"]),
-            "created_at": row["created_at"],
-        }
+        return _latest_submission(conn)
     finally:
         conn.close()
 
 
+@router.get("/stream")
+async def stream_submissions():
+    """
+    Server-Sent Events feed replacing /latest polling. Sends the current
+    latest submission once as `latest`, then a `submission` event for every
+    new one.
+
+    The event bus is per process: with several app workers, a submission
+    created on another worker is not pushed here. Every STREAM_KEEPALIVE_S
+    without an event the stream re-reads the latest submission, so such a
+    submission arrives at most that late; otherwise a keep-alive comment is sent.
+    """
+    # subscribe before the snapshot so a submission created in between is not missed
+    sub = bus.subscribe(SUBMISSIONS_TOPIC)
+
+    async def event_stream():
+        try:
+            latest = await run_in_threadpool(_read_latest)
+            yield sse_message("latest", latest)
+            while True:
+                event = await sub.get(timeout=STREAM_KEEPALIVE_S)
+                if event is None or event is OVERFLOW:
+                    # quiet (maybe created on another worker) or events were discarded:
+                    # the dashboard only needs the newest one
+                    quiet = event is None
+                    event = await run_in_threadpool(_read_latest)
+                    if event is None or (latest and event["id"] <= latest["id"]):
+                        if quiet:
+                            yield ": keep-alive\n\n"
+                        continue
+                if latest and event["id"] <= latest["id"]:
+                    continue
+                latest = event
+                yield sse_message("submission", event)
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=STREAM_HEADERS,
+    )
+
+
 @router.get("/{submission_id}")
-def get_submission(submission_id: int):
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM submissions WHERE id = ?", (submission_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Submission not found")
-        return {
-            "id": row["id"],
-            "underwriter_name": row["underwriter_name"],
-            "prioritized_ids": json.loads(row["prioritized_ids"]),
-            "discarded_ids": json.loads(row["discarded_ids"]),
-            "created_at": row["created_at"],
-        }
-    finally:
-        conn.close()
+def get_submission(submission_id: int, conn=Depends(get_db)):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM submissions WHERE id = ?", (submission_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return _submission_from_row(row)
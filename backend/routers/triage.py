@@ -1,13 +1,12 @@
 import os
-import smtplib
 from datetime import date
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from string import Template
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional
-from routers.properties import get_properties
-from routers.results import MOCK_PREDICTIONS, MOCK_LOCAL_SHAP, MOCK_VULNERABILITY
+from typing import Literal, Optional
+from routers.results import property_index
+from services.mail import mail_outbox
+from services.templates import EmailTemplate, InvalidHeaderError, RenderedEmail, format_address
 
 router = APIRouter()
 
@@ -20,17 +19,6 @@ TEAM_EMAILS = {
 SENDER_EMAIL = "madhu269reddi@gmail.com"
 BASE_URL = os.getenv("TRIAGE_BASE_URL", "http://localhost:5173")
 
-# Propensity by position (index 0=A=High … 5=F=Low) — matches MOCK_PREDICTIONS order
-POSITION_PROPENSITY = [
-    {"tier": "High", "label": "High Propensity", "score": 0.8980},
-    {"tier": "High", "label": "High Propensity", "score": 0.9307},
-    {"tier": "High", "label": "High Propensity", "score": 0.8465},
-    {"tier": "Mid",  "label": "Mid Propensity",  "score": 0.4319},
-    {"tier": "Mid",  "label": "Mid Propensity",  "score": 0.4517},
-    {"tier": "Low",  "label": "Low Propensity",  "score": 0.0357},
-]
-
-
 class TriageRequest(BaseModel):
     submissionId: Optional[int] = None
 
@@ -43,185 +31,243 @@ class LetterRequest(BaseModel):
     letterType: str  # "intent" or "not_interested"
 
 
-def _build_email(tier: str, submission_ids: list[str], today_str: str) -> MIMEMultipart:
-    propensity_param = tier.lower()
-    triage_url = f"{BASE_URL}/triage?propensity={propensity_param}"
-    ids_str = ", ".join(submission_ids)
-    count = len(submission_ids)
-
-    subject = f"Submissions for {today_str} – {tier} Propensity"
-
-    plain = (
-        f"Dear {tier} Propensity UWT Team,\n\n"
-        f"The AI underwriting agent has identified {count} submission(s) classified as "
-        f"{tier} Propensity that require your review.\n\n"
-        f"Submission IDs: {ids_str}\n\n"
-        f"Please review the details at:\n{triage_url}\n\n"
-        f"This email was sent automatically by the UWT AI Agent ({SENDER_EMAIL})."
-    )
-
-    color_map = {"High": "#16a34a", "Mid": "#d97706", "Low": "#dc2626"}
-    badge_color = color_map.get(tier, "#6b7280")
-
-    html = f"""
+class BulkLetterRequest(BaseModel):
+    tier: str        # "High", "Mid" or "Low"
+    letterType: str  # "intent" or "not_interested"
+    recipient: Literal["applicant", "broker"] = "applicant"
+
+
+# ─── Email templates ──────────────────────────────────────────────────────────
+# Compiled once at import; static fields (sender, base URL) are baked in.
+
+TIER_COLORS = {"High": "#16a34a", "Mid": "#d97706", "Low": "#dc2626"}
+
+TRIAGE_TEMPLATE = EmailTemplate(
+    "triage",
+    subject="Submissions for ${today} – ${tier} Propensity",
+    plain=(
+        "Dear ${tier} Propensity UWT Team,\n\n"
+        "The AI underwriting agent has identified ${count} submission(s) classified as "
+        "${tier} Propensity that require your review.\n\n"
+        "Submission IDs: ${ids}\n\n"
+        "Please review the details at:\n${triage_url}\n\n"
+        "This email was sent automatically by the UWT AI Agent (${sender})."
+    ),
+    html_body="""
     <html><body style="font-family:Arial,sans-serif;color:#111827;max-width:600px;margin:auto;padding:24px">
-      <h2 style="color:{badge_color}">UWT AI Agent — {tier} Propensity Triage</h2>
-      <p>Dear <strong>{tier} Propensity UWT Team</strong>,</p>
-      <p>The AI underwriting agent has identified <strong>{count} submission(s)</strong>
-         classified as <strong>{tier} Propensity</strong> that require your review.</p>
-      <p><strong>Submission IDs:</strong> {ids_str}</p>
+      <h2 style="color:${color}">UWT AI Agent — ${tier} Propensity Triage</h2>
+      <p>Dear <strong>${tier} Propensity UWT Team</strong>,</p>
+      <p>The AI underwriting agent has identified <strong>${count} submission(s)</strong>
+         classified as <strong>${tier} Propensity</strong> that require your review.</p>
+      <p><strong>Submission IDs:</strong> ${ids}</p>
       <p>
-        <a href="{triage_url}"
-           style="display:inline-block;background:{badge_color};color:#fff;padding:10px 20px;
+        <a href="${triage_url}"
+           style="display:inline-block;background:${color};color:#fff;padding:10px 20px;
                   border-radius:6px;text-decoration:none;font-weight:bold">
-          Review {tier} Propensity Submissions
+          Review ${tier} Propensity Submissions
         </a>
       </p>
       <hr style="border:none;border-top:1px solid #e5e7eb;margin:24px 0"/>
       <p style="font-size:12px;color:#6b7280">
-        This email was sent automatically by the UWT AI Agent ({SENDER_EMAIL}).
+        This email was sent automatically by the UWT AI Agent (${sender}).
       </p>
     </body></html>
-    """
+    """,
+    defaults={"sender": SENDER_EMAIL},
+)
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = SENDER_EMAIL
-    msg["To"] = TEAM_EMAILS[tier]
-    msg.attach(MIMEText(plain, "plain"))
-    msg.attach(MIMEText(html, "html"))
-    return msg
+_LETTER_HTML = """
+        <html><body style="font-family:Arial,sans-serif;color:#111827;max-width:600px;margin:auto;padding:24px">
+          <h2 style="color:${color}">${headline}</h2>
+          <p>Dear <strong>${broker}</strong>,</p>
+          <p>${message}</p>
+          <hr style="border:none;border-top:1px solid #e5e7eb;margin:24px 0"/>
+          <p style="font-size:12px;color:#6b7280">Regards, UWT Underwriting Team | ${sender} | ${today}</p>
+        </body></html>
+        """
+
+_LETTER_PLAIN = "Dear ${broker},\n\n${message}\n\nRegards,\nUWT Underwriting Team\n${sender}"
+
+
+def _letter_template(name: str, headline: str, color: str, message: str) -> EmailTemplate:
+    fixed = {"headline": headline, "color": color, "message": message}
+    return EmailTemplate(
+        name,
+        subject=f"Re: Submission ${{submission_id}} — {headline}",
+        plain=Template(_LETTER_PLAIN).safe_substitute(fixed),
+        html_body=_LETTER_HTML,
+        defaults={**fixed, "sender": SENDER_EMAIL},
+    )
+
+
+LETTER_TEMPLATES = {
+    "intent": _letter_template(
+        "intent", "Risk Cleared", "#16a34a",
+        "Risk Cleared — You will receive a quote shortly. Risk Cleared.",
+    ),
+    "not_interested": _letter_template(
+        "not_interested", "Risk Denied", "#dc2626",
+        "Risk Denied — Unfortunately we won't be able to proceed with your submission.",
+    ),
+}
+
+
+def _letter_template_for(letter_type: str) -> EmailTemplate:
+    # anything other than "intent" has always been treated as a decline
+    return LETTER_TEMPLATES["intent" if letter_type == "intent" else "not_interested"]
+
+
+def _build_email(tier: str, submission_ids: list[str], today_str: str) -> RenderedEmail:
+    return TRIAGE_TEMPLATE.render(SENDER_EMAIL, TEAM_EMAILS[tier], {
+        "tier": tier,
+        "today": today_str,
+        "count": len(submission_ids),
+        "ids": ", ".join(submission_ids),
+        "triage_url": f"{BASE_URL}/triage?propensity={tier.lower()}",
+        "color": TIER_COLORS.get(tier, "#6b7280"),
+    })
+
+
+def _outgoing(email: RenderedEmail) -> dict:
+    """Outbox row for a rendered message."""
+    return {
+        "sender": email.sender,
+        "recipient": email.recipient,
+        "subject": email.subject,
+        "message": email.message,
+    }
 
 
 @router.post("/send-emails")
 def send_triage_emails(request: TriageRequest):
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
-
+    """Queue one email per propensity tier; delivery happens on the mail workers."""
     today_str = date.today().strftime("%b %d, %Y")
 
-    # Build tiers using actual submission_ids from the properties API (respects CSV overrides)
-    properties = get_properties()
-    tiers: dict[str, list[str]] = {"High": [], "Mid": [], "Low": []}
-    for i, prop in enumerate(properties[:6]):
-        if i < len(POSITION_PROPENSITY):
-            # Skip excluded properties
-            pred = MOCK_PREDICTIONS[i]
-            if pred.get("excluded", False):
-                continue
-            tier = POSITION_PROPENSITY[i]["tier"]
-            tiers[tier].append(prop["submission_id"])
+    # Tiers come pre-grouped from the property index (scored, non-excluded properties)
+    index = property_index.snapshot()
+    tiers: dict[str, list[str]] = {
+        tier: [entry.submission_id for entry in entries] for tier, entries in index.tiers.items()
+    }
 
     tier_counts = {k: len(v) for k, v in tiers.items()}
 
     # If SMTP not configured, return graceful response (demo mode)
-    if not smtp_host or not smtp_user or not smtp_pass:
+    if not mail_outbox.settings.configured:
         return {
             "status": "skipped",
-            "reason": "SMTP not configured — set SMTP_HOST, SMTP_USER, SMTP_PASS env vars",
+            "reason": "SMTP not configured — set SMTP_HOST (and SMTP_USER, SMTP_PASS to log in)",
             "tiers": tier_counts,
         }
 
     emails = [_build_email(tier, ids, today_str) for tier, ids in tiers.items() if ids]
-
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.ehlo()
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            for msg in emails:
-                server.sendmail(SENDER_EMAIL, msg["To"], msg.as_string())
-    except Exception as exc:
-        return {"status": "error", "reason": str(exc), "tiers": tier_counts}
-
-    return {"status": "sent", "tiers": tier_counts}
+    queued = mail_outbox.enqueue([_outgoing(msg) for msg in emails])
+    return {"status": "queued", "tiers": tier_counts, **queued}
 
 
 @router.post("/send-letter")
 def send_letter(request: LetterRequest):
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
-
-    broker = request.brokerCompany or "Broker"
-    county = request.propertyCounty or "the property"
-    sub_id = request.submissionId
-    today_str = date.today().strftime("%b %d, %Y")
+    settings = mail_outbox.settings
+    if not settings.configured:
+        return {"status": "skipped", "reason": "SMTP not configured"}
 
-    if request.letterType == "intent":
-        subject = f"Re: Submission {sub_id} — Risk Cleared"
-        plain = (
-            f"Dear {broker},\n\n"
-            f"Risk Cleared — You will receive a quote shortly. Risk Cleared.\n\n"
-            f"Regards,\nUWT Underwriting Team\n{SENDER_EMAIL}"
-        )
-        html = f"""
-        <html><body style="font-family:Arial,sans-serif;color:#111827;max-width:600px;margin:auto;padding:24px">
-          <h2 style="color:#16a34a">Risk Cleared</h2>
-          <p>Dear <strong>{broker}</strong>,</p>
-          <p>Risk Cleared — You will receive a quote shortly. Risk Cleared.</p>
-          <hr style="border:none;border-top:1px solid #e5e7eb;margin:24px 0"/>
-          <p style="font-size:12px;color:#6b7280">Regards, UWT Underwriting Team | {SENDER_EMAIL} | {today_str}</p>
-        </body></html>
-        """
-    else:
-        subject = f"Re: Submission {sub_id} — Risk Denied"
-        plain = (
-            f"Dear {broker},\n\n"
-            f"Risk Denied — Unfortunately we won't be able to proceed with your submission.\n\n"
-            f"Regards,\nUWT Underwriting Team\n{SENDER_EMAIL}"
+    try:
+        email = _letter_template_for(request.letterType).render(
+            settings.user or SENDER_EMAIL,
+            request.applicantEmail,
+            {
+                "broker": request.brokerCompany or "Broker",
+                "submission_id": request.submissionId,
+                "today": date.today().strftime("%b %d, %Y"),
+            },
         )
-        html = f"""
-        <html><body style="font-family:Arial,sans-serif;color:#111827;max-width:600px;margin:auto;padding:24px">
-          <h2 style="color:#dc2626">Risk Denied</h2>
-          <p>Dear <strong>{broker}</strong>,</p>
-          <p>Risk Denied — Unfortunately we won't be able to proceed with your submission.</p>
-          <hr style="border:none;border-top:1px solid #e5e7eb;margin:24px 0"/>
-          <p style="font-size:12px;color:#6b7280">Regards, UWT Underwriting Team | {SENDER_EMAIL} | {today_str}</p>
-        </body></html>
-        """
+    except InvalidHeaderError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    queued = mail_outbox.enqueue([_outgoing(email)])
+    return {"status": "queued", "message_id": queued["message_ids"][0], "batch_id": queued["batch_id"]}
 
-    if not smtp_host or not smtp_user or not smtp_pass:
-        return {"status": "skipped", "reason": "SMTP not configured"}
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = smtp_user
-    msg["To"] = request.applicantEmail
-    msg.attach(MIMEText(plain, "plain"))
-    msg.attach(MIMEText(html, "html"))
+@router.post("/send-letters")
+def send_tier_letters(request: BulkLetterRequest):
+    """
+    Queue one letter per property in a propensity tier, addressed to the
+    applicant (default) or the broker. Properties without a valid address
+    are skipped. Track delivery with GET /outbox/batches/{batch_id}.
+    """
+    settings = mail_outbox.settings
+    index = property_index.snapshot()
+    entries = index.tiers.get(request.tier)
+    if entries is None:
+        raise HTTPException(status_code=400, detail=f"Unknown tier '{request.tier}'")
+    if not settings.configured:
+        return {"status": "skipped", "reason": "SMTP not configured", "tier": request.tier, "letters": 0}
+
+    address_field = "applicant_email" if request.recipient == "applicant" else "broker_email"
+    today_str = date.today().strftime("%b %d, %Y")
+    recipients = []
+    for entry in entries:
+        address = entry.property.get(address_field)
+        if not address:
+            continue
+        try:
+            format_address(address)
+        except InvalidHeaderError as exc:
+            print(f"[triage] {entry.submission_id}: {exc}, skipped")
+            continue
+        recipients.append((address, {
+            "broker": entry.property.get("broker_company") or "Broker",
+            "submission_id": entry.submission_id,
+            "today": today_str,
+        }))
+
+    emails = _letter_template_for(request.letterType).render_many(settings.user or SENDER_EMAIL, recipients)
+    if not emails:
+        return {"status": "skipped", "reason": "No recipients with an address", "tier": request.tier, "letters": 0}
+    queued = mail_outbox.enqueue([_outgoing(email) for email in emails])
+    return {
+        "status": "queued",
+        "tier": request.tier,
+        "letters": len(emails),
+        "skipped": len(entries) - len(emails),
+        "batch_id": queued["batch_id"],
+    }
+
+
+@router.get("/outbox")
+def get_outbox_stats():
+    """Outbound mail counts by status."""
+    return mail_outbox.stats()
+
+
+@router.get("/outbox/batches/{batch_id}")
+def get_outbox_batch(batch_id: str):
+    messages = mail_outbox.batch(batch_id)
+    if not messages:
+        raise HTTPException(status_code=404, detail="Mail batch not found")
+    return messages
 
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.ehlo()
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(smtp_user, request.applicantEmail, msg.as_string())
-    except Exception as exc:
-        return {"status": "error", "reason": str(exc)}
 
-    return {"status": "sent"}
+@router.get("/outbox/{message_id}")
+def get_outbox_message(message_id: int):
+    message = mail_outbox.get(message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return message
 
 
 @router.get("/properties")
 def get_triage_properties():
-    """Return all 6 properties merged with propensity data from MOCK_PREDICTIONS (by position).
-    Excluded properties are omitted from the triage list.
+    """Return scored properties merged with their propensity data from the property index.
+    Excluded and unscored properties are omitted from the triage list.
     """
-    properties = get_properties()
+    index = property_index.snapshot()
     result = []
-    for i, prop in enumerate(properties[:6]):
-        if i >= len(MOCK_PREDICTIONS):
-            break
-        pred = MOCK_PREDICTIONS[i]
-        # Skip excluded properties — they should not appear in triage pages
-        if pred.get("excluded", False):
+    for entry in index.entries:
+        # Skip excluded/unscored properties — they should not appear in triage pages
+        if not entry.scored or entry.excluded:
             continue
+        pred = entry.prediction
         result.append({
-            **prop,
+            **entry.property,
             "quote_propensity": pred["quote_propensity_probability"],
             "quote_propensity_label": pred["quote_propensity"],
             "excluded": False,
@@ -232,24 +278,19 @@ def get_triage_properties():
 @router.get("/property/{submission_id}")
 def get_property_result(submission_id: str):
     """Return full property result data for a given submission_id string (e.g. 'SUB0001').
-    Maps the submission_id to its position index via live properties list, then returns
-    the corresponding MOCK_PREDICTIONS, MOCK_LOCAL_SHAP, and MOCK_VULNERABILITY data.
+    Resolved in O(1) through the property index, which joins the catalog row with its
+    prediction, local SHAP values and vulnerability data.
     """
-    properties = get_properties()
-    # Find position index of this submission_id in the live properties list
-    prop_index = None
-    for i, prop in enumerate(properties[:6]):
-        if prop.get("submission_id") == submission_id:
-            prop_index = i
-            break
-
-    if prop_index is None:
+    entry = property_index.get(submission_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"Property '{submission_id}' not found")
+    if not entry.scored:
+        raise HTTPException(status_code=404, detail=f"Property '{submission_id}' has not been scored")
 
-    pred = MOCK_PREDICTIONS[prop_index]
+    pred = entry.prediction
     return {
         "submission_id": submission_id,
-        "property_index": prop_index,
+        "property_index": entry.position,
         "quote_propensity": pred["quote_propensity_probability"],
         "quote_propensity_label": pred["quote_propensity"],
         "total_risk_score": pred["total_risk_score"],
@@ -265,6 +306,6 @@ def get_property_result(submission_id: str):
         "submission_channel": pred["submission_channel"],
         "excluded": pred.get("excluded", False),
         "exclusion_reason": pred.get("exclusion_reason", None),
-        "shap_values": MOCK_LOCAL_SHAP[prop_index],
-        "vulnerability_data": MOCK_VULNERABILITY[prop_index],
+        "shap_values": entry.local_shap,
+        "vulnerability_data": entry.vulnerability,
     }
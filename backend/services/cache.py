@@ -0,0 +1,272 @@
+"""
+cache.py — Two-tier cache for external lookups (Geoapify, Property API).
+
+An in-process LRU sits in front of the `lookup_cache` SQLite table so hot keys
+are served from memory and everything else survives a restart. Entries expire
+after `ttl_seconds`; both tiers are size-bounded and evict oldest-first.
+
+SingleFlight collapses concurrent misses for the same key into one upstream call.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from database import get_connection
+from services.metrics import metrics
+
+# How many writes between row-count checks on the SQLite tier
+_EVICT_CHECK_EVERY = 100
+
+
+class LRUCache:
+    """Thread-safe LRU of key → (stored_at, value) with a max entry count."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key: str, stored_at: float, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (stored_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def hit_counts(self) -> tuple[int, int]:
+        return self.hits, self.misses
+
+
+class PersistentCache:
+    """
+    LRU + SQLite cache for JSON-serialisable values, partitioned by namespace.
+    Storage errors are swallowed and counted: a broken cache must never fail a lookup.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_memory_entries: int, max_rows: int):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._memory = LRUCache(max_memory_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self.errors = 0
+
+    def _fresh(self, stored_at: float, max_age: Optional[float] = None) -> bool:
+        limit = self.ttl_seconds if max_age is None else min(max_age, self.ttl_seconds)
+        return time.time() - stored_at < limit
+
+    def _count(self, attr: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    def get(self, key: str, max_age: Optional[float] = None):
+        """
+        Return the cached value for key, or None on miss/expiry.
+        max_age (seconds) lets a caller demand fresher data than the TTL; older
+        entries are treated as misses but kept, so they can still serve as a
+        stale fallback.
+        """
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if self._fresh(stored_at, max_age):
+                self._count("memory_hits")
+                return value
+            if not self._fresh(stored_at):
+                self._memory.pop(key)
+
+        try:
+            conn = get_connection()
+            try:
+                row = conn.execute(
+                    "SELECT value, stored_at FROM lookup_cache WHERE namespace = ? AND cache_key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            print(f"[cache:{self.namespace}] read failed: {exc}")
+            self._count("errors")
+            row = None
+
+        if row is not None and self._fresh(row["stored_at"], max_age):
+            value = json.loads(row["value"])
+            self._memory.put(key, row["stored_at"], value)
+            self._count("disk_hits")
+            return value
+
+        self._count("misses")
+        return None
+
+    def peek(self, key: str, max_age: Optional[float] = None):
+        """
+        Fresh value from the memory tier only, without counting a hit or miss.
+        For re-checking after waiting (e.g. inside a SingleFlight): every put()
+        lands in memory, so an entry written meanwhile is found here.
+        """
+        entry = self._memory.get(key)
+        if entry is not None and self._fresh(entry[0], max_age):
+            return entry[1]
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        stored_at = time.time()
+        self._memory.put(key, stored_at, value)
+        try:
+            conn = get_connection()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO lookup_cache (namespace, cache_key, value, stored_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), stored_at),
+                )
+                conn.commit()
+                with self._lock:
+                    self._writes += 1
+                    check = self._writes % _EVICT_CHECK_EVERY == 0
+                if check:
+                    self._evict(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            print(f"[cache:{self.namespace}] write failed: {exc}")
+            self._count("errors")
+
+    def _evict(self, conn) -> None:
+        """Drop expired rows, then the oldest rows beyond max_rows."""
+        cur = conn.execute(
+            "DELETE FROM lookup_cache WHERE namespace = ? AND stored_at < ?",
+            (self.namespace, time.time() - self.ttl_seconds),
+        )
+        removed = cur.rowcount
+        total = conn.execute(
+            "SELECT COUNT(*) FROM lookup_cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total > self.max_rows:
+            cur = conn.execute(
+                "DELETE FROM lookup_cache WHERE namespace = ? AND cache_key IN ("
+                "  SELECT cache_key FROM lookup_cache WHERE namespace = ? "
+                "  ORDER BY stored_at ASC LIMIT ?)",
+                (self.namespace, self.namespace, total - self.max_rows),
+            )
+            removed += cur.rowcount
+        conn.commit()
+        self._count("disk_evictions", removed)
+
+    def invalidate(self, key: str) -> None:
+        self._memory.pop(key)
+        try:
+            conn = get_connection()
+            try:
+                conn.execute(
+                    "DELETE FROM lookup_cache WHERE namespace = ? AND cache_key = ?",
+                    (self.namespace, key),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            print(f"[cache:{self.namespace}] invalidate failed: {exc}")
+            self._count("errors")
+
+    def hit_counts(self) -> tuple[int, int]:
+        return self.memory_hits + self.disk_hits, self.misses
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "namespace":        self.namespace,
+            "memory_entries":   len(self._memory),
+            "memory_hits":      self.memory_hits,
+            "disk_hits":        self.disk_hits,
+            "misses":           self.misses,
+            "hit_ratio":        round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_evictions": self._memory.evictions,
+            "disk_evictions":   self.disk_evictions,
+            "errors":           self.errors,
+            "ttl_seconds":      self.ttl_seconds,
+        }
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as exc:
+            call.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+def register_cache_metrics(name: str, cache) -> None:
+    """Export a cache's hits, misses, hit ratio and size on /metrics under cache="<name>"."""
+    def samples():
+        hits, misses = cache.hit_counts()
+        lookups = hits + misses
+        labels = {"cache": name}
+        yield ("cache_hits_total", "counter", "Cache lookups served from the cache.", labels, hits)
+        yield ("cache_misses_total", "counter", "Cache lookups that missed.", labels, misses)
+        yield ("cache_hit_ratio", "gauge", "Hits over lookups since start.", labels, hits / lookups if lookups else 0.0)
+        yield ("cache_entries", "gauge", "Entries held in memory.", labels, len(cache))
+    metrics.register_collector(samples)
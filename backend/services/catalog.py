@@ -0,0 +1,87 @@
+"""
+catalog.py — In-memory catalog backed by a data file.
+
+The file is parsed once and the built records are served from memory. Each
+access stats the file and rebuilds only when its mtime or size has changed.
+Every build carries a version string and an ETag, so HTTP handlers can answer
+conditional requests with 304.
+
+An optional indexer builds lookup structures (e.g. key → position) alongside
+each snapshot, so lookups stay O(1) without rescanning the records.
+
+Records are shared between callers and must be treated as read-only.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    records: list
+    version: str
+    indexes: dict = field(default_factory=dict)
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.version}"'
+
+
+class FileBackedCatalog:
+    def __init__(self, name: str, path: str, loader: Callable[[str], list], fallback: Callable[[], list],
+                 indexer: Optional[Callable[[list], dict]] = None):
+        """
+        loader(path) builds the record list from the file; fallback() supplies
+        records when the file is missing or the first load fails; indexer(records)
+        returns the snapshot's lookup structures.
+        """
+        self.name = name
+        self.path = path
+        self._loader = loader
+        self._fallback = fallback
+        self._indexer = indexer
+        self._lock = threading.Lock()
+        self._stat_key: Optional[tuple] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self.loads = 0
+
+    def _current_stat_key(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def snapshot(self) -> CatalogSnapshot:
+        stat_key = self._current_stat_key()
+        snap = self._snapshot
+        if snap is not None and stat_key == self._stat_key:
+            return snap
+        with self._lock:
+            if self._snapshot is not None and stat_key == self._stat_key:
+                return self._snapshot
+            self._snapshot = self._build(stat_key)
+            self._stat_key = stat_key
+            self.loads += 1
+            return self._snapshot
+
+    def _make(self, records: list, version: str) -> CatalogSnapshot:
+        indexes = self._indexer(records) if self._indexer else {}
+        return CatalogSnapshot(records, version, indexes)
+
+    def _build(self, stat_key: Optional[tuple]) -> CatalogSnapshot:
+        if stat_key is None:
+            return self._make(self._fallback(), f"{self.name}-fallback")
+        try:
+            records = self._loader(self.path)
+        except Exception as e:
+            print(f"[catalog:{self.name}] reload failed: {e}")
+            if self._snapshot is not None:
+                return self._snapshot
+            return self._make(self._fallback(), f"{self.name}-fallback")
+        return self._make(records, f"{self.name}-{stat_key[0]:x}-{stat_key[1]:x}")
+
+    def records(self) -> list:
+        return self.snapshot().records
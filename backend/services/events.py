@@ -0,0 +1,97 @@
+"""
+events.py — In-process pub/sub bus for pushing updates to streaming clients.
+
+Publishers may run on any thread (worker pools, sync FastAPI handlers);
+subscribers are asyncio consumers, typically Server-Sent Events endpoints.
+Each subscriber gets a bounded queue, so a slow client cannot grow memory
+without bound. When a queue overflows, its backlog is discarded and replaced
+by the OVERFLOW marker; events published afterwards are queued as usual. A
+consumer that sees OVERFLOW has missed events and must re-sync from the
+source of truth (the database), so nothing, terminal events included, is
+lost silently.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Delivered in place of the events a subscriber missed; compare with `is`
+OVERFLOW = {"type": "overflow"}
+
+
+class Subscription:
+    def __init__(self, topic: str, loop: asyncio.AbstractEventLoop):
+        self.topic = topic
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def _offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                if self.queue.get_nowait() is not OVERFLOW:
+                    self.dropped += 1
+            self.queue.put_nowait(OVERFLOW)
+            self.queue.put_nowait(event)
+
+    async def get(self, timeout: float):
+        """Next event, or None if nothing arrives within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Register a subscriber; must be called from the consuming event loop."""
+        sub = Subscription(topic, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.topic]
+
+    def publish(self, topic: str, event: dict) -> None:
+        """Deliver event to every subscriber of topic; safe to call from any thread."""
+        with self._lock:
+            subs = list(self._subscribers.get(topic, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # subscriber's loop is closed — the client is gone
+                self.unsubscribe(sub)
+
+    def subscriber_count(self, topic: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+
+# Response headers for event/NDJSON streams: no caching or proxy buffering, and
+# an explicit identity encoding so compression middleware passes the stream
+# through instead of holding lines back in its encoder
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+
+
+def sse_message(event: str, data: Any) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+bus = EventBus()
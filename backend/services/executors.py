@@ -0,0 +1,160 @@
+"""
+executors.py — Bounded worker pools that keep blocking work off the event loop.
+
+CPU-bound pipeline stages (pandas, model inference) run on `cpu_pool`, which is a
+process pool by default so they don't hold the GIL. Blocking network I/O (the
+`requests` calls in the Run 2 pipeline) runs on the thread-based `io_pool`.
+
+Each pool admits at most workers + max_queue tasks; past that, submissions
+raise PoolSaturated so a burst fails fast instead of piling up behind a
+heavy batch.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from services.metrics import metrics
+
+ML_CPU_POOL_KIND = os.getenv("ML_CPU_POOL_KIND", "process")   # "process" | "thread"
+ML_CPU_WORKERS = max(1, int(os.getenv("ML_CPU_WORKERS", str(min(4, os.cpu_count() or 1)))))
+ML_IO_WORKERS = max(1, int(os.getenv("ML_IO_WORKERS", "8")))
+ML_POOL_MAX_QUEUE = max(0, int(os.getenv("ML_POOL_MAX_QUEUE", "32")))
+
+
+class PoolSaturated(RuntimeError):
+    """Raised when a pool already holds workers + max_queue tasks."""
+
+
+class BoundedPool:
+    def __init__(self, name: str, kind: str, workers: int, max_queue: int):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._initializer: Optional[tuple] = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def set_initializer(self, fn, *args) -> None:
+        """Run fn(*args) in every worker as it starts (e.g. to preload a model). Must be picklable for process pools."""
+        with self._lock:
+            self._initializer = (fn, args)
+
+    def _get_executor(self) -> Executor:
+        # created lazily so importing this module never forks/spawns workers
+        with self._lock:
+            if self._executor is None:
+                initializer, initargs = self._initializer or (None, ())
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=initializer,
+                        initargs=initargs,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix=f"{self.name}-pool",
+                        initializer=initializer,
+                        initargs=initargs,
+                    )
+            return self._executor
+
+    def _admit(self, blocking: bool) -> None:
+        if not self._slots.acquire(blocking=blocking):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(f"{self.name} pool is saturated ({self.workers} workers, {self.max_queue} queued)")
+        with self._lock:
+            self._in_flight += 1
+            self.submitted += 1
+
+    def _done(self, ok: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+        self._slots.release()
+
+    async def run(self, fn, *args):
+        """Await fn(*args) on the pool; raises PoolSaturated when full."""
+        self._admit(blocking=False)
+        ok = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            ok = True
+            return result
+        finally:
+            self._done(ok)
+
+    def call(self, fn, *args):
+        """Blocking variant for worker threads: waits for a slot, then for the result."""
+        self._admit(blocking=True)
+        ok = False
+        try:
+            result = self._get_executor().submit(fn, *args).result()
+            ok = True
+            return result
+        finally:
+            self._done(ok)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "name":        self.name,
+                "kind":        self.kind,
+                "workers":     self.workers,
+                "max_queue":   self.max_queue,
+                "active":      min(in_flight, self.workers),
+                "queue_depth": max(0, in_flight - self.workers),
+                "submitted":   self.submitted,
+                "completed":   self.completed,
+                "failed":      self.failed,
+                "rejected":    self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+cpu_pool = BoundedPool("cpu", ML_CPU_POOL_KIND, ML_CPU_WORKERS, ML_POOL_MAX_QUEUE)
+io_pool = BoundedPool("io", "thread", ML_IO_WORKERS, ML_POOL_MAX_QUEUE)
+
+
+def pool_stats() -> list[dict]:
+    return [cpu_pool.stats(), io_pool.stats()]
+
+
+def _pool_metric_samples():
+    for stats in pool_stats():
+        labels = {"pool": stats["name"]}
+        yield ("executor_workers", "gauge", "Worker slots per pool.", labels, stats["workers"])
+        yield ("executor_active", "gauge", "Tasks running on a pool.", labels, stats["active"])
+        yield ("executor_queue_depth", "gauge", "Tasks waiting for a pool worker.", labels, stats["queue_depth"])
+        yield ("executor_rejected_total", "counter", "Submissions refused because the pool was full.",
+               labels, stats["rejected"])
+
+
+metrics.register_collector(_pool_metric_samples)
+
+
+def shutdown_pools() -> None:
+    cpu_pool.shutdown()
+    io_pool.shutdown()
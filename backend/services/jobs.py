@@ -0,0 +1,271 @@
+"""
+jobs.py — Persistent background jobs for long-running ML scoring.
+
+A job is a stored request payload plus a handler registered for its kind.
+Submitting inserts an `ml_jobs` row and queues the job on a worker pool, so
+the HTTP request returns immediately. Handlers emit results chunk by chunk:
+every chunk is appended to `ml_job_chunks` and published on the event bus
+under the topic "job:<id>".
+
+Each job is owned by the app process that queued it, under a lease
+(ML_JOB_LEASE_S) that a heartbeat thread keeps extending. Jobs whose lease ran
+out (their process died) are re-queued from the beginning by whichever process
+notices first, on startup or on a later heartbeat. Jobs a live sibling worker
+is running are left alone.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from database import begin_immediate, get_connection
+from services.events import bus
+from services.leases import worker_id
+
+ML_JOB_WORKERS = max(1, int(os.getenv("ML_JOB_WORKERS", "2")))
+ML_JOB_LEASE_S = float(os.getenv("ML_JOB_LEASE_S", "60"))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def job_topic(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _job_doc(row) -> dict:
+    return {
+        "job_id":         row["id"],
+        "kind":           row["kind"],
+        "status":         row["status"],
+        "total_rows":     row["total_rows"],
+        "processed_rows": row["processed_rows"],
+        "chunks":         row["chunk_count"],
+        "error":          row["error"],
+        "created_at":     row["created_at"],
+        "started_at":     row["started_at"],
+        "finished_at":    row["finished_at"],
+    }
+
+
+class JobEngine:
+    """
+    Handlers have the signature handler(payload, emit) -> summary dict, where
+    emit(chunk, processed_rows) stores one chunk of output. A chunk is a dict of
+    lists (e.g. {"predictions": [...], "shap_local": [...]}); the final result
+    concatenates the lists of every chunk and merges in the summary.
+    """
+
+    def __init__(self, workers: int = ML_JOB_WORKERS):
+        self._handlers: dict[str, Callable] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ml-job")
+        self._heartbeat: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, handler: Callable) -> None:
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload: dict, total_rows: int) -> dict:
+        if kind not in self._handlers:
+            raise ValueError(f"No job handler registered for kind '{kind}'")
+        job_id = uuid.uuid4().hex
+        conn = get_connection()
+        try:
+            conn.execute(
+                "INSERT INTO ml_jobs (id, kind, status, payload, total_rows, owner, lease_expires_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), total_rows, worker_id(), time.time() + ML_JOB_LEASE_S),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._start_heartbeat()
+        self._pool.submit(self._run, job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT * FROM ml_jobs WHERE id = ?", (job_id,)).fetchone()
+            return _job_doc(row) if row else None
+        finally:
+            conn.close()
+
+    def chunks(self, job_id: str, after: int = -1) -> list[tuple[int, dict]]:
+        """Stored chunks with chunk_index > after, in order."""
+        conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT chunk_index, data FROM ml_job_chunks "
+                "WHERE job_id = ? AND chunk_index > ? ORDER BY chunk_index",
+                (job_id, after),
+            ).fetchall()
+            return [(r["chunk_index"], json.loads(r["data"])) for r in rows]
+        finally:
+            conn.close()
+
+    def result(self, job_id: str) -> Optional[dict]:
+        """Assembled output of a completed job, or None if not completed."""
+        conn = get_connection()
+        try:
+            row = conn.execute(
+                "SELECT status, summary FROM ml_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None or row["status"] != "completed":
+            return None
+        merged: dict[str, list] = {}
+        for _, chunk in self.chunks(job_id):
+            for key, items in chunk.items():
+                merged.setdefault(key, []).extend(items)
+        return {**merged, **json.loads(row["summary"] or "{}")}
+
+    def terminal_event(self, job_id: str) -> Optional[dict]:
+        """The `completed`/`failed` event published when the job finished, rebuilt from the store."""
+        conn = get_connection()
+        try:
+            row = conn.execute(
+                "SELECT status, summary, error FROM ml_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None or row["status"] not in TERMINAL_STATUSES:
+            return None
+        if row["status"] == "failed":
+            return {"type": "failed", "error": row["error"]}
+        return {"type": "completed", **json.loads(row["summary"] or "{}")}
+
+    def recover(self) -> int:
+        """
+        Take over jobs whose owner's lease has expired (the process died) and
+        queue them here. Returns how many were re-queued.
+        """
+        now = time.time()
+        conn = get_connection()
+        try:
+            begin_immediate(conn, "jobs_recover")
+            rows = conn.execute(
+                "SELECT id, created_at FROM ml_jobs WHERE status IN ('queued', 'running') "
+                "AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (now,),
+            ).fetchall()
+            job_ids = [r["id"] for r in sorted(rows, key=lambda r: r["created_at"] or "")]
+            conn.executemany(
+                "UPDATE ml_jobs SET status = 'queued', started_at = NULL, owner = ?, lease_expires_at = ? "
+                "WHERE id = ?",
+                [(worker_id(), now + ML_JOB_LEASE_S, job_id) for job_id in job_ids],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._start_heartbeat()
+        for job_id in job_ids:
+            self._pool.submit(self._run, job_id)
+        if job_ids:
+            print(f"[jobs] re-queued {len(job_ids)} interrupted job(s)")
+        return len(job_ids)
+
+    def _start_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._beat, name="ml-job-lease", daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self) -> None:
+        """Extend the leases this process holds, and pick up jobs orphaned by dead siblings."""
+        while True:
+            time.sleep(ML_JOB_LEASE_S / 3)
+            try:
+                conn = get_connection()
+                try:
+                    conn.execute(
+                        "UPDATE ml_jobs SET lease_expires_at = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                        (time.time() + ML_JOB_LEASE_S, worker_id()),
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+                self.recover()
+            except Exception as exc:
+                print(f"[jobs] lease heartbeat failed: {exc!r}")
+
+    # ─── Worker side ──────────────────────────────────────────────────────────
+
+    def _run(self, job_id: str) -> None:
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT kind, status, payload FROM ml_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] in TERMINAL_STATUSES:
+                return
+            kind = row["kind"]
+            payload = json.loads(row["payload"])
+            # only the lease holder may start the job
+            claimed = conn.execute(
+                "UPDATE ml_jobs SET status = 'running', processed_rows = 0, chunk_count = 0, "
+                "started_at = CURRENT_TIMESTAMP, lease_expires_at = ? "
+                "WHERE id = ? AND status = 'queued' AND owner = ?",
+                (time.time() + ML_JOB_LEASE_S, job_id, worker_id()),
+            ).rowcount
+            if not claimed:
+                conn.rollback()
+                return
+            # a re-queued job starts over, so drop anything a previous run stored
+            conn.execute("DELETE FROM ml_job_chunks WHERE job_id = ?", (job_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        bus.publish(job_topic(job_id), {"type": "status", "status": "running"})
+
+        chunk_index = 0
+
+        def emit(chunk: dict, processed_rows: int) -> None:
+            nonlocal chunk_index
+            conn = get_connection()
+            try:
+                conn.execute(
+                    "INSERT INTO ml_job_chunks (job_id, chunk_index, data) VALUES (?, ?, ?)",
+                    (job_id, chunk_index, json.dumps(chunk)),
+                )
+                conn.execute(
+                    "UPDATE ml_jobs SET processed_rows = ?, chunk_count = ? WHERE id = ?",
+                    (processed_rows, chunk_index + 1, job_id),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            bus.publish(job_topic(job_id), {
+                "type": "chunk",
+                "chunk_index": chunk_index,
+                "processed_rows": processed_rows,
+                **chunk,
+            })
+            chunk_index += 1
+
+        try:
+            summary = self._handlers[kind](payload, emit)
+        except Exception as exc:
+            print(f"[jobs] job {job_id} failed: {exc!r}")
+            self._finish(job_id, "failed", error=repr(exc))
+            bus.publish(job_topic(job_id), {"type": "failed", "error": repr(exc)})
+            return
+        self._finish(job_id, "completed", summary=summary)
+        bus.publish(job_topic(job_id), {"type": "completed", **(summary or {})})
+
+    def _finish(self, job_id: str, status: str, summary: Optional[dict] = None, error: Optional[str] = None) -> None:
+        conn = get_connection()
+        try:
+            conn.execute(
+                "UPDATE ml_jobs SET status = ?, summary = ?, error = ?, finished_at = CURRENT_TIMESTAMP "
+                "WHERE id = ?",
+                (status, json.dumps(summary) if summary is not None else None, error, job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+job_engine = JobEngine()
@@ -0,0 +1,195 @@
+"""
+leaderboard.py — In-memory ranked leaderboard, maintained incrementally.
+
+Scored submissions are kept in SortedLists ordered by (score desc, created_at
+asc, id), which is the same order as the SQL leaderboard. A list is kept for
+all time, one per UTC day and one per ISO week, so the daily and weekly boards
+are read straight from their own bucket. Top-N is O(log n + N), a rank lookup is
+O(log n), and recording a score is O(log n) per board.
+
+The database stays the source of truth. rebuild() reloads every scored
+submission at startup, and record() is called whenever a score is written.
+Scores written by other app processes are picked up by sync(): every score
+write bumps the 'scores' counter and stamps the submission's score_version,
+so a reader compares one counter and reloads only the rows that changed.
+Daily and weekly buckets older than their retention window are dropped.
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sortedcontainers import SortedList
+
+from database import get_connection
+
+LEADERBOARD_DAILY_RETENTION = int(os.getenv("LEADERBOARD_DAILY_RETENTION", "14"))
+LEADERBOARD_WEEKLY_RETENTION = int(os.getenv("LEADERBOARD_WEEKLY_RETENTION", "8"))
+
+
+def _day_bucket(created_at: str) -> str:
+    return created_at[:10]
+
+
+def _week_bucket(created_at: str) -> str:
+    year, week, _ = date.fromisoformat(created_at[:10]).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _sort_key(score: float, created_at: str, submission_id: int) -> tuple:
+    return (-score, created_at, submission_id)
+
+
+class Leaderboard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._all = SortedList()
+        self._daily: dict[str, SortedList] = {}
+        self._weekly: dict[str, SortedList] = {}
+        # submission id → (sort key, underwriter_name)
+        self._entries: dict[int, tuple] = {}
+        # value of the 'scores' counter this board reflects
+        self._version = 0
+
+    # ── maintenance ──────────────────────────────────────────────────────────
+
+    def rebuild(self, conn) -> int:
+        """Reload every scored submission from the database. Returns the entry count."""
+        version = _scores_version(conn)
+        rows = conn.execute(
+            "SELECT id, underwriter_name, score, created_at FROM submissions WHERE score IS NOT NULL"
+        ).fetchall()
+        with self._lock:
+            self._all = SortedList()
+            self._daily, self._weekly, self._entries = {}, {}, {}
+            for row in rows:
+                self._insert(row["id"], row["underwriter_name"], row["score"], row["created_at"])
+            self._prune()
+            self._version = version
+        return len(rows)
+
+    def sync(self, conn) -> int:
+        """Apply scores written since the last rebuild/sync (by any process). Returns rows applied."""
+        version = _scores_version(conn)
+        with self._lock:
+            since = self._version
+        if version == since:
+            return 0
+        rows = conn.execute(
+            "SELECT id, underwriter_name, score, created_at FROM submissions WHERE score_version > ?",
+            (since,),
+        ).fetchall()
+        with self._lock:
+            for row in rows:
+                self._remove(row["id"])
+                if row["score"] is not None:
+                    self._insert(row["id"], row["underwriter_name"], row["score"], row["created_at"])
+            self._prune()
+            self._version = max(self._version, version)
+        return len(rows)
+
+    def record(self, submission_id: int, underwriter_name: str, score: float, created_at: str) -> None:
+        """Insert or move a submission after its score was written."""
+        with self._lock:
+            self._remove(submission_id)
+            self._insert(submission_id, underwriter_name, score, created_at)
+            self._prune()
+
+    def _insert(self, submission_id: int, underwriter_name: str, score: float, created_at: str) -> None:
+        key = _sort_key(score, created_at, submission_id)
+        self._entries[submission_id] = (key, underwriter_name)
+        self._all.add(key)
+        self._daily.setdefault(_day_bucket(created_at), SortedList()).add(key)
+        self._weekly.setdefault(_week_bucket(created_at), SortedList()).add(key)
+
+    def _remove(self, submission_id: int) -> None:
+        existing = self._entries.pop(submission_id, None)
+        if existing is None:
+            return
+        key = existing[0]
+        self._all.discard(key)
+        for buckets, bucket in ((self._daily, _day_bucket(key[1])), (self._weekly, _week_bucket(key[1]))):
+            board = buckets.get(bucket)
+            if board is not None:
+                board.discard(key)
+                if not board:
+                    del buckets[bucket]
+
+    def _prune(self, now: Optional[datetime] = None) -> None:
+        """Drop day/week buckets that fall outside their retention window."""
+        today = (now or datetime.now(timezone.utc)).date()
+        oldest_day = (today - timedelta(days=LEADERBOARD_DAILY_RETENTION - 1)).isoformat()
+        oldest_week = _week_bucket((today - timedelta(weeks=LEADERBOARD_WEEKLY_RETENTION - 1)).isoformat())
+        for buckets, oldest in ((self._daily, oldest_day), (self._weekly, oldest_week)):
+            for bucket in [b for b in buckets if b < oldest]:
+                del buckets[bucket]
+
+    # ── queries ──────────────────────────────────────────────────────────────
+
+    def _board(self, window: str, now: Optional[datetime] = None) -> SortedList:
+        if window == "all":
+            return self._all
+        stamp = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%d %H:%M:%S")
+        if window == "daily":
+            return self._daily.get(_day_bucket(stamp), SortedList())
+        if window == "weekly":
+            return self._weekly.get(_week_bucket(stamp), SortedList())
+        raise ValueError(f"Unknown leaderboard window '{window}'")
+
+    def _entry(self, rank: int, key: tuple) -> dict:
+        return {
+            "rank": rank,
+            "submission_id": key[2],
+            "underwriter_name": self._entries[key[2]][1],
+            "score_percentage": round(-key[0], 1),
+            "created_at": key[1],
+        }
+
+    def top(self, limit: int = 10, window: str = "all", now: Optional[datetime] = None) -> list[dict]:
+        with self._lock:
+            board = self._board(window, now)
+            return [self._entry(i + 1, key) for i, key in enumerate(board.islice(0, limit))]
+
+    def rank(self, submission_id: int, window: str = "all", now: Optional[datetime] = None) -> Optional[dict]:
+        """The submission's entry with its 1-based rank, or None if it is not on that board."""
+        with self._lock:
+            existing = self._entries.get(submission_id)
+            if existing is None:
+                return None
+            board = self._board(window, now)
+            key = existing[0]
+            if key not in board:
+                return None
+            return {**self._entry(board.index(key) + 1, key), "total": len(board)}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+
+def _scores_version(conn) -> int:
+    row = conn.execute("SELECT value FROM counters WHERE name = 'scores'").fetchone()
+    return row["value"] if row else 0
+
+
+leaderboard = Leaderboard()
+
+
+def sync_leaderboard() -> None:
+    """Bring the shared leaderboard up to date with scores other processes wrote."""
+    conn = get_connection()
+    try:
+        leaderboard.sync(conn)
+    finally:
+        conn.close()
+
+
+def rebuild_leaderboard() -> int:
+    """Startup hook: load the shared leaderboard from the database."""
+    conn = get_connection()
+    try:
+        count = leaderboard.rebuild(conn)
+    finally:
+        conn.close()
+    print(f"[leaderboard] loaded {count} scored submissions")
+    return count
@@ -0,0 +1,23 @@
+"""
+leases.py — Worker identity for rows claimed by one process.
+
+Durable queues (ml_jobs, mail_outbox) record which process claimed a row and
+until when. The owner extends the lease while it is alive. Another process only
+takes a row over once its lease has expired, so several app workers sharing one
+database never re-run each other's live work.
+"""
+
+import os
+import socket
+import uuid
+
+_identity: tuple[int, str] = (0, "")
+
+
+def worker_id() -> str:
+    """host:pid:nonce for this process (recomputed after a fork)."""
+    global _identity
+    pid = os.getpid()
+    if _identity[0] != pid:
+        _identity = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _identity[1]
@@ -0,0 +1,408 @@
+"""
+mail.py — Persistent outbound mail queue with pooled SMTP connections.
+
+Endpoints enqueue fully rendered messages into the `mail_outbox` table and
+return immediately. A small set of worker threads claims queued messages in
+batches and sends them over SMTP connections that stay open between batches
+(re-checked with NOOP after sitting idle), so STARTTLS and login happen once
+per connection rather than once per request.
+
+Every message carries its own status: queued → sending → sent | failed.
+Transient failures (dropped connections, 4xx replies) are retried with
+exponential backoff up to MAIL_MAX_ATTEMPTS; permanent 5xx rejections fail at
+once. When the connection or login itself fails, nothing was sent: the batch
+goes back to the queue without using an attempt and the worker backs off.
+
+A claimed message records the claiming process and when it was claimed. Only
+messages whose claim is older than MAIL_CLAIM_LEASE_S (their process died
+mid-send) are put back in the queue, on start() and periodically by idle
+workers, so app processes sharing the database never resend each other's mail.
+
+STARTTLS and login are optional (SMTP_STARTTLS=0, no SMTP_USER), so the queue
+can be pointed at a local stand-in such as `python -m aiosmtpd -n -l :8025`.
+"""
+
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from database import begin_immediate, get_connection
+from services.leases import worker_id
+from services.metrics import metrics, track_call
+
+MAIL_WORKERS = max(1, int(os.getenv("MAIL_WORKERS", "2")))
+MAIL_BATCH_SIZE = max(1, int(os.getenv("MAIL_BATCH_SIZE", "20")))
+MAIL_MAX_ATTEMPTS = max(1, int(os.getenv("MAIL_MAX_ATTEMPTS", "5")))
+MAIL_RETRY_BASE_S = float(os.getenv("MAIL_RETRY_BASE_S", "2"))
+MAIL_RETRY_MAX_S = float(os.getenv("MAIL_RETRY_MAX_S", "300"))
+MAIL_POLL_S = float(os.getenv("MAIL_POLL_S", "1"))
+SMTP_TIMEOUT_S = float(os.getenv("SMTP_TIMEOUT_S", "30"))
+SMTP_IDLE_CHECK_S = float(os.getenv("SMTP_IDLE_CHECK_S", "30"))
+# Longer than any batch can take: every SMTP step is bounded by SMTP_TIMEOUT_S
+MAIL_CLAIM_LEASE_S = float(os.getenv("MAIL_CLAIM_LEASE_S", str(SMTP_TIMEOUT_S * (MAIL_BATCH_SIZE + 4))))
+
+MAIL_STATUSES = ("queued", "sending", "sent", "failed")
+
+
+@dataclass(frozen=True)
+class SMTPSettings:
+    host: Optional[str]
+    port: int
+    user: Optional[str]
+    password: Optional[str]
+    starttls: bool
+
+    @classmethod
+    def from_env(cls) -> "SMTPSettings":
+        return cls(
+            host=os.getenv("SMTP_HOST"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            user=os.getenv("SMTP_USER"),
+            password=os.getenv("SMTP_PASS"),
+            starttls=os.getenv("SMTP_STARTTLS", "1") != "0",
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host)
+
+    @property
+    def authenticated(self) -> bool:
+        return bool(self.user and self.password)
+
+
+class PermanentMailError(Exception):
+    """The server rejected the message outright; retrying will not help."""
+
+
+class SMTPConnectError(Exception):
+    """Connecting or logging in failed; no message was attempted."""
+
+
+class SMTPConnection:
+    """One worker's SMTP session, opened lazily and reused across batches."""
+
+    def __init__(self, settings: SMTPSettings):
+        self.settings = settings
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    def _open(self) -> smtplib.SMTP:
+        with track_call("smtp", "connect"):
+            smtp = smtplib.SMTP(self.settings.host, self.settings.port, timeout=SMTP_TIMEOUT_S)
+            try:
+                smtp.ehlo()
+                if self.settings.starttls:
+                    smtp.starttls()
+                    smtp.ehlo()
+                if self.settings.authenticated:
+                    smtp.login(self.settings.user, self.settings.password)
+            except Exception:
+                smtp.close()
+                raise
+        self.connects += 1
+        return smtp
+
+    def _ensure(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_CHECK_S:
+            # servers drop idle sessions; probe before trusting the connection
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self.close()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._smtp is None:
+            try:
+                self._smtp = self._open()
+            except (smtplib.SMTPException, OSError) as exc:
+                raise SMTPConnectError(f"{type(exc).__name__}: {exc}") from exc
+        return self._smtp
+
+    def send(self, sender: str, recipient: str, message: str) -> None:
+        smtp = self._ensure()
+        try:
+            with track_call("smtp", "send"):
+                refused = smtp.sendmail(sender, [recipient], message)
+        except smtplib.SMTPRecipientsRefused as exc:
+            code = next(iter(exc.recipients.values()))[0]
+            self._last_used = time.monotonic()
+            if 500 <= code < 600:
+                raise PermanentMailError(f"{code} recipient refused: {recipient}") from exc
+            raise
+        except smtplib.SMTPResponseException as exc:
+            if isinstance(exc, smtplib.SMTPSenderRefused) or 500 <= exc.smtp_code < 600:
+                self._last_used = time.monotonic()
+                raise PermanentMailError(f"{exc.smtp_code} {exc.smtp_error!r}") from exc
+            self.close()
+            raise
+        except (smtplib.SMTPException, OSError):
+            self.close()
+            raise
+        self._last_used = time.monotonic()
+        if refused:
+            raise PermanentMailError(f"recipient refused: {refused}")
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(MAIL_RETRY_MAX_S, MAIL_RETRY_BASE_S * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _message_doc(row) -> dict:
+    return {
+        "message_id": row["id"],
+        "batch_id":   row["batch_id"],
+        "recipient":  row["recipient"],
+        "subject":    row["subject"],
+        "status":     row["status"],
+        "attempts":   row["attempts"],
+        "last_error": row["last_error"],
+        "created_at": row["created_at"],
+        "sent_at":    row["sent_at"],
+    }
+
+
+class MailOutbox:
+    def __init__(self, workers: int = MAIL_WORKERS, settings: Optional[SMTPSettings] = None):
+        self.workers = workers
+        self._settings = settings
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    @property
+    def settings(self) -> SMTPSettings:
+        # read lazily so a .env loaded after import is honoured
+        return self._settings or SMTPSettings.from_env()
+
+    # ── producer side ────────────────────────────────────────────────────────
+
+    def enqueue(self, messages: list[dict]) -> dict:
+        """
+        Queue rendered messages in one transaction. Each message is a dict with
+        sender, recipient, subject and message (the full RFC 5322 text).
+        Returns {"batch_id", "message_ids"}.
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        conn = get_connection()
+        try:
+            begin_immediate(conn, "mail_enqueue")
+            conn.executemany(
+                "INSERT INTO mail_outbox (batch_id, sender, recipient, subject, message, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(batch_id, m["sender"], m["recipient"], m["subject"], m["message"], now) for m in messages],
+            )
+            ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM mail_outbox WHERE batch_id = ? ORDER BY id", (batch_id,)
+            )]
+            conn.commit()
+        finally:
+            conn.close()
+        self._wake.set()
+        return {"batch_id": batch_id, "message_ids": ids}
+
+    def get(self, message_id: int) -> Optional[dict]:
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT * FROM mail_outbox WHERE id = ?", (message_id,)).fetchone()
+            return _message_doc(row) if row else None
+        finally:
+            conn.close()
+
+    def batch(self, batch_id: str) -> list[dict]:
+        conn = get_connection()
+        try:
+            rows = conn.execute("SELECT * FROM mail_outbox WHERE batch_id = ? ORDER BY id", (batch_id,)).fetchall()
+            return [_message_doc(row) for row in rows]
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        conn = get_connection()
+        try:
+            counts = dict.fromkeys(MAIL_STATUSES, 0)
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM mail_outbox GROUP BY status"):
+                counts[row["status"]] = row["n"]
+        finally:
+            conn.close()
+        return {"workers": len(self._threads), "configured": self.settings.configured, **counts}
+
+    def metric_samples(self):
+        stats = self.stats()
+        for status in MAIL_STATUSES:
+            yield ("mail_outbox_messages", "gauge", "Messages in the mail outbox, by status.",
+                   {"status": status}, stats[status])
+
+    # ── worker side ──────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Re-queue messages whose sender died mid-send, then start the worker threads."""
+        with self._lock:
+            if self._threads:
+                return
+            conn = get_connection()
+            try:
+                self._requeue_expired(conn)
+            finally:
+                conn.close()
+            self._stop.clear()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"mail-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            self._stop.set()
+            self._wake.set()
+            for t in self._threads:
+                t.join(timeout)
+            self._threads = []
+
+    def _requeue_expired(self, conn) -> int:
+        """Put `sending` messages whose claim lease ran out back in the queue."""
+        cur = conn.execute(
+            "UPDATE mail_outbox SET status = 'queued', claimed_by = NULL "
+            "WHERE status = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)",
+            (time.time() - MAIL_CLAIM_LEASE_S,),
+        )
+        conn.commit()
+        if cur.rowcount:
+            print(f"[mail] re-queued {cur.rowcount} interrupted message(s)")
+        return cur.rowcount
+
+    def _claim(self, conn) -> list:
+        """Atomically move up to MAIL_BATCH_SIZE due messages to `sending`."""
+        rows = conn.execute(
+            """
+            UPDATE mail_outbox SET status = 'sending', attempts = attempts + 1, claimed_by = ?, claimed_at = ?
+            WHERE id IN (
+                SELECT id FROM mail_outbox
+                WHERE status = 'queued' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id LIMIT ?
+            )
+            RETURNING id, sender, recipient, message, attempts
+            """,
+            (worker_id(), time.time(), time.time(), MAIL_BATCH_SIZE),
+        ).fetchall()
+        conn.commit()
+        return sorted(rows, key=lambda r: r["id"])
+
+    def _worker(self) -> None:
+        smtp = None
+        connect_failures = 0
+        next_sweep = time.monotonic() + MAIL_CLAIM_LEASE_S / 4
+        try:
+            while not self._stop.is_set():
+                settings = self.settings
+                batch = []
+                pause = None
+                if settings.configured:
+                    if smtp is None or smtp.settings != settings:
+                        if smtp is not None:
+                            smtp.close()
+                        smtp = SMTPConnection(settings)
+                    conn = get_connection()
+                    try:
+                        batch = self._claim(conn)
+                        if batch:
+                            pause = self._send_batch(conn, smtp, batch, connect_failures)
+                        elif time.monotonic() >= next_sweep:
+                            next_sweep = time.monotonic() + MAIL_CLAIM_LEASE_S / 4
+                            self._requeue_expired(conn)
+                    except Exception as exc:
+                        print(f"[mail] worker error: {exc!r}")
+                    finally:
+                        conn.close()
+                if pause is not None:
+                    # server unreachable or refusing the login: stay off it for a while
+                    connect_failures += 1
+                    self._stop.wait(pause)
+                elif batch:
+                    connect_failures = 0
+                if not batch:
+                    self._wake.wait(MAIL_POLL_S)
+                    self._wake.clear()
+        finally:
+            if smtp is not None:
+                smtp.close()
+
+    def _send_batch(self, conn, smtp: SMTPConnection, batch: list, connect_failures: int = 0) -> Optional[float]:
+        """
+        Send a claimed batch and record each message's outcome. If the session
+        cannot be opened, the unsent rows go back to the queue without using up
+        an attempt and the worker's back-off (seconds) is returned; else None.
+        """
+        sent, retry, failed, requeue = [], [], [], []
+        pause = None
+
+        def reschedule(row, error: str) -> None:
+            if row["attempts"] >= MAIL_MAX_ATTEMPTS:
+                failed.append((error, row["id"]))
+            else:
+                retry.append((error, time.time() + _backoff(row["attempts"]), row["id"]))
+
+        for i, row in enumerate(batch):
+            try:
+                smtp.send(row["sender"], row["recipient"], row["message"])
+                sent.append((time.time(), row["id"]))
+            except SMTPConnectError as exc:
+                pause = _backoff(connect_failures + 1)
+                requeue = [(str(exc), time.time() + pause, pending["id"]) for pending in batch[i:]]
+                break
+            except PermanentMailError as exc:
+                failed.append((str(exc), row["id"]))
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as exc:
+                # transient 4xx for this message; the session is still usable
+                reschedule(row, f"{type(exc).__name__}: {exc}")
+            except (smtplib.SMTPException, OSError) as exc:
+                # connection-level failure: back off the rest of the batch too
+                error = f"{type(exc).__name__}: {exc}"
+                for pending in batch[i:]:
+                    reschedule(pending, error)
+                break
+
+        conn.executemany(
+            "UPDATE mail_outbox SET status = 'sent', sent_at = datetime(?, 'unixepoch'), last_error = NULL WHERE id = ?",
+            sent,
+        )
+        conn.executemany(
+            "UPDATE mail_outbox SET status = 'queued', last_error = ?, next_attempt_at = ? WHERE id = ?",
+            retry,
+        )
+        conn.executemany(
+            "UPDATE mail_outbox SET status = 'failed', last_error = ? WHERE id = ?",
+            failed,
+        )
+        conn.executemany(
+            "UPDATE mail_outbox SET status = 'queued', attempts = attempts - 1, last_error = ?, "
+            "next_attempt_at = ? WHERE id = ?",
+            requeue,
+        )
+        conn.commit()
+        for error, _ in failed:
+            print(f"[mail] message failed: {error}")
+        if pause is not None:
+            print(f"[mail] SMTP connect failed ({requeue[0][0]}); {len(requeue)} message(s) re-queued, "
+                  f"backing off {pause:.1f}s")
+        return pause
+
+
+mail_outbox = MailOutbox()
+metrics.register_collector(mail_outbox.metric_samples)
@@ -0,0 +1,443 @@
+"""
+metrics.py — In-process counters, gauges and histograms, exported as JSON
+snapshots or in the Prometheus text format (GET /metrics).
+
+Metric families are created once, at import time, by the module that owns
+them. Each labelled series is created on first use:
+
+    STAGE_SECONDS = metrics.histogram("ml_stage_seconds", "...", SECONDS_BUCKETS)
+    STAGE_SECONDS.labels(pipeline="preliminary", stage="clean").observe(0.012)
+
+Histograms use fixed cumulative-style buckets (value <= le), so a snapshot
+can be turned into any exposition format without keeping raw samples.
+Quantiles in snapshots are interpolated within the buckets.
+
+Figures another component already counts (pool sizes, cache hit counters)
+are not duplicated. The owning module registers a collector that reads them
+at scrape time (MetricsRegistry.register_collector).
+
+MetricsMiddleware records request count, latency and in-flight requests per
+route template. track_call() times calls to external services (Geoapify,
+the Property API, SMTP).
+
+StageTimer measures consecutive stages of one pipeline run: wall time,
+rows/sec and peak memory. Peak memory comes from tracemalloc when
+ML_STAGE_TRACEMALLOC=1 (exact Python/numpy allocations, but slower).
+Otherwise it is the growth of the process's peak RSS during the stage, which
+is cheap but only counts memory beyond the previous high-water mark. The
+timer's report is a plain dict, so a pool worker can return it alongside its
+result and the parent records it (see record_stages).
+"""
+
+import math
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+try:
+    import resource
+except ImportError:                     # Windows: no getrusage
+    resource = None
+
+ML_STAGE_TRACEMALLOC = os.getenv("ML_STAGE_TRACEMALLOC", "0") == "1"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROWS_PER_SECOND_BUCKETS = (10, 50, 100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+BYTES_BUCKETS = tuple(float(1 << shift) for shift in range(16, 33, 2))   # 64 KiB … 4 GiB
+
+
+# ─── Series ───────────────────────────────────────────────────────────────────
+
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> dict:
+        return {"value": self.value}
+
+
+class Gauge:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def snapshot(self) -> dict:
+        return {"value": self.value}
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self.last = value
+            if value > self.max:
+                self.max = value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """[(le, count of observations <= le), ..., (inf, total)]"""
+        with self._lock:
+            counts = list(self._counts)
+        out, running = [], 0
+        for le, n in zip(self.buckets + (math.inf,), counts):
+            running += n
+            out.append((le, running))
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Linear interpolation inside the bucket holding the q-th observation."""
+        cumulative = self.cumulative()
+        total = cumulative[-1][1]
+        if not total:
+            return None
+        target = q * total
+        lower, below = 0.0, 0
+        for le, running in cumulative:
+            if running >= target:
+                if math.isinf(le):
+                    return self.max
+                in_bucket = running - below
+                estimate = lower + (le - lower) * ((target - below) / in_bucket if in_bucket else 1.0)
+                return min(estimate, self.max)
+            lower, below = le, running
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum":   self.sum,
+            "mean":  self.sum / self.count if self.count else None,
+            "last":  self.last,
+            "max":   self.max,
+            "p50":   self.quantile(0.50),
+            "p95":   self.quantile(0.95),
+            "p99":   self.quantile(0.99),
+        }
+
+
+class _Family:
+    def __init__(self, name: str, help_text: str, kind: str, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._series: dict[tuple, object] = {}
+
+    def labels(self, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._factory())
+        return series
+
+    def series(self) -> list[tuple[dict, object]]:
+        with self._lock:
+            return [(dict(key), series) for key, series in self._series.items()]
+
+    def snapshot(self) -> dict:
+        return {
+            "type":   self.kind,
+            "help":   self.help,
+            "series": [{"labels": labels, **series.snapshot()} for labels, series in self.series()],
+        }
+
+
+# (name, kind, help, labels, value) — one sample produced by a collector
+Sample = tuple[str, str, str, dict, float]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: dict[str, _Family] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def _family(self, name: str, help_text: str, kind: str, factory) -> _Family:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = _Family(name, help_text, kind, factory)
+            elif family.kind != kind:
+                raise ValueError(f"Metric '{name}' already registered as a {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str) -> _Family:
+        return self._family(name, help_text, "counter", Counter)
+
+    def gauge(self, name: str, help_text: str) -> _Family:
+        return self._family(name, help_text, "gauge", Gauge)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = SECONDS_BUCKETS) -> _Family:
+        return self._family(name, help_text, "histogram", lambda: Histogram(buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """collector() is called on every scrape and yields (name, kind, help, labels, value)."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def families(self) -> list[_Family]:
+        with self._lock:
+            return list(self._families.values())
+
+    def collect(self) -> list[Sample]:
+        with self._lock:
+            collectors = list(self._collectors)
+        samples = []
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception as exc:
+                print(f"[metrics] collector {getattr(collector, '__name__', collector)!r} failed: {exc!r}")
+        return samples
+
+    def snapshot(self, prefix: str = "") -> dict:
+        return {f.name: f.snapshot() for f in self.families() if f.name.startswith(prefix)}
+
+    def render_prometheus(self) -> str:
+        """All families and collector samples in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for family in sorted(self.families(), key=lambda f: f.name):
+            series = family.series()
+            if not series:
+                continue
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, s in series:
+                if family.kind == "histogram":
+                    for le, count in s.cumulative():
+                        lines.append(f"{family.name}_bucket{_labels({**labels, 'le': _number(le)})} {count}")
+                    lines.append(f"{family.name}_sum{_labels(labels)} {_number(s.sum)}")
+                    lines.append(f"{family.name}_count{_labels(labels)} {s.count}")
+                else:
+                    lines.append(f"{family.name}{_labels(labels)} {_number(s.value)}")
+
+        grouped: dict[str, list[Sample]] = {}
+        for sample in self.collect():
+            grouped.setdefault(sample[0], []).append(sample)
+        for name in sorted(grouped):
+            _, kind, help_text, _, _ = grouped[name][0]
+            lines.append(f"# HELP {name} {_escape_help(help_text)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for _, _, _, labels, value in grouped[name]:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items()) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+# ─── Pipeline stages ──────────────────────────────────────────────────────────
+
+STAGE_SECONDS = metrics.histogram(
+    "ml_stage_seconds", "Wall time of one ML pipeline stage.", SECONDS_BUCKETS,
+)
+STAGE_ROWS_PER_SECOND = metrics.histogram(
+    "ml_stage_rows_per_second", "Rows processed per second by one ML pipeline stage.", ROWS_PER_SECOND_BUCKETS,
+)
+STAGE_PEAK_BYTES = metrics.histogram(
+    "ml_stage_peak_bytes", "Peak memory attributed to one ML pipeline stage.", BYTES_BUCKETS,
+)
+
+
+def _peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageTimer:
+    """Times consecutive stages of one run; `stages` is the picklable report."""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.stages: dict[str, dict] = {}
+        self.memory_source = "tracemalloc" if ML_STAGE_TRACEMALLOC else "rss"
+        if ML_STAGE_TRACEMALLOC and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        rows = self.rows if rows is None else rows
+        if self.memory_source == "tracemalloc":
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        else:
+            mem_start = _peak_rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            if self.memory_source == "tracemalloc":
+                peak = max(0, tracemalloc.get_traced_memory()[1] - mem_start)
+            else:
+                peak = max(0, _peak_rss_bytes() - mem_start)
+            self.stages[name] = {
+                "seconds":      seconds,
+                "rows":         rows,
+                "rows_per_s":   rows / seconds if seconds > 0 else None,
+                "peak_bytes":   peak,
+                "memory":       self.memory_source,
+            }
+
+
+def record_stages(pipeline: str, stages: dict) -> None:
+    """Fold a StageTimer report (possibly from another process) into the stage histograms."""
+    for stage, report in stages.items():
+        STAGE_SECONDS.labels(pipeline=pipeline, stage=stage).observe(report["seconds"])
+        if report.get("rows_per_s") is not None:
+            STAGE_ROWS_PER_SECOND.labels(pipeline=pipeline, stage=stage).observe(report["rows_per_s"])
+        if report.get("peak_bytes") is not None:
+            STAGE_PEAK_BYTES.labels(pipeline=pipeline, stage=stage).observe(report["peak_bytes"])
+
+
+# ─── HTTP requests ────────────────────────────────────────────────────────────
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests handled, by method, route and status.",
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Time from request to the end of the response body, by method and route.",
+)
+HTTP_IN_FLIGHT = metrics.gauge(
+    "http_requests_in_flight", "Requests being handled right now, open SSE streams included.",
+)
+
+
+def _route_label(scope) -> str:
+    """
+    The route template for a handled request, rebuilt from the request path
+    by putting the matched path parameters back as {name}. This works the
+    same whether or not the framework keeps included routers' prefixes on
+    the route object.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    segments = scope.get("path", "").split("/")
+    for name, value in (scope.get("path_params") or {}).items():
+        value = str(value)
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == value:
+                segments[i] = "{" + name + "}"
+                break
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (not BaseHTTPMiddleware), so streamed and SSE
+    responses pass through unbuffered. Requests are labelled with the route
+    template, e.g. /api/results/{submission_id}, never the raw path; requests
+    that match no route share the label "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels()
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = _route_label(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method=method, route=route, status=status).inc()
+            HTTP_REQUEST_SECONDS.labels(method=method, route=route).observe(time.perf_counter() - started)
+
+
+# ─── External calls ───────────────────────────────────────────────────────────
+
+EXTERNAL_CALL_SECONDS = metrics.histogram(
+    "external_call_duration_seconds", "Latency of calls to external services, by service, operation and outcome.",
+)
+EXTERNAL_CALL_ERRORS = metrics.counter(
+    "external_call_errors_total", "Failed calls to external services, by service, operation and error type.",
+)
+
+
+@contextmanager
+def track_call(service: str, operation: str):
+    """Time the enclosed call to an external service; exceptions count as errors and propagate."""
+    outcome = "ok"
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        outcome = "error"
+        EXTERNAL_CALL_ERRORS.labels(service=service, operation=operation, error=type(exc).__name__).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_SECONDS.labels(service=service, operation=operation, outcome=outcome).observe(
+            time.perf_counter() - started
+        )
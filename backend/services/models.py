@@ -0,0 +1,279 @@
+"""
+models.py — Resident, versioned ML pipeline for Run 1 inference.
+
+The registry imports the `ml_pipeline` stages (clean → rules → features →
+preprocess → shap → predict) once. It loads the model artifacts through the
+package's optional hooks and runs a warm-up inference on a couple of catalog
+rows. After that the loaded model stays resident in the process, so only the
+first request pays the loading cost.
+
+Optional hooks the package may expose:
+- `ml_pipeline.model.load_model(version_dir)`: the XGBoost model, passed to
+  `predict_xgboost_model(..., model=...)` when that function accepts it.
+- `ml_pipeline.shap_utils.load_explainer(model)`: the SHAP explainer, passed
+  to `prop_shap(..., explainer=...)` in the same way.
+
+Versions are hot-swapped without a restart. swap(version) builds and warms
+the new model next to the old one, then replaces the active reference. In
+process pools each worker holds its own registry. The parent passes the
+wanted version with every call, and a worker that is behind swaps before
+running. Workers started after a swap (pool growth, respawn) read the
+version to preload from a process-shared cell the swap updates.
+
+If the package cannot be imported, the failure is remembered for
+ML_MODEL_RETRY_S so callers fall back to mocks without retrying the import
+on every request.
+"""
+
+import importlib
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Optional
+
+from services.metrics import STAGE_SECONDS, StageTimer, record_stages
+
+ML_MODEL_VERSION = os.getenv("ML_MODEL_VERSION", "default")
+ML_MODEL_DIR = os.getenv("ML_MODEL_DIR")                 # optional: <dir>/<version>/ holds artifacts
+ML_MODEL_RETRY_S = float(os.getenv("ML_MODEL_RETRY_S", "60"))
+ML_MODEL_WARMUP_ROWS = max(0, int(os.getenv("ML_MODEL_WARMUP_ROWS", "2")))
+ML_MODEL_WARMUP_CSV = os.getenv(
+    "ML_MODEL_WARMUP_CSV",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "Test", "Property_data - AI.csv"),
+)
+
+STAGES = ("clean", "rules", "features", "preprocess", "shap", "predict")
+
+_STAGE_MODULES = (
+    "ml_pipeline.clean",
+    "ml_pipeline.rules",
+    "ml_pipeline.features",
+    "ml_pipeline.preprocess",
+    "ml_pipeline.shap_utils",
+    "ml_pipeline.model",
+)
+
+
+class ModelUnavailable(RuntimeError):
+    """The ml_pipeline package (or the requested version) could not be loaded."""
+
+
+class StageFailed(RuntimeError):
+    """A pipeline stage raised; carries the stage name and the timings gathered so far."""
+
+    def __init__(self, stage: str, error: Exception, stages: dict):
+        super().__init__(f"{stage}: {type(error).__name__}: {error}")
+        self.stage = stage
+        self.stages = stages
+
+
+def _bind(fn: Callable, name: str, value) -> Callable:
+    """Pre-bind a resident artifact if the stage function accepts it."""
+    if value is None:
+        return fn
+    try:
+        accepts = name in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        accepts = False
+    return partial(fn, **{name: value}) if accepts else fn
+
+
+@dataclass
+class LoadedModel:
+    version: str
+    clean: Callable
+    rules: Callable
+    features: Callable
+    preprocess: Callable
+    shap: Callable
+    predict: Callable
+    load_seconds: float
+    loaded_at: float = field(default_factory=time.time)
+    warmup_seconds: Optional[float] = None
+
+    def run(self, df, include_vulnerability: bool) -> tuple:
+        """
+        Full pipeline on one DataFrame. Returns
+        (preds_raw, shap_global, shap_local, stages), where stages is the
+        StageTimer report. Raises StageFailed naming the stage that broke.
+        """
+        timer = StageTimer(len(df))
+        try:
+            with timer.stage("clean"):
+                df_clean = self.clean(df)
+            with timer.stage("rules"):
+                df_rules = self.rules(df_clean, {})
+            vul_weight = 0.6 if include_vulnerability else 0.0
+            with timer.stage("features"):
+                df_feat = self.features(df_rules, {}, vul_weight)
+            with timer.stage("preprocess"):
+                df_proc = self.preprocess(df_feat)
+            with timer.stage("shap"):
+                df_shap_local, df_shap_global = self.shap(df_proc)
+            with timer.stage("predict"):
+                preds_raw = self.predict(df_feat, df_proc)
+        except Exception as exc:
+            # the failing stage's timing was recorded on the way out
+            raise StageFailed(next(reversed(timer.stages)), exc, timer.stages) from exc
+        return preds_raw, df_shap_global, df_shap_local, timer.stages
+
+    def describe(self) -> dict:
+        return {
+            "version":        self.version,
+            "loaded_at":      self.loaded_at,
+            "load_seconds":   round(self.load_seconds, 6),
+            "warmup_seconds": None if self.warmup_seconds is None else round(self.warmup_seconds, 6),
+        }
+
+
+def _warmup_frame():
+    if not ML_MODEL_WARMUP_ROWS or not os.path.exists(ML_MODEL_WARMUP_CSV):
+        return None
+    import pandas as pd
+    return pd.read_csv(ML_MODEL_WARMUP_CSV, nrows=ML_MODEL_WARMUP_ROWS)
+
+
+class ModelRegistry:
+    def __init__(self, version: str = ML_MODEL_VERSION):
+        self.active_version = version      # what callers should run; set by swap()
+        self._lock = threading.Lock()          # held while loading
+        self._stats_lock = threading.Lock()
+        self._model: Optional[LoadedModel] = None
+        self._failure: Optional[tuple[str, float, str]] = None   # (version, at, error)
+        self._imported = False
+        self._reported: Optional[dict] = None  # last model a pool worker reported running
+        self.loads = 0
+
+    # ── loading ──────────────────────────────────────────────────────────────
+
+    def _import_stages(self) -> list:
+        modules = [importlib.import_module(name) for name in _STAGE_MODULES]
+        if self._imported:
+            # a swap picks up changed pipeline code and artifacts on disk
+            modules = [importlib.reload(module) for module in modules]
+        self._imported = True
+        return modules
+
+    def _load(self, version: str) -> LoadedModel:
+        started = time.perf_counter()
+        clean, rules, features, preprocess, shap_utils, model_mod = self._import_stages()
+
+        version_dir = os.path.join(ML_MODEL_DIR, version) if ML_MODEL_DIR else None
+        model = explainer = None
+        if hasattr(model_mod, "load_model"):
+            model = model_mod.load_model(version_dir)
+        if hasattr(shap_utils, "load_explainer"):
+            explainer = shap_utils.load_explainer(model)
+
+        loaded = LoadedModel(
+            version=version,
+            clean=clean.clean_table,
+            rules=rules.apply_evaluation,
+            features=features.engineer_features,
+            preprocess=preprocess.preprocess_submission_data,
+            shap=_bind(shap_utils.prop_shap, "explainer", explainer),
+            predict=_bind(model_mod.predict_xgboost_model, "model", model),
+            load_seconds=time.perf_counter() - started,
+        )
+
+        df = _warmup_frame()
+        if df is not None:
+            warm_started = time.perf_counter()
+            try:
+                loaded.run(df, include_vulnerability=False)
+                loaded.warmup_seconds = time.perf_counter() - warm_started
+            except Exception as exc:
+                print(f"[models] warm-up for version {version} failed: {exc!r}")
+        self.loads += 1
+        print(f"[models] loaded version {version} in {loaded.load_seconds:.3f}s")
+        return loaded
+
+    def get(self, version: Optional[str] = None) -> LoadedModel:
+        """The resident model for `version` (default: active), loading or swapping on first use."""
+        version = version or self.active_version
+        model = self._model
+        if model is not None and model.version == version:
+            return model
+        with self._lock:
+            if self._model is not None and self._model.version == version:
+                return self._model
+            if self._failure and self._failure[0] == version and time.time() - self._failure[1] < ML_MODEL_RETRY_S:
+                raise ModelUnavailable(self._failure[2])
+            try:
+                self._model = self._load(version)
+            except Exception as exc:
+                self._failure = (version, time.time(), f"{type(exc).__name__}: {exc}")
+                raise ModelUnavailable(self._failure[2]) from exc
+            self._failure = None
+            return self._model
+
+    def swap(self, version: str) -> dict:
+        """Load and warm `version`, then make it active. The old model serves until then."""
+        with self._lock:
+            self._failure = None
+        model = self.get(version)
+        self.active_version = version
+        return model.describe()
+
+    # ── reporting ────────────────────────────────────────────────────────────
+
+    def record(self, pipeline: str, stages: dict, model: Optional[dict] = None) -> None:
+        """Fold one run's stage report (and the reporting worker's model) into the metrics."""
+        record_stages(pipeline, stages)
+        if model is not None:
+            with self._stats_lock:
+                self._reported = model
+
+    def status(self) -> dict:
+        with self._stats_lock:
+            model, failure, reported = self._model, self._failure, self._reported
+        stages: dict[str, dict] = {}
+        for labels, hist in STAGE_SECONDS.series():
+            if labels.get("stage") not in STAGES or not hist.count:
+                continue
+            stages.setdefault(labels["pipeline"], {})[labels["stage"]] = {
+                "count":   hist.count,
+                "mean_ms": round(hist.sum / hist.count * 1000, 3),
+                "p95_ms":  round(hist.quantile(0.95) * 1000, 3),
+                "last_ms": round(hist.last * 1000, 3),
+                "max_ms":  round(hist.max * 1000, 3),
+            }
+        return {
+            "active_version": self.active_version,
+            "resident":       model.describe() if model else reported,
+            "loads":          self.loads,
+            "last_error":     failure[2] if failure else None,
+            "stages":         stages,
+        }
+
+
+model_registry = ModelRegistry()
+
+
+def preload_model(version: Optional[str] = None) -> None:
+    """Pool initializer: load (and warm) the model before the first request reaches this worker."""
+    try:
+        model_registry.get(version)
+    except ModelUnavailable as exc:
+        print(f"[models] preload skipped: {exc}")
+
+
+def shared_version(version: Optional[str] = None):
+    """Process-shared cell holding a model version; pass it to new workers as an initializer arg."""
+    cell = multiprocessing.get_context("spawn").Array("c", 256)
+    cell.value = (version or "").encode()
+    return cell
+
+
+def preload_shared_version(cell) -> None:
+    """Pool initializer: preload whatever version `cell` holds when this worker starts."""
+    preload_model(cell.value.decode() or None)
+
+
+def load_model_version(version: str) -> dict:
+    """Make `version` resident in the calling process; returns its load report."""
+    return model_registry.swap(version)
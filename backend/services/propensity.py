@@ -0,0 +1,28 @@
+"""
+propensity.py — Quote-propensity thresholds and tiers, shared by the ML
+scoring endpoints and the property index so both always agree.
+"""
+
+HIGH_PROPENSITY_THRESHOLD = 0.70
+LOW_PROPENSITY_THRESHOLD = 0.30
+
+TIERS = ("Low", "Mid", "High")      # in threshold order
+
+
+def tier_for_score(score: float) -> str:
+    """High / Mid / Low tier for a quote-propensity probability."""
+    if score >= HIGH_PROPENSITY_THRESHOLD:
+        return "High"
+    if score >= LOW_PROPENSITY_THRESHOLD:
+        return "Mid"
+    return "Low"
+
+
+def tier_for_label(label: str) -> str:
+    label = (label or "").lower()
+    return "High" if "high" in label else "Mid" if "mid" in label else "Low"
+
+
+def propensity_label(score: float) -> str:
+    """'High Propensity' / 'Mid Propensity' / 'Low Propensity' for a probability."""
+    return f"{tier_for_score(score)} Propensity"
@@ -0,0 +1,104 @@
+"""
+property_index.py — Joined per-property view keyed by submission_id.
+
+Each catalog row is joined with its prediction, local SHAP vector and
+vulnerability document in one pass. Predictions are matched by catalog position,
+which is how the demo data is aligned. Triage and results endpoints then
+resolve a property in O(1) by submission_id or catalog id. The index is
+rebuilt lazily whenever the catalog snapshot's version changes.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from services.catalog import FileBackedCatalog
+from services.propensity import tier_for_label
+
+
+@dataclass(frozen=True)
+class PropertyEntry:
+    position: int
+    property: dict
+    prediction: Optional[dict]
+    local_shap: Optional[list]
+    vulnerability: Optional[dict]
+
+    @property
+    def submission_id(self) -> str:
+        return self.property["submission_id"]
+
+    @property
+    def scored(self) -> bool:
+        return self.prediction is not None
+
+    @property
+    def excluded(self) -> bool:
+        return bool(self.prediction and self.prediction.get("excluded", False))
+
+    @property
+    def tier(self) -> Optional[str]:
+        return tier_for_label(self.prediction["quote_propensity"]) if self.prediction else None
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    version: str
+    entries: list
+    by_submission_id: dict
+    by_id: dict
+    # scored, non-excluded entries per tier, in catalog order
+    tiers: dict
+
+
+class PropertyIndex:
+    def __init__(self, catalog: FileBackedCatalog, predictions: list, local_shap: list, vulnerability: list):
+        self._catalog = catalog
+        self._predictions = predictions
+        self._local_shap = local_shap
+        self._vulnerability = vulnerability
+        self._lock = threading.Lock()
+        self._snapshot: Optional[IndexSnapshot] = None
+        self.builds = 0
+
+    def _build(self, version: str, records: list) -> IndexSnapshot:
+        def at(seq: list, pos: int):
+            return seq[pos] if pos < len(seq) else None
+
+        entries = []
+        tiers: dict[str, list] = {"High": [], "Mid": [], "Low": []}
+        for pos, record in enumerate(records):
+            entry = PropertyEntry(
+                position=pos,
+                property=record,
+                prediction=at(self._predictions, pos),
+                local_shap=at(self._local_shap, pos),
+                vulnerability=at(self._vulnerability, pos),
+            )
+            entries.append(entry)
+            if entry.scored and not entry.excluded:
+                tiers[entry.tier].append(entry)
+        return IndexSnapshot(
+            version=version,
+            entries=entries,
+            by_submission_id={e.submission_id: e for e in entries},
+            by_id={e.property.get("id"): e for e in entries},
+            tiers=tiers,
+        )
+
+    def snapshot(self) -> IndexSnapshot:
+        catalog_snapshot = self._catalog.snapshot()
+        snap = self._snapshot
+        if snap is not None and snap.version == catalog_snapshot.version:
+            return snap
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != catalog_snapshot.version:
+                self._snapshot = self._build(catalog_snapshot.version, catalog_snapshot.records)
+                self.builds += 1
+            return self._snapshot
+
+    def get(self, submission_id: str) -> Optional[PropertyEntry]:
+        return self.snapshot().by_submission_id.get(submission_id)
+
+    def get_by_id(self, property_id: int) -> Optional[PropertyEntry]:
+        return self.snapshot().by_id.get(property_id)
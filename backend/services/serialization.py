@@ -0,0 +1,48 @@
+"""
+serialization.py — orjson encoding for API responses.
+
+FastJSONResponse is the app's default response class. Returning a dict from
+a route still goes through FastAPI's jsonable_encoder first, so endpoints
+with large bodies build the response themselves with json_response(), which
+encodes the content in one orjson call. numpy scalars and arrays are
+serialized natively.
+
+JSON that is already stored as text (SHAP vectors, vulnerability documents)
+can be embedded with raw_json() instead of being parsed and re-encoded.
+"""
+
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; NaN/inf become null."""
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def raw_json(text: Optional[str], default: str = "null") -> orjson.Fragment:
+    """Embed an already-serialized JSON document (e.g. a stored blob) as-is."""
+    return orjson.Fragment(text or default)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[dict] = None) -> FastJSONResponse:
+    """Encode `content` directly, skipping jsonable_encoder."""
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,154 @@
+"""
+templates.py — Precompiled email templates and a fast MIME composer.
+
+Templates are string.Template objects compiled once at import. Rendering a
+message substitutes the fields and then composes the multipart/alternative
+text directly. No email.mime object tree is built per message.
+
+The parts that do not change between recipients are cached:
+- the encoded MIME part for each distinct body (a tier's letters usually share
+  one body per broker);
+- the RFC 2047-encoded form of each distinct header value.
+
+render_many() renders a whole recipient list in one pass.
+
+Addresses and the subject are checked before they are written into headers:
+a value with CR/LF, or an address parseaddr cannot read as one mailbox, raises
+InvalidHeaderError instead of producing a message with injected headers.
+"""
+
+import base64
+import html
+import uuid
+from dataclasses import dataclass
+from email.utils import formataddr, parseaddr
+from functools import lru_cache
+from string import Template
+from typing import Iterable, Optional
+
+# One boundary per process: bodies are base64 or plain text, so a random
+# token cannot collide with their content in practice.
+_BOUNDARY = f"==============={uuid.uuid4().int % 10**19:019d}=="
+
+TEMPLATE_CACHE_SIZE = 4096
+
+
+class InvalidHeaderError(ValueError):
+    """A header value (address or subject) that cannot be written safely."""
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    sender: str
+    recipient: str
+    subject: str
+    message: str    # full RFC 5322 text, ready for sendmail()
+
+
+# 45 input bytes → 60 base64 chars, so each encoded word stays under RFC 2047's 75
+_ENCODED_WORD_BYTES = 45
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _encode_header(value: str) -> str:
+    """
+    RFC 2047 base64 encoded-words, folded one per line. Decodes to the same
+    text as email.header.Header(value, "utf-8").encode(), at a fraction of
+    the cost when every subject line is different.
+    """
+    if value.isascii():
+        return value
+    words, chunk, size = [], [], 0
+    for ch in value:
+        n = len(ch.encode("utf-8"))
+        if size + n > _ENCODED_WORD_BYTES:
+            words.append("".join(chunk))
+            chunk, size = [], 0
+        chunk.append(ch)
+        size += n
+    words.append("".join(chunk))
+    return "\n ".join(
+        f"=?utf-8?b?{base64.b64encode(word.encode('utf-8')).decode('ascii')}?=" for word in words
+    )
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _encode_part(subtype: str, body: str) -> str:
+    """One MIME body part, matching what MIMEText(body, subtype) would produce."""
+    if body.isascii():
+        return (
+            f'Content-Type: text/{subtype}; charset="us-ascii"\n'
+            f"MIME-Version: 1.0\n"
+            f"Content-Transfer-Encoding: 7bit\n\n"
+            f"{body}"
+        )
+    payload = base64.encodebytes(body.encode("utf-8")).decode("ascii")
+    return (
+        f'Content-Type: text/{subtype}; charset="utf-8"\n'
+        f"MIME-Version: 1.0\n"
+        f"Content-Transfer-Encoding: base64\n\n"
+        f"{payload}"
+    )
+
+
+def _check_header(value: str) -> str:
+    if "\r" in value or "\n" in value:
+        raise InvalidHeaderError(f"line break in header value {value!r}")
+    return value
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def format_address(value: str) -> str:
+    """Header form of a single mailbox ("Name <a@b>" or "a@b"); raises InvalidHeaderError."""
+    name, addr = parseaddr(_check_header(value))
+    local, at, domain = addr.rpartition("@")
+    if not (local and at and domain) or any(ch.isspace() for ch in addr):
+        raise InvalidHeaderError(f"not a valid email address: {value!r}")
+    return formataddr((name, addr))
+
+
+def compose_message(sender: str, recipient: str, subject: str, plain: str, html_body: str) -> str:
+    """multipart/alternative message text with a plain and an HTML part."""
+    return (
+        f'Content-Type: multipart/alternative; boundary="{_BOUNDARY}"\n'
+        f"MIME-Version: 1.0\n"
+        f"Subject: {_encode_header(_check_header(subject))}\n"
+        f"From: {format_address(sender)}\n"
+        f"To: {format_address(recipient)}\n\n"
+        f"--{_BOUNDARY}\n"
+        f"{_encode_part('plain', plain)}\n"
+        f"--{_BOUNDARY}\n"
+        f"{_encode_part('html', html_body)}\n"
+        f"--{_BOUNDARY}--\n"
+    )
+
+
+class EmailTemplate:
+    """
+    Subject, plain-text and HTML bodies as $-placeholders (string.Template).
+    `defaults` are fields that never change (sender address, base URLs); they
+    are substituted once at compile time. Field values are HTML-escaped for
+    the HTML body only.
+    """
+
+    def __init__(self, name: str, subject: str, plain: str, html_body: str, defaults: Optional[dict] = None):
+        defaults = defaults or {}
+        escaped = {k: html.escape(str(v)) for k, v in defaults.items()}
+        self.name = name
+        self._subject = Template(Template(subject).safe_substitute(defaults))
+        self._plain = Template(Template(plain).safe_substitute(defaults))
+        self._html = Template(Template(html_body).safe_substitute(escaped))
+
+    def render(self, sender: str, recipient: str, fields: dict) -> RenderedEmail:
+        escaped = {k: html.escape(str(v)) for k, v in fields.items()}
+        subject = self._subject.substitute(fields)
+        message = compose_message(
+            sender, recipient, subject,
+            self._plain.substitute(fields),
+            self._html.substitute(escaped),
+        )
+        return RenderedEmail(sender, recipient, subject, message)
+
+    def render_many(self, sender: str, recipients: Iterable[tuple[str, dict]]) -> list[RenderedEmail]:
+        """Render one message per (recipient, fields) pair."""
+        return [self.render(sender, recipient, fields) for recipient, fields in recipients]
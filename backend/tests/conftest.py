@@ -0,0 +1,19 @@
+"""
+conftest.py — Point the app at a throwaway database and property book.
+
+The settings are read at import time, so they are set here before any test
+imports an app module.
+"""
+
+import os
+import sys
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="underwriting-tests-")
+os.environ["UNDERWRITING_DB_PATH"] = os.path.join(_workdir, "underwriting.db")
+os.environ["PROPERTY_CSV_PATH"] = os.path.join(_workdir, "properties.csv")
+os.environ.setdefault("ML_MODEL_PRELOAD", "0")
+os.environ.setdefault("ML_CPU_POOL_KIND", "thread")
+os.environ.setdefault("ML_JOB_EVENTS_POLL_S", "0.1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
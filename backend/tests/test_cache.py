@@ -0,0 +1,46 @@
+"""
+test_cache.py — PersistentCache: memory and SQLite tiers, expiry, storage errors.
+"""
+
+import sqlite3
+
+import pytest
+
+from database import init_db
+from services import cache
+from services.cache import PersistentCache
+
+
+@pytest.fixture
+def geocodes():
+    init_db()
+    return PersistentCache("test-geocode", ttl_seconds=60, max_memory_entries=8, max_rows=100)
+
+
+def test_entries_survive_a_restart_through_sqlite(geocodes):
+    geocodes.put("1 main st", {"lat": 1.0})
+    restarted = PersistentCache("test-geocode", ttl_seconds=60, max_memory_entries=8, max_rows=100)
+
+    assert restarted.get("1 main st") == {"lat": 1.0}
+    assert (restarted.disk_hits, restarted.memory_hits) == (1, 0)
+    assert restarted.get("1 main st") == {"lat": 1.0}
+    assert restarted.memory_hits == 1
+
+
+def test_entries_older_than_max_age_are_misses_but_kept(geocodes):
+    geocodes.put("2 main st", {"lat": 2.0})
+
+    assert geocodes.get("2 main st", max_age=0) is None
+    assert geocodes.get("2 main st") == {"lat": 2.0}
+
+
+def test_storage_errors_are_counted_not_raised(geocodes, monkeypatch):
+    def broken():
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(cache, "get_connection", broken)
+    geocodes.put("3 main st", {"lat": 3.0})
+
+    assert geocodes.get("3 main st") == {"lat": 3.0}       # still in memory
+    assert geocodes.get("4 main st") is None
+    assert geocodes.errors == 2
@@ -0,0 +1,60 @@
+"""
+test_catalog.py — File-backed catalog: build once, reload on change, ETag 304.
+"""
+
+import os
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.catalog import FileBackedCatalog
+
+
+def _catalog(path) -> FileBackedCatalog:
+    def load(p):
+        with open(p) as f:
+            lines = f.read().splitlines()
+        if "broken" in lines:
+            raise ValueError("unparseable")
+        return lines
+
+    return FileBackedCatalog("test", str(path), load, lambda: ["fallback"])
+
+
+def test_file_is_parsed_once_until_it_changes(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_text("a\nb\n")
+    catalog = _catalog(path)
+
+    first = catalog.snapshot()
+    assert catalog.snapshot() is first
+    assert catalog.loads == 1
+
+    path.write_text("a\nb\nc\n")
+    second = catalog.snapshot()
+    assert second.records == ["a", "b", "c"]
+    assert second.etag != first.etag
+
+
+def test_a_failed_reload_keeps_the_last_good_records(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_text("a\n")
+    catalog = _catalog(path)
+    catalog.snapshot()
+
+    path.write_text("broken\nlonger\n")
+    assert catalog.snapshot().records == ["a"]
+
+
+def test_missing_file_uses_the_fallback(tmp_path):
+    catalog = _catalog(os.path.join(tmp_path, "missing.txt"))
+    assert catalog.snapshot().records == ["fallback"]
+
+
+def test_properties_answer_if_none_match_with_304():
+    client = TestClient(app)
+    first = client.get("/api/properties")
+    assert first.status_code == 200
+
+    again = client.get("/api/properties", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
@@ -0,0 +1,45 @@
+"""
+test_executors.py — Bounded pools: admission, saturation and stats.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.executors import BoundedPool, PoolSaturated
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    pool = BoundedPool("test", "thread", workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        stats = pool.stats()
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        return stats
+
+    try:
+        busy = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert (busy["active"], busy["queue_depth"]) == (1, 1)
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["active"]) == (2, 1, 0)
+
+
+def test_failed_tasks_free_their_slot():
+    pool = BoundedPool("test", "thread", workers=1, max_queue=0)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            pool.call(lambda: 1 / 0)
+        assert pool.call(lambda: 2) == 2
+    finally:
+        pool.shutdown()
+    assert (pool.failed, pool.completed) == (1, 1)
@@ -0,0 +1,41 @@
+"""
+test_final_score.py — Run 2 blend, rounding and weight validation.
+"""
+
+import numpy as np
+import pytest
+
+from routers.ml import _final_weights, _score_final
+
+
+def test_scores_match_the_row_by_row_formula():
+    vuln = np.array([95.0, 100.0, 0.0, 40.0, 73.0])
+    prelim = np.array([0.09625, 0.07125, 1.0, 0.55, 0.3333])
+
+    final, labels, below = _score_final(prelim, vuln, 0.6, 0.4)
+
+    # pinned from round(((100 - v) / 100) * 0.6 + p * 0.4, 3)
+    assert final.tolist() == [0.069, 0.028, 1.0, 0.58, 0.295]
+    assert [round(((100 - v) / 100.0) * 0.6 + p * 0.4, 3) for v, p in zip(vuln.tolist(), prelim.tolist())] == final.tolist()
+    assert labels.tolist()[2] == "High Propensity"
+    assert below.tolist()[:2] == [True, True]
+
+
+@pytest.mark.parametrize("weights, expected", [
+    (None, (0.6, 0.4)),
+    ({"vulnerability": 0.7}, (0.7, pytest.approx(0.3))),
+    ({"preliminary": 0.25}, (0.75, 0.25)),
+])
+def test_weights(weights, expected):
+    assert _final_weights(weights) == expected
+
+
+@pytest.mark.parametrize("weights, message", [
+    ({"vulnerability": -0.1}, "non-negative"),
+    ({"vulnerability": float("nan")}, "finite"),
+    ({"preliminary": float("inf")}, "finite"),
+    ({"vulnerability": "high"}, "must be numbers"),
+])
+def test_invalid_weights(weights, message):
+    with pytest.raises(ValueError, match=message):
+        _final_weights(weights)
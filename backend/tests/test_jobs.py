@@ -0,0 +1,151 @@
+"""
+test_jobs.py — Job event streams replay stored output and always end.
+"""
+
+import json
+import threading
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from database import get_connection, init_db
+from main import app
+from services.jobs import job_engine
+
+
+def _events(client: TestClient, job_id: str) -> list[tuple[str, dict]]:
+    """(event, data) pairs from the job's SSE stream, read until the server closes it."""
+    events, name = [], None
+    with client.stream("GET", f"/api/ml/jobs/{job_id}/events") as response:
+        assert response.status_code == 200
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((name, json.loads(line[len("data: "):])))
+    return events
+
+
+def _wait_finished(job_id: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_engine.get(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _chunked(payload, emit):
+    for i in range(payload["chunks"]):
+        emit({"values": [i]}, i + 1)
+    return {"row_count": payload["chunks"]}
+
+
+def _failing(payload, emit):
+    emit({"values": [0]}, 1)
+    raise RuntimeError("boom")
+
+
+job_engine.register("test-chunked", _chunked)
+job_engine.register("test-failing", _failing)
+
+
+def test_finished_job_stream_replays_chunks_and_ends_with_completed():
+    init_db()
+    client = TestClient(app)
+    job = job_engine.submit("test-chunked", {"chunks": 3}, 3)
+    _wait_finished(job["job_id"])
+
+    events = _events(client, job["job_id"])
+    assert [name for name, _ in events] == ["chunk", "chunk", "chunk", "status", "completed"]
+    assert [data["values"] for name, data in events if name == "chunk"] == [[0], [1], [2]]
+    assert events[-1][1]["row_count"] == 3
+
+
+def test_failed_job_stream_ends_with_failed():
+    init_db()
+    client = TestClient(app)
+    job = job_engine.submit("test-failing", {}, 1)
+    _wait_finished(job["job_id"])
+
+    events = _events(client, job["job_id"])
+    assert events[0][0] == "chunk"
+    assert events[-1][0] == "failed"
+    assert "boom" in events[-1][1]["error"]
+
+
+def test_stream_opened_mid_job_gets_every_chunk_once():
+    init_db()
+    client = TestClient(app)
+    release = threading.Event()
+
+    def gated(payload, emit):
+        emit({"values": [0]}, 1)
+        release.wait(5)
+        emit({"values": [1]}, 2)
+        return {"row_count": 2}
+
+    job_engine.register("test-gated", gated)
+    job = job_engine.submit("test-gated", {}, 2)
+    while job_engine.get(job["job_id"])["chunks"] < 1:
+        time.sleep(0.01)
+
+    threading.Timer(0.2, release.set).start()
+    events = _events(client, job["job_id"])
+    assert [data["values"] for name, data in events if name == "chunk"] == [[0], [1]]
+    assert events[-1][0] == "completed"
+
+
+def _insert_job(job_id: str, status: str, owner: str, lease_expires_at: float) -> None:
+    conn = get_connection()
+    try:
+        conn.execute(
+            "INSERT INTO ml_jobs (id, kind, status, payload, total_rows, owner, lease_expires_at) "
+            "VALUES (?, 'test-chunked', ?, '{\"chunks\": 1}', 1, ?, ?)",
+            (job_id, status, owner, lease_expires_at),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_recover_leaves_live_leases_alone():
+    init_db()
+    live, expired = uuid.uuid4().hex, uuid.uuid4().hex
+    _insert_job(live, "running", "other-host:1:live", time.time() + 60)
+    _insert_job(expired, "running", "other-host:2:dead", time.time() - 1)
+
+    job_engine.recover()
+
+    assert job_engine.get(live)["status"] == "running"
+    assert _wait_finished(expired)["status"] == "completed"
+
+
+def test_stream_follows_a_job_run_by_another_process():
+    init_db()
+    client = TestClient(app)
+    job_id = uuid.uuid4().hex
+    _insert_job(job_id, "running", "other-host:3:live", time.time() + 60)
+
+    def finish_elsewhere():
+        # what the owning process writes; its bus events never reach this one
+        conn = get_connection()
+        try:
+            conn.execute(
+                "INSERT INTO ml_job_chunks (job_id, chunk_index, data) VALUES (?, 0, '{\"values\": [7]}')",
+                (job_id,),
+            )
+            conn.execute(
+                "UPDATE ml_jobs SET status = 'completed', summary = '{\"row_count\": 1}' WHERE id = ?",
+                (job_id,),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    threading.Timer(0.3, finish_elsewhere).start()
+    events = _events(client, job_id)
+    assert [data["values"] for name, data in events if name == "chunk"] == [[7]]
+    assert events[-1] == ("completed", {"type": "completed", "row_count": 1})
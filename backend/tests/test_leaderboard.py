@@ -0,0 +1,87 @@
+"""
+test_leaderboard.py — Ranking, windows, retention and cross-process sync.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from database import get_connection, init_db
+from main import app
+from services.leaderboard import Leaderboard, leaderboard, rebuild_leaderboard
+
+NOW = datetime.now(timezone.utc)
+
+
+def _stamp(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_rank_and_windows():
+    board = Leaderboard()
+    board.record(1, "Ana", 80.0, _stamp(NOW))
+    board.record(2, "Ben", 90.0, _stamp(NOW - timedelta(days=8)))
+    board.record(3, "Cy", 80.0, _stamp(NOW))
+
+    assert [e["submission_id"] for e in board.top(10)] == [2, 1, 3]
+    assert board.rank(2)["rank"] == 1
+    assert board.rank(2)["total"] == 3
+    assert board.rank(2, "daily") is None
+    assert {e["submission_id"] for e in board.top(10, "daily")} == {1, 3}
+
+    board.record(1, "Ana", 95.0, _stamp(NOW))      # rescoring moves the entry
+    assert board.rank(1)["rank"] == 1
+    assert len(board) == 3
+
+
+def test_ties_rank_earlier_submission_first():
+    board = Leaderboard()
+    board.record(1, "Ana", 70.0, "2026-01-02 10:00:00")
+    board.record(2, "Ben", 70.0, "2026-01-01 10:00:00")
+    assert [e["submission_id"] for e in board.top(10)] == [2, 1]
+
+
+def test_old_buckets_are_pruned_by_age():
+    board = Leaderboard()
+    board.record(1, "Ana", 50.0, _stamp(NOW - timedelta(days=400)))
+    board.record(2, "Ben", 60.0, _stamp(NOW))
+
+    assert board.rank(1)["rank"] == 2                    # all-time keeps everything
+    assert list(board._daily) == [_stamp(NOW)[:10]]
+    assert len(board._weekly) == 1
+
+
+def _scored_submission(name: str, score: float) -> int:
+    conn = get_connection()
+    try:
+        cur = conn.execute(
+            "INSERT INTO submissions (underwriter_name, prioritized_ids, discarded_ids) VALUES (?, '[]', '[]')",
+            (name,),
+        )
+        conn.execute("UPDATE submissions SET score = ? WHERE id = ?", (score, cur.lastrowid))
+        conn.commit()
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def test_scores_written_by_another_process_show_up():
+    init_db()
+    rebuild_leaderboard()
+    client = TestClient(app)
+
+    # written straight to the database, as a sibling worker would
+    submission_id = _scored_submission("Elsewhere", 101.0)
+
+    top = client.get("/api/leaderboard", params={"limit": 1}).json()
+    assert top[0]["submission_id"] == submission_id
+    assert client.get(f"/api/leaderboard/rank/{submission_id}").json()["rank"] == 1
+
+    conn = get_connection()
+    try:
+        conn.execute("UPDATE submissions SET score = NULL WHERE id = ?", (submission_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    assert client.get(f"/api/leaderboard/rank/{submission_id}").status_code == 404
+    assert leaderboard.rank(submission_id) is None
@@ -0,0 +1,26 @@
+"""
+test_lookups.py — Concurrent vulnerability lookups: ordering and the batch deadline.
+"""
+
+import time
+
+from routers import ml
+
+
+def test_results_keep_input_order_and_slow_rows_hit_the_deadline(monkeypatch):
+    def lookup(row, max_age=None):
+        time.sleep(row["delay"])
+        return row["submission_id"], float(row["delay"])
+
+    monkeypatch.setattr(ml, "_lookup_row", lookup)
+    rows = [
+        {"submission_id": "A", "delay": 0.02},
+        {"submission_id": "B", "delay": 1.0},
+        {"submission_id": "C", "delay": 0.0},
+    ]
+
+    started = time.monotonic()
+    resolved = ml._resolve_vulnerabilities(rows, deadline=0.3)
+
+    assert time.monotonic() - started < 0.9
+    assert resolved == [("A", 0.02), (None, None), ("C", 0.0)]
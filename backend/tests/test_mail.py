@@ -0,0 +1,123 @@
+"""
+test_mail.py — Outbox retry, re-queue and claim-lease behaviour.
+"""
+
+import smtplib
+import time
+
+from database import get_connection, init_db
+from services.mail import (
+    MAIL_CLAIM_LEASE_S, MailOutbox, PermanentMailError, SMTPConnectError, SMTPSettings,
+)
+
+SETTINGS = SMTPSettings(host="smtp.invalid", port=25, user=None, password=None, starttls=False)
+
+
+class FakeSMTP:
+    """Stands in for SMTPConnection: outcomes[recipient] is an exception to raise, else the send succeeds."""
+
+    def __init__(self, outcomes: dict):
+        self.outcomes = outcomes
+        self.sent = []
+
+    def send(self, sender, recipient, message):
+        outcome = self.outcomes.get(recipient)
+        if outcome is not None:
+            raise outcome
+        self.sent.append(recipient)
+
+
+def _fresh_outbox() -> MailOutbox:
+    init_db()
+    conn = get_connection()
+    try:
+        conn.execute("DELETE FROM mail_outbox")
+        conn.commit()
+    finally:
+        conn.close()
+    return MailOutbox(workers=1, settings=SETTINGS)
+
+
+def _enqueue(outbox: MailOutbox, *recipients: str) -> list[int]:
+    return outbox.enqueue([
+        {"sender": "ops@example.com", "recipient": r, "subject": "s", "message": "m"} for r in recipients
+    ])["message_ids"]
+
+
+def _rows() -> dict[str, dict]:
+    conn = get_connection()
+    try:
+        return {row["recipient"]: dict(row) for row in conn.execute("SELECT * FROM mail_outbox")}
+    finally:
+        conn.close()
+
+
+def _send(outbox: MailOutbox, smtp) -> float:
+    conn = get_connection()
+    try:
+        return outbox._send_batch(conn, smtp, outbox._claim(conn))
+    finally:
+        conn.close()
+
+
+def test_outcomes_per_message():
+    outbox = _fresh_outbox()
+    _enqueue(outbox, "ok@example.com", "busy@example.com", "gone@example.com")
+    smtp = FakeSMTP({
+        "busy@example.com": smtplib.SMTPResponseException(451, b"try later"),
+        "gone@example.com": PermanentMailError("550 no such user"),
+    })
+
+    assert _send(outbox, smtp) is None
+
+    rows = _rows()
+    assert rows["ok@example.com"]["status"] == "sent"
+    assert rows["gone@example.com"]["status"] == "failed"
+    busy = rows["busy@example.com"]
+    assert busy["status"] == "queued"
+    assert busy["attempts"] == 1
+    assert busy["next_attempt_at"] > time.time()
+
+
+def test_connect_failure_requeues_without_using_an_attempt():
+    outbox = _fresh_outbox()
+    _enqueue(outbox, "a@example.com", "b@example.com")
+
+    class Unreachable:
+        calls = 0
+
+        def send(self, sender, recipient, message):
+            Unreachable.calls += 1
+            raise SMTPConnectError("ConnectionRefusedError: refused")
+
+    pause = _send(outbox, Unreachable())
+
+    assert pause is not None and pause > 0
+    assert Unreachable.calls == 1          # the batch stops at the first failed connect
+    for row in _rows().values():
+        assert row["status"] == "queued"
+        assert row["attempts"] == 0
+        assert row["next_attempt_at"] > time.time()
+
+
+def test_start_only_requeues_expired_claims():
+    outbox = _fresh_outbox()
+    live, stale = _enqueue(outbox, "live@example.com", "stale@example.com")
+    conn = get_connection()
+    try:
+        conn.execute(
+            "UPDATE mail_outbox SET status = 'sending', claimed_by = 'other-host:1:x', claimed_at = ? WHERE id = ?",
+            (time.time(), live),
+        )
+        conn.execute(
+            "UPDATE mail_outbox SET status = 'sending', claimed_by = 'other-host:2:y', claimed_at = ? WHERE id = ?",
+            (time.time() - MAIL_CLAIM_LEASE_S - 1, stale),
+        )
+        conn.commit()
+        assert outbox._requeue_expired(conn) == 1
+    finally:
+        conn.close()
+
+    rows = _rows()
+    assert rows["live@example.com"]["status"] == "sending"
+    assert rows["stale@example.com"]["status"] == "queued"
@@ -0,0 +1,21 @@
+"""
+test_metrics.py — GET /metrics in the Prometheus text format.
+"""
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_requests_are_exported_by_route_template():
+    client = TestClient(app)
+    client.get("/api/results/does-not-exist")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/results/{submission_id}",status="200"}' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'executor_queue_depth{pool="cpu"}' in body
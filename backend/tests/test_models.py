@@ -0,0 +1,31 @@
+"""
+test_models.py — Pool workers preload the version that is active when they start.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from services.models import shared_version
+
+_started_with = None
+
+
+def _remember(cell) -> None:
+    global _started_with
+    _started_with = cell.value.decode()
+
+
+def _version_at_start() -> str:
+    return _started_with
+
+
+def test_worker_started_after_a_swap_sees_the_new_version():
+    cell = shared_version("v1")
+    pool = ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_remember, initargs=(cell,),
+    )
+    try:
+        cell.value = b"v2"           # what /models/swap does before the worker exists
+        assert pool.submit(_version_at_start).result(timeout=60) == "v2"
+    finally:
+        pool.shutdown()
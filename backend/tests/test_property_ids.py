@@ -0,0 +1,108 @@
+"""
+test_property_ids.py — Catalog ids follow submission_id, not file position.
+"""
+
+import csv
+import os
+
+from fastapi.testclient import TestClient
+
+from database import get_connection, init_db
+from main import app
+from routers.process import input_hash
+from routers.properties import get_properties
+from tools.synthetic import COLUMNS, generate_properties, write_property_csv
+
+BOOK = os.environ["PROPERTY_CSV_PATH"]
+
+
+def _stored_hashes(submission_id: int) -> dict[int, str]:
+    conn = get_connection()
+    try:
+        return {
+            row["property_id"]: row["input_hash"]
+            for row in conn.execute(
+                "SELECT property_id, input_hash FROM process_results WHERE submission_id = ?",
+                (submission_id,),
+            )
+        }
+    finally:
+        conn.close()
+
+
+def _read_rows(path: str) -> list[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _write_rows(path: str, rows: list[dict]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_inserted_row_keeps_existing_ids_and_results():
+    init_db()
+    write_property_csv(BOOK, 12)
+    client = TestClient(app)
+
+    before = {prop["submission_id"]: prop for prop in get_properties()}
+    picked = "SYN0000011"
+    sub = client.post(
+        "/api/submissions",
+        json={"underwriter_name": "Test", "prioritized_ids": [picked], "discarded_ids": []},
+    ).json()
+    assert client.post("/api/process", json={"submissionId": sub["id"]}).status_code == 200
+    stored_before = _stored_hashes(sub["id"])
+
+    # A new row lands mid-book, after the demo overlay
+    new_row = list(generate_properties(13))[-1]
+    rows = _read_rows(BOOK)
+    rows.insert(8, new_row)
+    _write_rows(BOOK, rows)
+
+    after = {prop["submission_id"]: prop for prop in get_properties()}
+    assert len(after) == len(before) + 1
+    for sid, prop in before.items():
+        assert after[sid]["id"] == prop["id"]
+        assert after[sid]["propertyId"] == prop["propertyId"]
+    assert after[new_row["submission_id"]]["id"] not in {p["id"] for p in before.values()}
+
+    processed = client.post("/api/process", json={"submissionId": sub["id"]}).json()
+    assert processed["written"] == 1
+    assert processed["deleted"] == 0
+
+    stored_after = _stored_hashes(sub["id"])
+    for sid, prop in before.items():
+        assert stored_after[prop["id"]] == stored_before[prop["id"]] == input_hash(after[sid])
+
+    results = client.get(f"/api/results/{sub['id']}").json()["results"]
+    selections = {r["submission_id"]: r["user_selection"] for r in results}
+    assert selections[picked] == "prioritized"
+    assert len(results) == len(after)
+
+
+def test_removed_row_deletes_only_its_result():
+    init_db()
+    write_property_csv(BOOK, 12, seed=1)
+    client = TestClient(app)
+
+    sub = client.post(
+        "/api/submissions", json={"underwriter_name": "Test", "prioritized_ids": [], "discarded_ids": []},
+    ).json()
+    client.post("/api/process", json={"submissionId": sub["id"]})
+    stored_before = _stored_hashes(sub["id"])
+
+    rows = _read_rows(BOOK)
+    gone = rows.pop(8)
+    _write_rows(BOOK, rows)
+
+    processed = client.post("/api/process", json={"submissionId": sub["id"]}).json()
+    assert processed["written"] == 0
+    assert processed["deleted"] == 1
+
+    stored_after = _stored_hashes(sub["id"])
+    gone_id = next(pid for pid in stored_before if pid not in stored_after)
+    assert gone["submission_id"] not in {p["submission_id"] for p in get_properties()}
+    assert all(stored_after[pid] == h for pid, h in stored_before.items() if pid != gone_id)
@@ -0,0 +1,76 @@
+"""
+test_results.py — Results document: ETag revalidation and score backfill.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import get_connection, init_db
+from main import app
+
+
+@pytest.fixture
+def client():
+    init_db()
+    return TestClient(app)
+
+
+def _processed_submission(score=None) -> int:
+    """A submission with two stored predictions, as /api/process leaves it (score optional)."""
+    conn = get_connection()
+    try:
+        sid = conn.execute(
+            "INSERT INTO submissions (underwriter_name, prioritized_ids, discarded_ids, score) "
+            "VALUES ('Ana', '[]', '[]', ?)",
+            (score,),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO process_results (submission_id, property_id, quote_propensity, total_risk_score) "
+            "VALUES (?, ?, ?, ?)",
+            [(sid, 0, 0.9, 40.0), (sid, 1, 0.1, 70.0)],
+        )
+        conn.commit()
+        return sid
+    finally:
+        conn.close()
+
+
+def _stored_score(sid: int):
+    conn = get_connection()
+    try:
+        return conn.execute("SELECT score FROM submissions WHERE id = ?", (sid,)).fetchone()["score"]
+    finally:
+        conn.close()
+
+
+def test_if_none_match_returns_304_until_reprocessed(client):
+    sid = _processed_submission(score=50.0)
+
+    first = client.get(f"/api/results/{sid}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()["score_percentage"] == 50.0
+
+    again = client.get(f"/api/results/{sid}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    conn = get_connection()
+    try:
+        conn.execute("UPDATE submissions SET results_version = results_version + 1 WHERE id = ?", (sid,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    changed = client.get(f"/api/results/{sid}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_first_read_persists_a_missing_score(client):
+    sid = _processed_submission()
+
+    document = client.get(f"/api/results/{sid}").json()
+
+    assert _stored_score(sid) == document["score_percentage"]
+    assert client.get(f"/api/leaderboard/rank/{sid}").status_code == 200
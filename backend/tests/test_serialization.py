@@ -0,0 +1,29 @@
+"""
+test_serialization.py — orjson encoding and response compression.
+"""
+
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from main import app
+from services.serialization import dumps, raw_json
+
+
+def test_numpy_values_and_non_finite_floats():
+    encoded = dumps({"scores": np.array([0.5, 1.0]), "n": np.int64(3), "bad": float("nan"), 1: "key"})
+    assert json.loads(encoded) == {"scores": [0.5, 1.0], "n": 3, "bad": None, "1": "key"}
+
+
+def test_raw_json_is_embedded_verbatim():
+    assert dumps({"shap": raw_json('{"a":1}'), "missing": raw_json(None, "{}")}) == b'{"shap":{"a":1},"missing":{}}'
+
+
+def test_large_bodies_are_compressed():
+    client = TestClient(app)
+    response = client.get("/api/results/does-not-exist", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] in ("gzip", "br")
+    assert response.json()["submission_id"] == "does-not-exist"
@@ -0,0 +1,32 @@
+"""
+test_stage_timer.py — Per-stage timing of a pipeline run.
+"""
+
+import pytest
+
+from services.metrics import STAGE_SECONDS, StageTimer, record_stages
+
+
+def test_stage_timer_reports_every_stage_including_the_failing_one():
+    timer = StageTimer(rows=10)
+    with timer.stage("clean"):
+        pass
+    with pytest.raises(ValueError):
+        with timer.stage("predict", rows=4):
+            raise ValueError("bad row")
+
+    assert list(timer.stages) == ["clean", "predict"]
+    assert timer.stages["clean"]["rows"] == 10
+    assert timer.stages["predict"]["rows"] == 4
+    assert timer.stages["predict"]["seconds"] >= 0
+
+
+def test_recorded_stages_feed_the_stage_histograms():
+    timer = StageTimer(rows=3)
+    with timer.stage("clean"):
+        pass
+    record_stages("test-pipeline", timer.stages)
+
+    series = {labels["stage"]: hist for labels, hist in STAGE_SECONDS.series()
+              if labels.get("pipeline") == "test-pipeline"}
+    assert series["clean"].count == 1
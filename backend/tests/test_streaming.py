@@ -0,0 +1,73 @@
+"""
+test_streaming.py — Run 1 NDJSON stream: admission, back-pressure, encoding.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import init_db
+from main import app
+from routers import ml
+from routers.properties import MOCK_PROPERTIES
+from services.executors import PoolSaturated, cpu_pool
+
+ROWS = [dict(prop) for prop in MOCK_PROPERTIES] * 4
+
+
+@pytest.fixture
+def client(monkeypatch):
+    init_db()
+    monkeypatch.setattr(ml, "ML_STREAM_CHUNK_SIZE", 5)
+    return TestClient(app)
+
+
+def _lines(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_stream_sends_chunks_then_summary_uncompressed(client):
+    response = client.post("/api/ml/submissions/stream", json={"rows": ROWS}, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers.get("content-encoding") == "identity"
+    lines = _lines(response)
+    assert [line["chunk_index"] for line in lines[:-1]] == list(range(5))
+    assert sum(len(line["predictions"]) for line in lines[:-1]) == len(ROWS)
+    assert lines[-1]["row_count"] == len(ROWS)
+
+
+def test_saturated_pool_is_refused_before_the_first_byte(client):
+    held = 0
+    while cpu_pool._slots.acquire(blocking=False):
+        held += 1
+    try:
+        response = client.post("/api/ml/submissions/stream", json={"rows": ROWS})
+    finally:
+        for _ in range(held):
+            cpu_pool._slots.release()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_chunks_after_the_first_wait_for_a_slot(client, monkeypatch):
+    admit = cpu_pool._admit
+    admitted = []
+
+    def saturate_after_first(blocking):
+        # the pool fills up once the response has started
+        if admitted and not blocking:
+            raise PoolSaturated("cpu pool is saturated")
+        admitted.append(blocking)
+        admit(blocking)
+
+    monkeypatch.setattr(cpu_pool, "_admit", saturate_after_first)
+    response = client.post("/api/ml/submissions/stream", json={"rows": ROWS})
+
+    lines = _lines(response)
+    assert not [line for line in lines if "error" in line]
+    assert lines[-1]["row_count"] == len(ROWS)
+    assert admitted == [False, True, True, True, True]
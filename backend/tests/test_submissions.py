@@ -0,0 +1,28 @@
+"""
+test_submissions.py — Underwriter submissions API.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import init_db
+from main import app
+
+
+@pytest.fixture
+def client():
+    init_db()
+    return TestClient(app)
+
+
+def test_create_returns_the_stored_created_at(client):
+    response = client.post(
+        "/api/submissions",
+        json={"underwriter_name": "Ada", "prioritized_ids": ["P1"], "discarded_ids": ["P2"]},
+    )
+
+    assert response.status_code == 200
+    created = response.json()
+    assert created["created_at"] is not None
+    stored = client.get(f"/api/submissions/{created['id']}").json()
+    assert stored["created_at"] == created["created_at"]
@@ -0,0 +1,30 @@
+"""
+test_templates.py — Header values are validated before they reach the message.
+"""
+
+import pytest
+
+from services.templates import InvalidHeaderError, compose_message, format_address
+
+
+def test_format_address_accepts_single_mailboxes():
+    assert format_address("ops@example.com") == "ops@example.com"
+    assert format_address("Ops Team <ops@example.com>") == "Ops Team <ops@example.com>"
+
+
+@pytest.mark.parametrize("value", [
+    "ops@example.com\r\nBcc: other@example.com",
+    "ops@example.com\nBcc: other@example.com",
+    "not an address",
+    "",
+])
+def test_format_address_rejects_unsafe_values(value):
+    with pytest.raises(InvalidHeaderError):
+        format_address(value)
+
+
+def test_compose_message_rejects_injected_recipient_and_subject():
+    with pytest.raises(InvalidHeaderError):
+        compose_message("a@example.com", "b@example.com\r\nBcc: c@example.com", "Hi", "text", "<p>text</p>")
+    with pytest.raises(InvalidHeaderError):
+        compose_message("a@example.com", "b@example.com", "Hi\r\nBcc: c@example.com", "text", "<p>text</p>")
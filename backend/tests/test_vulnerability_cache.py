@@ -0,0 +1,48 @@
+"""
+test_vulnerability_cache.py — Cached vulnerability lookups and the stale fallback.
+"""
+
+import pytest
+import requests
+
+from database import init_db
+from routers import ml
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Stub the three upstream calls; `calls` counts geocodes, `fail` breaks them."""
+    init_db()
+    state = {"calls": 0, "fail": False}
+
+    def geocode(address):
+        state["calls"] += 1
+        if state["fail"]:
+            raise requests.ConnectionError("upstream down")
+        return {"address": address}
+
+    monkeypatch.setattr(ml, "_geocode_address", geocode)
+    monkeypatch.setattr(ml, "_add_property", lambda payload: "PROP-1")
+    monkeypatch.setattr(ml, "_get_vulnerability_score", lambda property_id: 42.0)
+    return state
+
+
+def test_repeat_lookup_is_served_from_cache(upstream):
+    assert ml._fetch_vulnerability_via_api("1 Cache Lane") == ("PROP-1", 42.0)
+    assert ml._fetch_vulnerability_via_api("1  cache lane") == ("PROP-1", 42.0)
+    assert upstream["calls"] == 1
+
+
+def test_upstream_failure_serves_the_stale_entry(upstream):
+    ml._fetch_vulnerability_via_api("2 Stale Street")
+    upstream["fail"] = True
+
+    # max_age=0 makes the entry too old to serve, but it is still within the TTL
+    assert ml._fetch_vulnerability_via_api("2 Stale Street", max_age=0) == ("PROP-1", 42.0)
+    assert upstream["calls"] == 2
+
+
+def test_upstream_failure_without_an_entry_raises(upstream):
+    upstream["fail"] = True
+    with pytest.raises(requests.ConnectionError):
+        ml._fetch_vulnerability_via_api("3 Empty Road", max_age=0)
@@ -0,0 +1,433 @@
+"""
+bench.py — Reproducible load test for the backend API.
+
+Each run does the following:
+1. Writes a seeded synthetic book of --rows properties (tools/synthetic.py).
+2. Starts the fake Geoapify / Property API (tools/fake_upstream.py).
+3. Starts the API under uvicorn against a throwaway SQLite database.
+4. Seeds a few scored submissions, then drives each scenario with
+   --concurrency closed-loop clients.
+
+For every scenario it records:
+- p50/p95/p99/mean/max latency;
+- throughput;
+- status codes;
+- the server's RSS, including pool worker processes.
+
+The results go to a JSON file. Pass a previous file with --compare to print
+deltas, and add --fail-over to exit non-zero when a p95 regresses by more
+than that percentage.
+
+    cd backend
+    python -m tools.bench --rows 5000 --out bench.json
+    python -m tools.bench --rows 5000 --compare bench.json --fail-over 20
+
+--upstream-latency, --upstream-error-rate, --upstream-hang-rate,
+--upstream-rate-limit, --upstream-seed and --upstream-config shape the fake
+upstream (see tools/fake_upstream.py); its per-endpoint outcome counts are
+saved with the results.
+
+    python -m tools.bench --scenarios ml_final_score \
+        --upstream-latency default=lognormal:40:0.5 --upstream-error-rate vulnerability=0.05 \
+        --env UPSTREAM_RETRIES=2
+
+--url benchmarks a server that is already running (RSS needs --pid). In that
+case the server must already be pointed at a stand-in upstream and a book.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import requests
+
+from tools import fake_upstream
+from tools.fake_upstream import FakeUpstream
+from tools.synthetic import generate_properties, write_property_csv
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ─── Scenarios ────────────────────────────────────────────────────────────────
+
+@dataclass
+class BenchContext:
+    properties: list[dict]          # the synthetic book, as generated
+    submission_ids: list[int] = field(default_factory=list)
+    page_size: int = 100
+    ml_batch: int = 50
+    seed: int = 0
+
+    def ml_rows(self, i: int) -> list[dict]:
+        n = len(self.properties)
+        start = i * self.ml_batch
+        return [{**self.properties[(start + k) % n], "quote_propensity": 0.5} for k in range(self.ml_batch)]
+
+    def submission_body(self, i: int) -> dict:
+        rng = random.Random(self.seed * 1_000_003 + i)
+        sample = rng.sample(self.properties, min(20, len(self.properties)))
+        ids = [p["submission_id"] for p in sample]
+        return {"underwriter_name": f"bench-{i % 10}", "prioritized_ids": ids[:10], "discarded_ids": ids[10:]}
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[BenchContext, int], str]
+    body: Optional[Callable[[BenchContext, int], dict]] = None
+    heavy: bool = False             # uses --heavy-requests instead of --requests
+
+
+SCENARIOS = [
+    Scenario("properties", "GET", lambda ctx, i: f"/api/properties?limit={ctx.page_size}"),
+    Scenario("results", "GET", lambda ctx, i: f"/api/results/{ctx.submission_ids[i % len(ctx.submission_ids)]}"),
+    Scenario("leaderboard", "GET", lambda ctx, i: "/api/leaderboard?limit=10"),
+    Scenario("triage_properties", "GET", lambda ctx, i: "/api/triage/properties"),
+    Scenario("create_submission", "POST", lambda ctx, i: "/api/submissions",
+             lambda ctx, i: ctx.submission_body(i)),
+    Scenario("process", "POST", lambda ctx, i: "/api/process",
+             lambda ctx, i: {"submissionId": ctx.submission_ids[i % len(ctx.submission_ids)], "force": True},
+             heavy=True),
+    Scenario("ml_preliminary", "POST", lambda ctx, i: "/api/ml/submissions",
+             lambda ctx, i: {"rows": ctx.ml_rows(i)}, heavy=True),
+    Scenario("ml_final_score", "POST", lambda ctx, i: "/api/ml/final_score",
+             lambda ctx, i: {"rows": ctx.ml_rows(i)}, heavy=True),
+]
+
+
+# ─── Measurement ──────────────────────────────────────────────────────────────
+
+def percentile(sorted_values: list[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), round(q * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def _children(pid: int) -> list[int]:
+    kids = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                kids.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return kids
+
+
+def _status_kib(pid: int, key: str) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(key + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def process_tree_memory(pid: Optional[int]) -> Optional[dict]:
+    """RSS and peak RSS (bytes) of pid plus its descendants; None where /proc is unavailable."""
+    if pid is None or not os.path.exists(f"/proc/{pid}/status"):
+        return None
+    rss = peak = 0
+    stack, seen = [pid], set()
+    while stack:
+        p = stack.pop()
+        if p in seen:
+            continue
+        seen.add(p)
+        try:
+            rss += _status_kib(p, "VmRSS") * 1024
+            peak += _status_kib(p, "VmHWM") * 1024
+        except OSError:
+            continue
+        stack.extend(_children(p))
+    return {"rss_bytes": rss, "peak_rss_bytes": peak, "processes": len(seen)}
+
+
+def run_scenario(base_url: str, scenario: Scenario, ctx: BenchContext, requests_n: int,
+                 concurrency: int, warmup: int, timeout: float) -> dict:
+    local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def one(i: int) -> tuple[float, int]:
+        body = scenario.body(ctx, i) if scenario.body else None
+        started = time.perf_counter()
+        try:
+            resp = session().request(scenario.method, base_url + scenario.path(ctx, i), json=body, timeout=timeout)
+            resp.content            # read the whole body before stopping the clock
+            status = resp.status_code
+        except requests.RequestException:
+            status = 0
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(-warmup, 0)))
+        started = time.perf_counter()
+        outcomes = list(pool.map(one, range(requests_n)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(seconds * 1000 for seconds, _ in outcomes)
+    statuses = Counter(str(status) for _, status in outcomes)
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "name":           scenario.name,
+        "requests":       requests_n,
+        "concurrency":    concurrency,
+        "errors":         errors,
+        "status_counts":  dict(statuses),
+        "wall_seconds":   round(wall, 4),
+        "throughput_rps": round(requests_n / wall, 2) if wall > 0 else None,
+        "latency_ms": {
+            "p50":  percentile(latencies, 0.50),
+            "p95":  percentile(latencies, 0.95),
+            "p99":  percentile(latencies, 0.99),
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "max":  latencies[-1] if latencies else None,
+        },
+    }
+
+
+# ─── Server lifecycle ─────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url: str, proc: Optional[subprocess.Popen], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode} before becoming ready")
+        try:
+            if requests.get(base_url + "/", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} not ready after {timeout}s")
+
+
+def start_server(workdir: str, book_path: str, upstream_url: str, extra_env: dict,
+                 log_path: str) -> tuple[subprocess.Popen, str]:
+    """uvicorn on a free port; its stdout/stderr go to log_path so they don't interleave with the report."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "UNDERWRITING_DB_PATH": os.path.join(workdir, "bench.db"),
+        "PROPERTY_CSV_PATH":    book_path,
+        "GEOAPIFY_BASE_URL":    upstream_url,
+        "GEOAPIFY_API_KEY":     "bench",
+        "PROPERTY_API_BASE":    upstream_url,
+        "SMTP_HOST":            "",            # never send real mail from a benchmark
+        **extra_env,
+    }
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def _log_tail(path: str, lines: int = 30) -> str:
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return "".join(f.readlines()[-lines:])
+    except OSError:
+        return ""
+
+
+def seed(base_url: str, ctx: BenchContext, submissions: int, timeout: float) -> None:
+    """Create and score `submissions` submissions so read scenarios have data."""
+    with requests.Session() as s:
+        for i in range(submissions):
+            resp = s.post(f"{base_url}/api/submissions", json=ctx.submission_body(-1 - i), timeout=timeout)
+            resp.raise_for_status()
+            submission_id = resp.json()["id"]
+            s.post(f"{base_url}/api/process", json={"submissionId": submission_id}, timeout=timeout).raise_for_status()
+            ctx.submission_ids.append(submission_id)
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if out.returncode != 0:
+        return None
+    return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+def compare(current: dict, baseline: dict) -> list[dict]:
+    """Per-scenario p95 and throughput change against a previous result file (percent)."""
+    before = {s["name"]: s for s in baseline.get("scenarios", [])}
+    rows = []
+    for s in current["scenarios"]:
+        b = before.get(s["name"])
+        if b is None:
+            continue
+        p95, p95_b = s["latency_ms"]["p95"], b["latency_ms"]["p95"]
+        rps, rps_b = s["throughput_rps"], b["throughput_rps"]
+        rows.append({
+            "name":             s["name"],
+            "p95_ms":           p95,
+            "p95_baseline_ms":  p95_b,
+            "p95_change_pct":   round((p95 - p95_b) / p95_b * 100, 1) if p95 and p95_b else None,
+            "rps_change_pct":   round((rps - rps_b) / rps_b * 100, 1) if rps and rps_b else None,
+        })
+    return rows
+
+
+def _pct(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+
+def print_table(result: dict) -> None:
+    print(f"{'scenario':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}{'RSS MiB':>10}")
+    for s in result["scenarios"]:
+        lat = s["latency_ms"]
+        mem = s.get("memory") or {}
+        rss = f"{mem['rss_bytes'] / 2**20:.1f}" if mem else "-"
+        print(f"{s['name']:<20}{lat['p50'] or 0:>10.2f}{lat['p95'] or 0:>10.2f}{lat['p99'] or 0:>10.2f}"
+              f"{s['throughput_rps'] or 0:>10.1f}{s['errors']:>8}{rss:>10}")
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the backend against a synthetic book.")
+    parser.add_argument("--rows", type=int, default=1000, help="synthetic book size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per light scenario")
+    parser.add_argument("--heavy-requests", type=int, default=20, help="measured requests for process / ML scenarios")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--submissions", type=int, default=10, help="scored submissions seeded before the run")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--ml-batch", type=int, default=50, help="rows per /api/ml request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout (s)")
+    parser.add_argument("--scenarios", help="comma-separated subset of: " + ",".join(s.name for s in SCENARIOS))
+    parser.add_argument("--url", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="server pid for RSS when using --url")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the spawned server (repeatable)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--server-log", help="keep the spawned server's output here (default: discarded)")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    parser.add_argument("--fail-over", type=float, metavar="PCT",
+                        help="with --compare: exit 1 if any p95 regressed by more than PCT percent")
+    fake_upstream.add_arguments(parser, prefix="upstream-")
+    args = parser.parse_args(argv)
+    upstream_config = fake_upstream.config_from_args(args, prefix="upstream-")
+
+    wanted = set(args.scenarios.split(",")) if args.scenarios else None
+    scenarios = [s for s in SCENARIOS if wanted is None or s.name in wanted]
+    if wanted and len(scenarios) != len(wanted):
+        parser.error(f"unknown scenario(s): {sorted(wanted - {s.name for s in scenarios})}")
+
+    ctx = BenchContext(properties=list(generate_properties(args.rows, args.seed)),
+                       page_size=args.page_size, ml_batch=args.ml_batch, seed=args.seed)
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    with tempfile.TemporaryDirectory(prefix="uw-bench-") as workdir:
+        upstream = server = None
+        upstream_stats = None
+        try:
+            if args.url:
+                base_url, pid = args.url.rstrip("/"), args.pid
+                _wait_ready(base_url, None, 30)
+            else:
+                book_path = os.path.join(workdir, "book.csv")
+                log_path = args.server_log or os.path.join(workdir, "server.log")
+                write_property_csv(book_path, args.rows, args.seed)
+                upstream = FakeUpstream(config=upstream_config).start()
+                server, base_url = start_server(workdir, book_path, upstream.base_url, extra_env, log_path)
+                pid = server.pid
+                try:
+                    _wait_ready(base_url, server, 120)
+                except RuntimeError:
+                    print(_log_tail(log_path), file=sys.stderr)
+                    raise
+
+            seed(base_url, ctx, max(1, args.submissions), args.timeout)
+            memory_before = process_tree_memory(pid)
+
+            results = []
+            for scenario in scenarios:
+                n = args.heavy_requests if scenario.heavy else args.requests
+                print(f"[bench] {scenario.name}: {n} requests x {args.concurrency} clients", flush=True)
+                result = run_scenario(base_url, scenario, ctx, n, args.concurrency, args.warmup, args.timeout)
+                result["memory"] = process_tree_memory(pid)
+                results.append(result)
+            if upstream is not None:
+                upstream_stats = upstream.injector.snapshot()
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+            if upstream is not None:
+                upstream.stop()
+
+    report = {
+        "meta": {
+            "commit":      _git_commit(),
+            "started_at":  time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python":      platform.python_version(),
+            "platform":    platform.platform(),
+            "cpu_count":   os.cpu_count(),
+            "target":      args.url or "spawned",
+            "args":        {k: v for k, v in vars(args).items() if k not in ("compare", "fail_over", "out")},
+            "memory_before": memory_before,
+            "upstream":    upstream_stats,
+        },
+        "scenarios": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_table(report)
+    print(f"[bench] results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            deltas = compare(report, json.load(f))
+        regressed = []
+        for d in deltas:
+            print(f"  {d['name']:<20} p95 {d['p95_baseline_ms'] or 0:.2f} → {d['p95_ms'] or 0:.2f} ms "
+                  f"({_pct(d['p95_change_pct'])}), throughput {_pct(d['rps_change_pct'])}")
+            if args.fail_over is not None and d["p95_change_pct"] is not None and d["p95_change_pct"] > args.fail_over:
+                regressed.append(d["name"])
+        if regressed:
+            print(f"[bench] p95 regressed more than {args.fail_over}% in: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
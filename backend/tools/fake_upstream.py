@@ -0,0 +1,423 @@
+"""
+fake_upstream.py — Local stand-in for Geoapify and the Property API, with
+latency, error and rate-limit injection.
+
+Serves the three calls Run 2 makes. Answers are derived from the request, so
+repeated runs see the same data:
+
+    GET  /v1/geocode/search?text=...         → one GeoJSON feature
+    POST /add_property                       → {"property_id": ...}
+    GET  /get_vulnerability_score?property_id=...
+                                             → {"property_vulnerability_score": 0-100}
+
+Each endpoint has a profile:
+- latency: a distribution spec such as "fixed:20", "uniform:5:50",
+  "normal:40:10", "lognormal:30:0.6" or "exponential:25", in milliseconds;
+- error_rate: the fraction of requests answered with one of error_statuses;
+- hang_rate: the fraction of requests that stall for hang_s before
+  answering, to exercise client timeouts;
+- rate_limit/burst: a token bucket. Past it the request gets a 429 with
+  Retry-After.
+
+Injected faults are deterministic under `seed`. Each decision is drawn from
+an RNG keyed by (seed, endpoint, request key, how many times that key has
+been seen), so the nth call for a given address gets the same outcome in
+every run, whatever the interleaving. That also means a retry sees a fresh
+draw. Rate limiting depends on wall-clock time and is the one exception.
+
+    GET  /_stats   → per-endpoint counts by outcome
+    POST /_reset   → clear counters, rate-limit buckets and per-key attempts
+    POST /_config  → replace profiles at runtime (same JSON as --config)
+
+Point the backend at it with
+    GEOAPIFY_BASE_URL=http://127.0.0.1:8900 PROPERTY_API_BASE=http://127.0.0.1:8900
+
+Run standalone:
+    python -m tools.fake_upstream --port 8900 --seed 7 \\
+        --latency geocode=lognormal:60:0.5 --error-rate vulnerability=0.05 \\
+        --rate-limit geocode=20:5
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+ENDPOINTS = ("geocode", "add_property", "vulnerability")
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+# ─── Contracts ────────────────────────────────────────────────────────────────
+
+def geocode(text: str) -> dict:
+    h = _digest(text)
+    lat = 25.0 + (h % 2_400_000) / 100_000           # continental-US-ish box
+    lon = -124.0 + ((h >> 24) % 5_700_000) / 100_000
+    parts = [p.strip() for p in text.split(",")]
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "properties": {
+                "formatted": text,
+                "country": "United States of America",
+                "state": parts[-1] if len(parts) > 1 else None,
+                "city": parts[-2] if len(parts) > 2 else None,
+                "postcode": f"{h % 100_000:05d}",
+            },
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        }],
+    }
+
+
+def property_id_for(payload: dict) -> str:
+    h = f"{_digest(json.dumps([payload.get('latitude'), payload.get('longitude'), payload.get('address')])):016x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-fake"
+
+
+def vulnerability_score(property_id: str) -> float:
+    return round((_digest(property_id) % 10_000) / 100, 2)
+
+
+# ─── Profiles ─────────────────────────────────────────────────────────────────
+
+def sample_latency(spec: str, rng: random.Random) -> float:
+    """Seconds to wait for one request under a latency spec (milliseconds in the spec)."""
+    kind, *raw = spec.split(":")
+    params = [float(p) for p in raw]
+    if kind == "fixed":
+        ms = params[0] if params else 0.0
+    elif kind == "uniform":
+        ms = rng.uniform(params[0], params[1])
+    elif kind == "normal":
+        ms = rng.gauss(params[0], params[1])
+    elif kind == "lognormal":
+        # params: median ms, sigma of the underlying normal
+        ms = rng.lognormvariate(math.log(params[0]), params[1])
+    elif kind == "exponential":
+        ms = rng.expovariate(1.0 / params[0])
+    else:
+        raise ValueError(f"Unknown latency distribution '{kind}'")
+    return max(0.0, ms) / 1000
+
+
+@dataclass(frozen=True)
+class EndpointProfile:
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    error_statuses: tuple = (500, 503)
+    hang_rate: float = 0.0
+    hang_s: float = 30.0
+    rate_limit: Optional[float] = None      # requests per second; None = unlimited
+    burst: int = 1
+
+    def validate(self) -> "EndpointProfile":
+        sample_latency(self.latency, random.Random(0))
+        for name in ("error_rate", "hang_rate"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if self.rate_limit is not None and self.rate_limit <= 0:
+            raise ValueError("rate_limit must be positive")
+        return self
+
+
+@dataclass
+class UpstreamConfig:
+    seed: int = 0
+    profiles: dict = field(default_factory=lambda: {name: EndpointProfile() for name in ENDPOINTS})
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UpstreamConfig":
+        """{"seed": 7, "default": {...}, "geocode": {...}, ...}; "default" applies to every endpoint first."""
+        base = EndpointProfile(**_profile_fields(data.get("default", {})))
+        profiles = {
+            name: replace(base, **_profile_fields(data.get(name, {}))).validate()
+            for name in ENDPOINTS
+        }
+        return cls(seed=int(data.get("seed", 0)), profiles=profiles)
+
+    def to_dict(self) -> dict:
+        return {"seed": self.seed, **{name: asdict(p) for name, p in self.profiles.items()}}
+
+
+def _profile_fields(data: dict) -> dict:
+    unknown = set(data) - set(EndpointProfile.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"Unknown profile field(s): {sorted(unknown)}")
+    fields = dict(data)
+    if "error_statuses" in fields:
+        fields["error_statuses"] = tuple(int(s) for s in fields["error_statuses"])
+    return fields
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """0 if a token was taken, else seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+# ─── Server ───────────────────────────────────────────────────────────────────
+
+class FaultInjector:
+    """Per-request decisions (latency, error, hang, throttle) and outcome counters."""
+
+    def __init__(self, config: UpstreamConfig):
+        self._lock = threading.Lock()
+        self.configure(config)
+
+    def configure(self, config: UpstreamConfig) -> None:
+        with self._lock:
+            self.config = config
+            self._buckets = {
+                name: TokenBucket(p.rate_limit, p.burst)
+                for name, p in config.profiles.items() if p.rate_limit is not None
+            }
+            self._attempts: Counter = Counter()
+            self.stats: dict[str, Counter] = {name: Counter() for name in ENDPOINTS}
+
+    def reset(self) -> None:
+        self.configure(self.config)
+
+    def decide(self, endpoint: str, key: str) -> tuple[str, float, Optional[int], float]:
+        """(outcome, delay_s, status, retry_after_s) for the next request to endpoint with this key."""
+        with self._lock:
+            profile = self.config.profiles[endpoint]
+            bucket = self._buckets.get(endpoint)
+            attempt = self._attempts[(endpoint, key)]
+            self._attempts[(endpoint, key)] += 1
+            seed = self.config.seed
+        wait = bucket.take() if bucket is not None else 0.0
+        if wait:
+            self._count(endpoint, "throttled")
+            return "throttled", 0.0, 429, wait
+
+        rng = random.Random(_digest(f"{seed}|{endpoint}|{key}|{attempt}"))
+        delay = sample_latency(profile.latency, rng)
+        roll = rng.random()
+        if roll < profile.hang_rate:
+            outcome, delay, status = "hang", delay + profile.hang_s, None
+        elif roll < profile.hang_rate + profile.error_rate:
+            outcome, status = "error", rng.choice(profile.error_statuses)
+        else:
+            outcome, status = "ok", None
+        self._count(endpoint, outcome)
+        return outcome, delay, status, 0.0
+
+    def _count(self, endpoint: str, outcome: str) -> None:
+        with self._lock:
+            self.stats[endpoint][outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"config": self.config.to_dict(), "stats": {k: dict(v) for k, v in self.stats.items()}}
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive, like the real services
+    injector: FaultInjector           # set per server class in FakeUpstream
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up (timeout) while the request was stalled
+            self.close_connection = True
+
+    def _serve(self, endpoint: str, key: str, respond) -> None:
+        outcome, delay, status, retry_after = self.injector.decide(endpoint, key)
+        if outcome == "throttled":
+            self._send_json(429, {"detail": "rate limit exceeded"},
+                            {"Retry-After": str(max(1, math.ceil(retry_after)))})
+            return
+        if delay:
+            time.sleep(delay)
+        if outcome == "error":
+            self._send_json(status, {"detail": f"injected {status}"})
+            return
+        respond()
+
+    def _read_json(self) -> Optional[dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"detail": "invalid JSON"})
+            return None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/v1/geocode/search":
+            text = query.get("text", "")
+            self._serve("geocode", text, lambda: self._send_json(200, geocode(text)))
+        elif url.path == "/get_vulnerability_score":
+            property_id = query.get("property_id")
+            if not property_id:
+                self._send_json(400, {"detail": "property_id is required"})
+                return
+            self._serve("vulnerability", property_id, lambda: self._send_json(200, {
+                "property_id": property_id,
+                "property_vulnerability_score": vulnerability_score(property_id),
+            }))
+        elif url.path == "/_stats":
+            self._send_json(200, self.injector.snapshot())
+        else:
+            self._send_json(404, {"detail": "not found"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        payload = self._read_json()
+        if payload is None:
+            return
+        if path == "/add_property":
+            self._serve("add_property", str(payload.get("address")),
+                        lambda: self._send_json(200, {"property_id": property_id_for(payload)}))
+        elif path == "/_reset":
+            self.injector.reset()
+            self._send_json(200, self.injector.snapshot())
+        elif path == "/_config":
+            try:
+                self.injector.configure(UpstreamConfig.from_dict(payload))
+            except (TypeError, ValueError) as exc:
+                self._send_json(400, {"detail": str(exc)})
+                return
+            self._send_json(200, self.injector.snapshot())
+        else:
+            self._send_json(404, {"detail": "not found"})
+
+
+class FakeUpstream:
+    """The stand-in server on a background thread; port 0 picks a free port."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[UpstreamConfig] = None):
+        self.injector = FaultInjector(config or UpstreamConfig())
+        handler = type("BoundFakeUpstreamHandler", (FakeUpstreamHandler,), {"injector": self.injector})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstream", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def _per_endpoint(values: list[str], option: str) -> dict:
+    """["geocode=lognormal:60:0.5", "default=fixed:5"] → {"geocode": "...", "default": "..."}"""
+    out = {}
+    for value in values:
+        name, sep, setting = value.partition("=")
+        if not sep or name not in (*ENDPOINTS, "default"):
+            raise SystemExit(f"{option} expects <{'|'.join((*ENDPOINTS, 'default'))}>=<value>, got '{value}'")
+        out[name] = setting
+    return out
+
+
+def config_from_args(args, prefix: str = "") -> UpstreamConfig:
+    """Build the config from options registered by add_arguments with the same prefix."""
+    opt = lambda name: getattr(args, prefix.replace("-", "_") + name)
+    data: dict = {}
+    if opt("config"):
+        with open(opt("config"), encoding="utf-8") as f:
+            data = json.load(f)
+    if opt("seed") is not None:
+        data["seed"] = opt("seed")
+    for name, spec in _per_endpoint(opt("latency"), "--latency").items():
+        data.setdefault(name, {})["latency"] = spec
+    for name, rate in _per_endpoint(opt("error_rate"), "--error-rate").items():
+        data.setdefault(name, {})["error_rate"] = float(rate)
+    for name, rate in _per_endpoint(opt("hang_rate"), "--hang-rate").items():
+        data.setdefault(name, {})["hang_rate"] = float(rate)
+    for name, limit in _per_endpoint(opt("rate_limit"), "--rate-limit").items():
+        rate, _, burst = limit.partition(":")
+        data.setdefault(name, {}).update(rate_limit=float(rate), burst=int(burst or 1))
+    return UpstreamConfig.from_dict(data)
+
+
+def add_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    """Fault-injection options; tools.bench registers them as --upstream-*."""
+    parser.add_argument(f"--{prefix}config", help="JSON profile file (see module docstring)")
+    parser.add_argument(f"--{prefix}seed", type=int)
+    parser.add_argument(f"--{prefix}latency", action="append", default=[],
+                        metavar="ENDPOINT=SPEC", help="e.g. geocode=lognormal:60:0.5 (ms)")
+    parser.add_argument(f"--{prefix}error-rate", action="append", default=[], metavar="ENDPOINT=FRACTION")
+    parser.add_argument(f"--{prefix}hang-rate", action="append", default=[], metavar="ENDPOINT=FRACTION")
+    parser.add_argument(f"--{prefix}rate-limit", action="append", default=[], metavar="ENDPOINT=RPS[:BURST]")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for Geoapify and the Property API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = FakeUpstream(args.host, args.port, config_from_args(args))
+    print(f"[fake_upstream] serving on {server.base_url}")
+    print(f"[fake_upstream] profiles: {json.dumps(server.injector.config.to_dict())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
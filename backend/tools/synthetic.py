@@ -0,0 +1,472 @@
+"""
+synthetic.py — Seeded synthetic books and submissions for benchmarks and
+scale testing.
+
+generate_properties(n, seed) yields rows with the same columns as
+Test/Property_data - AI.csv, plus city/state/address fields so Run 2 can
+resolve them against the fake upstream. generate_submissions(n, seed) adds
+a prediction, a local SHAP vector and a vulnerability document per row. The
+same seed always gives the same data.
+
+Everything streams. Millions of rows can go to CSV, to Parquet (needs
+pyarrow) or straight into an app database:
+
+    cd backend
+    python -m tools.synthetic --rows 1000000 --format csv --out /tmp/book
+    python -m tools.synthetic --rows 1000000 --format sqlite --submissions 3 --out /tmp/uw.db
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+CHANNELS = ("Broker", "Online", "Direct", "Agent")
+OCCUPANCY = ("Primary Residence", "Secondary Residence", "Rental", "Vacant")
+COVER_TYPES = ("Building Only", "Contents Only", "Building and Contents")
+BROKERS = ("Heartland Group", "National Brokers", "Coastal Risk Partners", "Metro Risk Solutions", "Summit Insurance")
+PLACES = (
+    ("Dublin", "OH", "Franklin (County)"),
+    ("Dallas", "TX", "Dallas (County)"),
+    ("Minneapolis", "MN", "Hennepin (County)"),
+    ("Jacksonville", "FL", "Duval (County)"),
+    ("Walnut Creek", "CA", "Contra Costa (County)"),
+    ("Denver", "CO", "Denver (County)"),
+    ("Atlanta", "GA", "Fulton (County)"),
+    ("Phoenix", "AZ", "Maricopa (County)"),
+)
+STREETS = ("Oak", "Maple", "Market", "Charter Oak", "Tara Hill", "Wendelkin", "Main", "Lake")
+
+COLUMNS = (
+    "submission_id", "submission_channel", "occupancy_type", "property_age", "property_value",
+    "Property_county", "cover_type", "building_coverage_limit", "contents_coverage_limit",
+    "broker_company", "broker_email", "Applicant_Email", "Property_address", "Property_city", "Property_state",
+)
+
+
+def generate_properties(n: int, seed: int = 0) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for i in range(n):
+        city, state, county = rng.choice(PLACES)
+        broker = rng.choice(BROKERS)
+        value = rng.randint(150_000, 5_000_000)
+        cover = rng.choice(COVER_TYPES)
+        building = round(value * rng.uniform(0.6, 1.0), 2) if cover != "Contents Only" else 0.0
+        contents = round(value * rng.uniform(0.1, 0.5), 2) if cover != "Building Only" else 0.0
+        yield {
+            "submission_id":           f"SYN{i + 1:07d}",
+            "submission_channel":      rng.choice(CHANNELS),
+            "occupancy_type":          rng.choice(OCCUPANCY),
+            "property_age":            rng.randint(0, 120),
+            "property_value":          value,
+            "Property_county":         county,
+            "cover_type":              cover,
+            "building_coverage_limit": building,
+            "contents_coverage_limit": contents,
+            "broker_company":          broker,
+            "broker_email":            f"submissions@{broker.lower().replace(' ', '')}.com",
+            "Applicant_Email":         f"applicant{i + 1}@example.com",
+            "Property_address":        f"{rng.randint(1, 9999)} {rng.choice(STREETS)} Street, {city}, {state}",
+            "Property_city":           city,
+            "Property_state":          state,
+        }
+
+
+def write_property_csv(path: str, n: int, seed: int = 0) -> int:
+    """Write an n-row book to `path`; returns the row count."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        count = 0
+        for row in generate_properties(n, seed):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+# ─── Submissions: predictions, local SHAP, vulnerability ──────────────────────
+# generate_submissions(n, seed) pairs each generate_properties(n, seed) row with
+# a prediction shaped like MOCK_PREDICTIONS, a local SHAP vector shaped like
+# MOCK_LOCAL_SHAP and a vulnerability document shaped like MOCK_VULNERABILITY.
+# The fields are correlated the way the real book is: older properties have
+# worse roofs, worse roofs and hazard exposure raise vulnerability risk, and
+# quote propensity falls as total risk rises.
+
+# Per-state hazard exposure, 0-1: (wildfire, hurricane, earthquake, flood)
+STATE_HAZARD = {
+    "OH": (0.10, 0.05, 0.10, 0.30),
+    "TX": (0.35, 0.70, 0.10, 0.55),
+    "MN": (0.15, 0.00, 0.05, 0.35),
+    "FL": (0.25, 0.90, 0.05, 0.80),
+    "CA": (0.85, 0.05, 0.90, 0.30),
+    "CO": (0.70, 0.00, 0.20, 0.20),
+    "GA": (0.25, 0.40, 0.10, 0.40),
+    "AZ": (0.60, 0.00, 0.30, 0.15),
+}
+BROKER_PERFORMANCE = {
+    "Heartland Group": 55, "National Brokers": 45, "Coastal Risk Partners": 38,
+    "Metro Risk Solutions": 50, "Summit Insurance": 62,
+}
+
+# (condition, risk 0-1, damage areas to draw from)
+ROOF_CONDITIONS = (
+    ("Excellent", 0.05, ()),
+    ("Good", 0.25, ("Minor granule loss (south slope)", "Minor shingle wear")),
+    ("Fair", 0.50, ("NW corner wear", "Flashing separation at chimney", "Minor granule loss (south slope)")),
+    ("Poor", 0.75, ("Missing shingles (east section)", "Visible granule loss", "Moss growth", "Blocked gutters")),
+    ("Critical", 0.95, ("Sagging ridge line", "Multiple missing tiles", "Water staining visible", "Structural deformation")),
+)
+ROOF_MATERIALS = ("Asphalt Shingle", "Composite Shingle", "Wood Shake", "Clay Tile", "Metal Standing Seam")
+FINDINGS = {
+    "Low": ("Clean roof surface", "Well-maintained yard", "Solar panel installation", "New guttering system",
+            "Pool proximity", "Driveway in good repair"),
+    "Medium": ("Roof surface wear", "Cracked chimney cap", "Blocked gutters", "Debris accumulation",
+               "Deck structural wear"),
+    "High": ("Missing shingles", "Dense vegetation", "Severe roof damage", "Foundation cracks", "Dead trees (3)"),
+}
+INSIGHT_IMAGES = (
+    "https://images.unsplash.com/photo-1558618666-fcd25c85cd64?w=800&h=600&fit=crop",
+    "https://images.unsplash.com/photo-1504307651254-35680f356dfd?w=800&h=600&fit=crop",
+    "https://images.unsplash.com/photo-1622021142947-da7dedc7c39a?w=800&h=600&fit=crop",
+    "https://images.unsplash.com/photo-1600585154340-be6161a56a0c?w=800&h=600&fit=crop",
+    "https://images.unsplash.com/photo-1560518883-ce09059eeffa?w=800&h=600&fit=crop",
+    "https://images.unsplash.com/photo-1449844908441-8829872d2607?w=800&h=600&fit=crop",
+)
+# Global importance the local vectors scatter around (as in MOCK_SHAP_VALUES)
+SHAP_FEATURES = (
+    ("annual_income", 1.05), ("building_coverage_limit", 0.85), ("cover_type_Building Only", 0.69),
+    ("Property_past_loss_freq", 0.52), ("construction_permit_Valid", 0.35), ("property_age", 0.28),
+    ("total_risk_score", 0.25), ("Local_Crime_Rate", 0.25), ("roof_material_Wood", 0.22),
+    ("Local_Fire_Incident_Rate", 0.20),
+)
+# Risk-component weights for total_risk_score
+RISK_WEIGHTS = {
+    "property_vulnerability_risk": 0.25, "construction_risk": 0.15, "locality_risk": 0.15,
+    "coverage_risk": 0.15, "claim_history_risk": 0.15, "property_condition_risk": 0.15,
+}
+CHANNEL_PROPENSITY = {"Broker": 0.4, "Agent": 0.2, "Direct": 0.0, "Online": -0.3}
+
+PREDICTION_COLUMNS = (
+    "submission_id", "submission_channel", "property_state", "occupancy_type", "cover_type",
+    *RISK_WEIGHTS, "broker_performance", "total_risk_score", "quote_propensity_probability", "quote_propensity",
+)
+
+
+def _clip(value: float, low: float = 0, high: float = 100) -> float:
+    return min(high, max(low, value))
+
+
+def _zone(rng: random.Random, exposure: float, levels: tuple, unit: str, far: float) -> tuple[str, float]:
+    """A zone label plus distance: higher exposure → nearer and a higher level."""
+    score = _clip(exposure + rng.gauss(0, 0.12), 0, 0.999)
+    miles = round(far * (1 - score) + rng.uniform(0.1, 0.6), 1)
+    return f"{levels[int(score * len(levels))]} ({miles} mi {unit})", score
+
+
+def _vulnerability(rng: random.Random, prop: dict, hazard: tuple) -> tuple[dict, float, float]:
+    """(document, roof risk 0-1, hazard risk 0-1) for one property."""
+    age = prop["property_age"]
+    shift = age / 120 * 3.2 + rng.gauss(0, 0.8)
+    condition, roof_risk, damage_pool = ROOF_CONDITIONS[int(_clip(round(shift), 0, len(ROOF_CONDITIONS) - 1))]
+    roof_age = max(1, min(age, int(rng.uniform(0.2, 1.0) * 40)))
+    wildfire, wildfire_score = _zone(rng, hazard[0], ("Low", "Low-Moderate", "Moderate", "High", "Very High"),
+                                     "to WUI boundary", 8)
+    fault, quake_score = _zone(rng, hazard[2], ("Distant", "Regional", "Near", "Adjacent"), "to nearest fault", 15)
+    hurricane_cat = int(_clip(hazard[1] * 4 + rng.gauss(0, 0.5), 0, 4))
+    flood_score = _clip(hazard[3] + rng.gauss(0, 0.15), 0, 1)
+    flood = "Zone X (minimal risk)" if flood_score < 0.45 else "Zone AE (high risk)" if flood_score < 0.75 \
+        else "Zone A (high risk, no BFE)"
+    hazard_risk = (wildfire_score + quake_score + hurricane_cat / 4 + flood_score) / 4
+
+    level = "High" if roof_risk >= 0.75 else "Medium" if roof_risk >= 0.5 else "Low"
+    picks = [(level, label) for label in rng.sample(FINDINGS[level], 2)]
+    if level != "Low":
+        picks.append(("Low", rng.choice(FINDINGS["Low"])))
+    findings = [
+        {"label": label, "confidence": round(rng.uniform(0.75, 0.98), 2), "risk": risk}
+        for risk, label in picks
+    ]
+    document = {
+        "roof_detection": {
+            "condition": condition,
+            "damage_areas": rng.sample(damage_pool, rng.randint(0, len(damage_pool))),
+            "material": rng.choice(ROOF_MATERIALS),
+            "age_estimate": f"{roof_age}-{roof_age + rng.randint(2, 6)} years",
+            "confidence": round(rng.uniform(0.82, 0.98), 2),
+        },
+        "proximity": {
+            "wildfire_zone": wildfire,
+            "hurricane_zone": f"Category {hurricane_cat}-{hurricane_cat + 1} exposure" if hurricane_cat
+            else "Category 1 exposure (coastal setback met)",
+            "fault_line": fault,
+            "flood_zone": flood,
+        },
+        "object_detection": {"findings": findings, "model": "YOLOv8-property-v2"},
+        "insight_image": rng.choice(INSIGHT_IMAGES),
+    }
+    return document, roof_risk, hazard_risk
+
+
+def _prediction(rng: random.Random, prop: dict, roof_risk: float, hazard_risk: float) -> dict:
+    state = prop["Property_state"]
+    value = prop["property_value"]
+    covered = (prop["building_coverage_limit"] + prop["contents_coverage_limit"]) / value
+    risks = {
+        "property_vulnerability_risk": round(_clip(100 * (0.55 * roof_risk + 0.45 * hazard_risk) + rng.gauss(0, 6))),
+        "construction_risk":           round(_clip(prop["property_age"] * 0.6 + rng.gauss(15, 8))),
+        "locality_risk":               round(_clip(100 * hazard_risk * 0.8 + rng.gauss(10, 8))),
+        "coverage_risk":               round(_clip(100 * covered * 0.55 + rng.gauss(0, 8))),
+        "claim_history_risk":          round(_clip(rng.expovariate(1 / 25))),
+        "property_condition_risk":     round(_clip(100 * roof_risk * 0.7 + rng.gauss(5, 8))),
+    }
+    total = round(sum(risks[k] * w for k, w in RISK_WEIGHTS.items()))
+    logit = 2.2 - total / 16 + CHANNEL_PROPENSITY.get(prop["submission_channel"], 0) + rng.gauss(0, 0.9)
+    probability = 1 / (1 + math.exp(-logit))
+    label = "High" if probability >= 0.70 else "Low" if probability < 0.30 else "Mid"
+    return {
+        "submission_id":                prop["submission_id"],
+        "submission_channel":           prop["submission_channel"],
+        "property_state":               state,
+        "occupancy_type":               prop["occupancy_type"],
+        "cover_type":                   prop["cover_type"],
+        **risks,
+        "broker_performance":           round(_clip(BROKER_PERFORMANCE.get(prop["broker_company"], 50) + rng.gauss(0, 6))),
+        "total_risk_score":             total,
+        "quote_propensity_probability": round(probability, 10),
+        "quote_propensity":             f"{label} Propensity",
+    }
+
+
+def _local_shap(rng: random.Random, prop: dict, prediction: dict) -> list[dict]:
+    """Top features by |SHAP|, scattered around the global importances and nudged by the row."""
+    nudges = {
+        "property_age": prop["property_age"] / 60,
+        "total_risk_score": prediction["total_risk_score"] / 40,
+        "cover_type_Building Only": 1.3 if prop["cover_type"] == "Building Only" else 0.7,
+        "Property_past_loss_freq": prediction["claim_history_risk"] / 25,
+    }
+    shap = [
+        {"feature": feature, "mean_abs_shap": round(base * nudges.get(feature, 1.0) * rng.lognormvariate(0, 0.25), 4)}
+        for feature, base in SHAP_FEATURES
+    ]
+    shap.sort(key=lambda s: s["mean_abs_shap"], reverse=True)
+    return shap
+
+
+def generate_submissions(n: int, seed: int = 0) -> Iterator[dict]:
+    """
+    {"property", "prediction", "local_shap", "vulnerability"} per row. The property
+    rows are exactly generate_properties(n, seed), so a book written with the same
+    seed lines up with these predictions by submission_id.
+    """
+    rng = random.Random(f"submissions|{seed}")
+    for prop in generate_properties(n, seed):
+        hazard = STATE_HAZARD.get(prop["Property_state"], (0.3, 0.3, 0.3, 0.3))
+        vulnerability, roof_risk, hazard_risk = _vulnerability(rng, prop, hazard)
+        prediction = _prediction(rng, prop, roof_risk, hazard_risk)
+        yield {
+            "property": prop,
+            "prediction": prediction,
+            "local_shap": _local_shap(rng, prop, prediction),
+            "vulnerability": vulnerability,
+        }
+
+
+def prediction_rows(submissions: Iterable[dict]) -> Iterator[dict]:
+    """Flat prediction rows; local SHAP and vulnerability become JSON text columns."""
+    for sub in submissions:
+        yield {
+            **sub["prediction"],
+            "local_shap": json.dumps(sub["local_shap"], separators=(",", ":")),
+            "vulnerability": json.dumps(sub["vulnerability"], separators=(",", ":")),
+        }
+
+
+# ─── Sinks ────────────────────────────────────────────────────────────────────
+# Every sink consumes an iterator and holds at most one batch, so memory stays
+# flat however many rows are generated.
+
+def write_csv(path: str, rows: Iterable[dict], columns: Iterable[str]) -> int:
+    """Stream dict rows to CSV; returns the row count."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(columns))
+        writer.writeheader()
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet(path: str, rows: Iterable[dict], batch_size: int = 50_000) -> int:
+    """Stream dict rows to Parquet in row groups of batch_size. Needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)") from exc
+
+    writer = None
+    count = 0
+    try:
+        for batch in _batched(rows, batch_size):
+            table = pa.Table.from_pylist(batch) if writer is None else pa.Table.from_pylist(batch, schema=writer.schema)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_sqlite(path: str, n: int, seed: int = 0, submissions: int = 1, batch_size: int = 10_000) -> int:
+    """
+    Load `submissions` scored submissions into an app database at `path` (created
+    and migrated if needed). Each one covers the whole n-row book, with
+    process_results.property_id set to the catalog id registered for the row's
+    submission_id in property_ids, so the API serves them once PROPERTY_CSV_PATH
+    points at the same book. (The catalog replaces the first rows with the demo
+    overlay, so those few results are not joined to a property.)
+
+    Each synthetic underwriter prioritizes or discards a share of the book, and
+    the stored score is the one routers.results.score_percentage would give,
+    summed batch by batch. Rows are generated and written in batches; only the
+    selected ids (about 30% of the book) are held until the submission row is
+    updated. input_hash is left NULL, so a later /api/process rescoring treats
+    every row as changed. Returns the number of process_results rows written.
+    """
+    from database import migrate
+    from routers.results import _compute_score, percentage_of_points
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        migrate(conn)
+        conn.executemany(
+            "INSERT OR IGNORE INTO property_ids (submission_id) VALUES (?)",
+            ((prop["submission_id"],) for prop in generate_properties(n, seed)),
+        )
+        conn.commit()
+        property_ids = {row["submission_id"]: row["id"] for row in conn.execute("SELECT id, submission_id FROM property_ids")}
+        rng = random.Random(f"underwriters|{seed}")
+        written = 0
+        for s in range(submissions):
+            skill = rng.uniform(0.3, 0.9)    # how often a pick agrees with the model
+            cur = conn.execute(
+                "INSERT INTO submissions (underwriter_name, prioritized_ids, discarded_ids) VALUES (?, '[]', '[]')",
+                (f"Synthetic Underwriter {s + 1}",),
+            )
+            submission_id = cur.lastrowid
+            prioritized, discarded = [], []
+            points, count = 0.0, 0
+            rows = (
+                _result_row(submission_id, property_ids[sub["property"]["submission_id"]], sub)
+                for sub in generate_submissions(n, seed)
+            )
+            for batch in _batched(rows, batch_size):
+                scored = []
+                for row, label in batch:
+                    selection = _pick(rng, label, skill)
+                    if selection == "prioritized":
+                        prioritized.append(row[-1])
+                    elif selection == "discarded":
+                        discarded.append(row[-1])
+                    scored.append({"user_selection": selection, "quote_propensity_label": label})
+                points += _compute_score(scored)
+                count += len(batch)
+                conn.executemany(
+                    "INSERT INTO process_results (submission_id, property_id, ai_risk, quote_propensity, "
+                    "total_risk_score, shap_values, vulnerability_data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [row[:-1] for row, _ in batch],
+                )
+                written += len(batch)
+            conn.execute(
+                "UPDATE submissions SET prioritized_ids = ?, discarded_ids = ?, score = ?, "
+                "results_version = results_version + 1 WHERE id = ?",
+                (json.dumps(prioritized), json.dumps(discarded), percentage_of_points(points, count), submission_id),
+            )
+            conn.commit()
+        conn.execute("ANALYZE")     # migration 5 analyzed empty tables
+        return written
+    finally:
+        conn.close()
+
+
+def _result_row(submission_id: int, property_id: int, sub: dict) -> tuple[tuple, str]:
+    """(process_results values + submission_id string, propensity label) for one row."""
+    pred = sub["prediction"]
+    label = pred["quote_propensity"]
+    ai_risk = "High" if label.startswith("High") else "Medium" if label.startswith("Mid") else "Low"
+    return (
+        (
+            submission_id, property_id, ai_risk, round(pred["quote_propensity_probability"], 4),
+            round(pred["total_risk_score"] / 100, 4),
+            json.dumps(sub["local_shap"], separators=(",", ":")),
+            json.dumps(sub["vulnerability"], separators=(",", ":")),
+            pred["submission_id"],
+        ),
+        label,
+    )
+
+
+def _pick(rng: random.Random, label: str, skill: float) -> Optional[str]:
+    """An underwriter's selection: agrees with the propensity tier `skill` of the time."""
+    if rng.random() > 0.3:
+        return None      # most of the book is left unselected
+    agree = rng.random() < skill
+    if label.startswith("High"):
+        return "prioritized" if agree else "discarded"
+    if label.startswith("Low"):
+        return "discarded" if agree else "prioritized"
+    return rng.choice(("prioritized", "discarded"))
+
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic book and its predictions.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=("csv", "parquet", "sqlite"), default="csv")
+    parser.add_argument("--out", required=True,
+                        help="csv/parquet: output directory for properties.* and predictions.*; sqlite: database file")
+    parser.add_argument("--submissions", type=int, default=1, help="sqlite: scored submissions to load")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.format == "sqlite":
+        count = write_sqlite(args.out, args.rows, args.seed, args.submissions)
+        print(f"[synthetic] {count} process_results rows → {args.out}")
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        book = os.path.join(args.out, f"properties.{args.format}")
+        predictions = os.path.join(args.out, f"predictions.{args.format}")
+        if args.format == "csv":
+            write_csv(book, generate_properties(args.rows, args.seed), COLUMNS)
+            write_csv(predictions, prediction_rows(generate_submissions(args.rows, args.seed)),
+                      (*PREDICTION_COLUMNS, "local_shap", "vulnerability"))
+        else:
+            write_parquet(book, generate_properties(args.rows, args.seed))
+            write_parquet(predictions, prediction_rows(generate_submissions(args.rows, args.seed)))
+        print(f"[synthetic] {args.rows} rows → {book}, {predictions}")
+    print(f"[synthetic] done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
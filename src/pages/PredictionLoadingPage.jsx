@@ -1,7 +1,7 @@
 import { useEffect, useRef, useState } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
 import { usePropensity } from "../context/PropensityContext";
-import { fetchProperties, runPreliminaryPredictions, runFinalPredictions } from "../services/api";
+import { fetchProperties, streamPreliminaryPredictions, runFinalPredictions } from "../services/api";
 
 /* ── Icons ────────────────────────────────────────────────────────────────── */
 const MapPin      = () => <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2"><path d="M21 10c0 7-9 13-9 13s-9-6-9-13a9 9 0 0 1 18 0z"/><circle cx="12" cy="10" r="3"/></svg>;
@@ -376,15 +376,17 @@ export default function PredictionLoadingPage() {
   useEffect(() => {
     if (isRerun) return;
     let alive = true;
+    const controller = new AbortController();
 
-    // Fire the ML API call concurrently with the animation
+    // Fire the ML API call concurrently with the animation; predictions stream
+    // in chunks, and leaving the page aborts the rest of the batch
     const apiPromise = fetchProperties()
       .then(props => {
         if (alive) setProperties(props);
-        return runPreliminaryPredictions(props, {}, {});
+        return streamPreliminaryPredictions(props, {}, { signal: controller.signal });
       })
       .catch(err => {
-        console.warn('Run 1 API failed, using mock data:', err.message);
+        if (alive) console.warn('Run 1 API failed, using mock data:', err.message);
         return null;
       });
 
@@ -425,7 +427,7 @@ export default function PredictionLoadingPage() {
       }
     };
     run();
-    return () => { alive = false; };
+    return () => { alive = false; controller.abort(); };
   }, []); // eslint-disable-line
 
   /* Run 2 animation + API call */
@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import PropertyCard from '../components/PropertyCard';
-import { fetchProperties, pollSubmission } from '../services/api';
+import { fetchProperties, pollSubmission, subscribeSubmissions } from '../services/api';
 import { useNavigate } from 'react-router-dom';
 
 const POLL_INTERVAL_MS = 3000;
@@ -11,7 +11,8 @@ const PropertyOverview = () => {
   const navigate = useNavigate();
   const intervalRef = useRef(null);
   // Track the submission id at mount time so we detect NEW submissions
-  const initialIdRef = useRef(null);
+  // (undefined until known; null means there was no submission yet)
+  const initialIdRef = useRef(undefined);
   const alreadyNavigatedRef = useRef(false);
 
   useEffect(() => {
@@ -22,25 +23,50 @@ const PropertyOverview = () => {
   }, []);
 
   useEffect(() => {
-    // Capture the current latest submission id so we don't react to old ones
-    pollSubmission().then((result) => {
-      initialIdRef.current = result?.id ?? null;
-    });
+    const openResponse = (submission) => {
+      if (alreadyNavigatedRef.current) return;
+      alreadyNavigatedRef.current = true;
+      clearInterval(intervalRef.current);
+      navigate('/response-received', { state: { submission } });
+    };
+
+    // Fallback when the event stream is unavailable: poll /latest
+    const startPolling = () => {
+      if (intervalRef.current) return;
+      // Capture the current latest submission id so we don't react to old ones
+      pollSubmission().then((result) => {
+        if (initialIdRef.current === undefined) initialIdRef.current = result?.id ?? null;
+      });
 
-    intervalRef.current = setInterval(async () => {
-      const result = await pollSubmission();
-      if (
-        result &&
-        result.id !== initialIdRef.current &&
-        !alreadyNavigatedRef.current
-      ) {
-        alreadyNavigatedRef.current = true;
-        clearInterval(intervalRef.current);
-        navigate('/response-received', { state: { submission: result } });
-      }
-    }, POLL_INTERVAL_MS);
+      intervalRef.current = setInterval(async () => {
+        if (initialIdRef.current === undefined) return;
+        const result = await pollSubmission();
+        if (result && result.id !== initialIdRef.current) {
+          openResponse(result);
+        }
+      }, POLL_INTERVAL_MS);
+    };
+
+    // New submissions are pushed by the server. The first `latest` sets the
+    // baseline; on a reconnect it is compared against it, so a submission
+    // created while the stream was down is not missed.
+    const unsubscribe = subscribeSubmissions({
+      onLatest: (latest) => {
+        if (initialIdRef.current === undefined) {
+          initialIdRef.current = latest?.id ?? null;
+        } else if (latest && latest.id !== initialIdRef.current) {
+          openResponse(latest);
+        }
+      },
+      onSubmission: openResponse,
+      onUnavailable: startPolling,
+    });
 
-    return () => clearInterval(intervalRef.current);
+    return () => {
+      unsubscribe();
+      clearInterval(intervalRef.current);
+      intervalRef.current = null;
+    };
   }, [navigate]);
 
   if (loading) {
@@ -49,6 +49,30 @@ export const pollSubmission = async () => {
   }
 };
 
+/**
+ * Subscribe to new submissions over Server-Sent Events.
+ * handlers.onLatest(submission|null) fires once on connect, handlers.onSubmission(submission)
+ * for every submission created afterwards. handlers.onUnavailable() fires if the stream
+ * cannot be used (no EventSource support, or the server closed the connection) so the
+ * caller can fall back to pollSubmission(). Returns an unsubscribe function.
+ */
+export const subscribeSubmissions = (handlers = {}) => {
+  if (typeof EventSource === 'undefined') {
+    handlers.onUnavailable?.();
+    return () => {};
+  }
+  const source = new EventSource(`${API_BASE_URL}/api/submissions/stream`);
+  source.addEventListener('latest', (e) => handlers.onLatest?.(JSON.parse(e.data)));
+  source.addEventListener('submission', (e) => handlers.onSubmission?.(JSON.parse(e.data)));
+  source.onerror = () => {
+    // EventSource retries on its own unless the connection is closed for good
+    if (source.readyState === EventSource.CLOSED) {
+      handlers.onUnavailable?.();
+    }
+  };
+  return () => source.close();
+};
+
 export const submitDecision = async (payload) => {
   const response = await api.post('/api/submissions', payload);
   return response.data;
@@ -115,6 +139,56 @@ export const runPreliminaryPredictions = async (rows, rules = {}, weights = {})
   return response.data;
 };
 
+/**
+ * Run 1 as a stream — predictions arrive in chunks while the batch is scored.
+ * handlers: { onChunk({ chunk_index, predictions, shap_local }), onSummary({ row_count, shap_global }) }
+ * Resolves with the same shape as runPreliminaryPredictions once the stream ends.
+ * Pass an AbortSignal as `signal` to cancel.
+ */
+export const streamPreliminaryPredictions = async (rows, handlers = {}, { rules = {}, weights = {}, signal } = {}) => {
+  const response = await fetch(`${API_BASE_URL}/api/ml/submissions/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+    body: JSON.stringify({ rows, rules, weights }),
+    signal,
+  });
+  if (!response.ok) {
+    throw new Error(`Prediction stream failed: ${response.status} ${response.statusText}`);
+  }
+
+  const result = { predictions: [], shap_local: [], shap_global: [], row_count: 0 };
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const message = JSON.parse(line);
+    if (message.error) {
+      throw new Error(message.error);
+    }
+    if (message.predictions) {
+      result.predictions.push(...message.predictions);
+      result.shap_local.push(...message.shap_local);
+      handlers.onChunk?.(message);
+    } else {
+      result.shap_global = message.shap_global;
+      result.row_count = message.row_count;
+      handlers.onSummary?.(message);
+    }
+  };
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffered + decoder.decode());
+  return result;
+};
+
 /**
  * Run 2 — Final propensity scoring with property vulnerability weight.
  * Sends only non-BPO rows (frontend filters out excludedIds before calling).
@@ -130,3 +204,46 @@ export const runFinalPredictions = async (rows, excludedIds = [], rules = {}, we
   return response.data;
 };
 
+
+// ── Background ML jobs ───────────────────────────────────────────────────────
+
+/**
+ * Queue Run 1 ('submissions') or Run 2 ('final_score') as a background job.
+ * Returns the job document ({ job_id, status, total_rows, processed_rows, ... })
+ * immediately instead of holding the request open while the batch scores.
+ */
+export const startPredictionJob = async (kind, rows, rules = {}, weights = {}) => {
+  const response = await api.post(`/api/ml/jobs/${kind}`, { rows, rules, weights });
+  return response.data;
+};
+
+export const fetchPredictionJob = async (jobId) => {
+  const response = await api.get(`/api/ml/jobs/${jobId}`);
+  return response.data;
+};
+
+/** Final job output — same shape as runPreliminaryPredictions / runFinalPredictions. */
+export const fetchPredictionJobResult = async (jobId) => {
+  const response = await api.get(`/api/ml/jobs/${jobId}/result`);
+  return response.data;
+};
+
+/**
+ * Stream job progress over Server-Sent Events.
+ * handlers: { onChunk(chunk), onStatus(job), onCompleted(summary), onFailed(error) }
+ * Returns a function that closes the stream.
+ */
+export const subscribePredictionJob = (jobId, handlers = {}) => {
+  const source = new EventSource(`${API_BASE_URL}/api/ml/jobs/${jobId}/events`);
+  source.addEventListener('chunk', (e) => handlers.onChunk?.(JSON.parse(e.data)));
+  source.addEventListener('status', (e) => handlers.onStatus?.(JSON.parse(e.data)));
+  source.addEventListener('completed', (e) => {
+    handlers.onCompleted?.(JSON.parse(e.data));
+    source.close();
+  });
+  source.addEventListener('failed', (e) => {
+    handlers.onFailed?.(JSON.parse(e.data));
+    source.close();
+  });
+  return () => source.close();
+};